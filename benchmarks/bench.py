@@ -0,0 +1,443 @@
+#!/usr/bin/env python3
+"""
+Offline Benchmarks
+==================
+Measures the browse stack against the local fixture server (see
+fixture_server.py), so numbers are comparable run over run: no network,
+no rate limits, the same pages every time.
+
+Scenarios:
+  launch        cold browse() calls: launch and display time per call, RSS of
+                one browser
+  browse        browse() on one warm BrowserPool browser, one page after
+                another: pages/s and latency
+  browse_async  browse_many_async() on a warm AsyncBrowserPool at each
+                --concurrency level: pages/s, p50/p95/p99 latency, memory
+                per browser
+  mcp           MCP server tools called in-process (browser_navigate,
+                browser_snapshot, browser_extract_schema) with one session
+                per concurrency slot: latency per tool (needs `mcp`)
+
+Pages cycle through the fixture kinds (static article, `.poly-card` listing
+with schema extraction, infinite scroll harvested to the end, slow assets).
+With --replay, the pages of a record_replay archive are loaded instead,
+served from the recording (the MCP scenario is skipped).
+Results are written as JSON; `compare` reports metrics that moved beyond a
+threshold and exits 1 on regressions, for CI or before/after checks.
+
+Usage:
+  python benchmarks/bench.py run -o bench.json
+  python benchmarks/bench.py run -s browse_async -c 1,4,8,16 -n 96 -o after.json
+  python benchmarks/bench.py run --replay ml_laptop.zip -s browse_async -o ml.json   # recorded site
+  python benchmarks/bench.py compare before.json after.json --threshold 0.10
+
+Memory figures need psutil (see instrumentation.py).
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# No per-domain pacing against the local server (default_rate_limiter() is off)
+os.environ["CAMOUFOX_RATE"] = "0"
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "src", "python"))
+sys.path.insert(0, HERE)
+
+from fixture_server import KINDS, FixtureServer  # noqa: E402
+
+SCENARIOS = ("launch", "browse", "browse_async", "mcp")
+
+# Shorter quiet windows than the browse() default: the fixture server answers
+# at once, so only slow pages actually wait (for their assets)
+READY = "network_quiet:300,dom_quiet:200"
+PAGE_OPTIONS = dict(ready=READY, ready_timeout=5000)
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Linear-interpolated percentile (q in 0..100) of a non-empty list."""
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    low, high = math.floor(rank), math.ceil(rank)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(values: Iterable[Optional[float]]) -> Optional[Dict[str, float]]:
+    """p50/p95/p99/mean/max of millisecond samples (None entries skipped)."""
+    values = [v for v in values if v is not None]
+    if not values:
+        return None
+    return {
+        "p50": round(percentile(values, 50), 1),
+        "p95": round(percentile(values, 95), 1),
+        "p99": round(percentile(values, 99), 1),
+        "mean": round(sum(values) / len(values), 1),
+        "max": round(max(values), 1),
+        "n": len(values),
+    }
+
+
+def _rss_mb(results: List[Dict[str, Any]]) -> Optional[float]:
+    peaks = [r["resources"]["rss_mb_max"] for r in results if r.get("resources")]
+    return max(peaks) if peaks else None
+
+
+# -- page mix -----------------------------------------------------------------
+
+def _harvester():
+    from camoufox_browser import MERCADOLIBRE_CARD_JS
+    from harvester import Harvester
+
+    return Harvester(".poly-card", MERCADOLIBRE_CARD_JS, key="title", stall_rounds=2)
+
+
+def harvest(page) -> int:
+    return len(list(_harvester().harvest(page)))
+
+
+async def harvest_async(page) -> int:
+    return len([record async for record in _harvester().harvest_async(page)])
+
+
+def page_jobs(urls: Callable[[str, int], List[str]], count: int, sync: bool,
+              kinds: Tuple[str, ...] = KINDS) -> List[Dict[str, Any]]:
+    """`count` browse jobs cycling through the fixture kinds."""
+    from camoufox_browser import MERCADOLIBRE_SCHEMA
+
+    per_kind = -(-count // len(kinds))
+    pages = {kind: urls(kind, per_kind) for kind in kinds}
+    jobs = []
+    for i in range(count):
+        kind = kinds[i % len(kinds)]
+        job = {"url": pages[kind][i // len(kinds)], "id": kind}
+        if kind == "static":
+            job["extract_text"] = True
+        elif kind == "listing":
+            job["schema"] = MERCADOLIBRE_SCHEMA
+        elif kind == "scroll":
+            job["action"] = harvest if sync else harvest_async
+        jobs.append(job)
+    return jobs
+
+
+class PageSource:
+    """Benchmark pages: the fixture sites, or the pages of a recorded archive."""
+
+    def __init__(self, server: FixtureServer, replay: Optional[str] = None):
+        self.server = server
+        self.replayer = None
+        if replay:
+            from record_replay import Replayer
+
+            self.replayer = Replayer(replay)
+            if not self.replayer.archive.pages:
+                raise SystemExit(f"{replay} has no recorded pages")
+
+    def jobs(self, count: int, sync: bool, kinds: Tuple[str, ...] = KINDS) -> List[Dict[str, Any]]:
+        if self.replayer is None:
+            return page_jobs(self.server.urls, count, sync, kinds)
+        pages = self.replayer.archive.pages
+        return [{"url": pages[i % len(pages)], "id": "replay", "replay": self.replayer, "extract_text": True}
+                for i in range(count)]
+
+
+def _options(job: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in job.items() if key != "id"}
+
+
+def _page_report(results: List[Dict[str, Any]], wall_s: float) -> Dict[str, Any]:
+    report = {
+        "pages": len(results),
+        "failures": sum(not r["success"] for r in results),
+        "wall_s": round(wall_s, 2),
+        "pages_per_s": round(len(results) / wall_s, 2) if wall_s else None,
+        "latency_ms": summarize(r["timings"]["total_ms"] for r in results if "timings" in r),
+        "by_kind_ms": {
+            kind: summarize(r["timings"]["total_ms"] for r in results
+                            if r.get("id") == kind and "timings" in r)
+            for kind in sorted({r["id"] for r in results if r.get("id")})
+        },
+    }
+    errors = sorted({r["error"] for r in results if r.get("error")})
+    if errors:
+        report["errors"] = errors[:5]
+    return report
+
+
+# -- scenarios ----------------------------------------------------------------
+
+def bench_launch(source: PageSource, runs: int, **_: Any) -> Dict[str, Any]:
+    from camoufox_browser import browse
+
+    results = [browse(visible=False, **PAGE_OPTIONS, **_options(job))
+               for job in source.jobs(runs, sync=True, kinds=("static",))]
+    return {
+        "runs": runs,
+        "failures": sum(not r["success"] for r in results),
+        "launch_ms": summarize(r["timings"].get("launch_ms") for r in results),
+        "display_ms": summarize(r["timings"].get("display_ms") for r in results),
+        "total_ms": summarize(r["timings"]["total_ms"] for r in results),
+        "rss_mb_per_browser": _rss_mb(results),
+    }
+
+
+def bench_browse(source: PageSource, pages: int, **_: Any) -> Dict[str, Any]:
+    from browser_pool import BrowserPool
+    from camoufox_browser import browse
+
+    jobs = source.jobs(pages, sync=True)
+    with BrowserPool(min_size=1, max_size=1, visible=False) as pool:
+        browse(pool=pool, **PAGE_OPTIONS, **_options(jobs[0]))   # warm up
+        started = time.perf_counter()
+        results = []
+        for job in jobs:
+            result = browse(pool=pool, **PAGE_OPTIONS, **_options(job))
+            result["id"] = job["id"]
+            results.append(result)
+        wall = time.perf_counter() - started
+    return dict(_page_report(results, wall), rss_mb_per_browser=_rss_mb(results))
+
+
+async def _browse_async_level(source: PageSource, pages: int, concurrency: int) -> Dict[str, Any]:
+    from browser_pool import AsyncBrowserPool
+    from camoufox_browser import browse_async, browse_many_async
+
+    browsers = max(1, -(-concurrency // 4))
+    jobs = source.jobs(pages, sync=False)
+    async with AsyncBrowserPool(min_size=browsers, max_size=browsers,
+                                contexts_per_browser=-(-concurrency // browsers), visible=False) as pool:
+        await browse_async(pool=pool, **PAGE_OPTIONS, **_options(jobs[0]))   # warm up
+        started = time.perf_counter()
+        results = [r async for r in browse_many_async(jobs, concurrency=concurrency, pool=pool,
+                                                      **PAGE_OPTIONS)]
+        wall = time.perf_counter() - started
+    rss = _rss_mb(results)
+    return dict(_page_report(results, wall), browsers=browsers,
+                rss_mb_per_browser=round(rss / browsers, 1) if rss else None)
+
+
+def bench_browse_async(source: PageSource, pages: int, levels: List[int], **_: Any) -> Dict[str, Any]:
+    return {f"c{level}": asyncio.run(_browse_async_level(source, pages, level)) for level in levels}
+
+
+def _load_mcp_server():
+    """Import the MCP server module in-process; None when `mcp` is missing."""
+    path = os.path.join(HERE, "..", "mcp-server", "camoufox_mcp_server.py")
+    spec = importlib.util.spec_from_file_location("camoufox_mcp_server", path)
+    module = importlib.util.module_from_spec(spec)
+    try:
+        spec.loader.exec_module(module)
+    except SystemExit:   # the server exits when mcp or camoufox is not installed
+        return None
+    return module
+
+
+async def _mcp_level(mcp: Any, source: PageSource, pages: int, concurrency: int) -> Dict[str, Any]:
+    from camoufox_browser import MERCADOLIBRE_SCHEMA
+
+    schema = {key: MERCADOLIBRE_SCHEMA.spec.get(key) for key in ("container", "fields", "unique")}
+    urls = [job["url"] for job in source.jobs(pages, sync=False)]
+    latencies: Dict[str, List[float]] = {}
+    failures = 0
+    browsers = 0
+
+    async def call(name: str, arguments: Dict[str, Any]):
+        nonlocal failures
+        started = time.perf_counter()
+        contents = await mcp.call_tool(name, arguments)
+        latencies.setdefault(name, []).append((time.perf_counter() - started) * 1000)
+        failures += contents[0].text.startswith("Error")
+
+    async def session(slot: int):
+        nonlocal browsers
+        session_id = f"bench{slot}"
+        for url in urls[slot::concurrency]:
+            await call("browser_navigate", {"url": url, "session_id": session_id,
+                                            "wait": READY})
+            await call("browser_snapshot", {"session_id": session_id})
+            if "/listing/" in url:
+                await call("browser_extract_schema", dict(schema, session_id=session_id))
+        browsers = max(browsers, sum(p["size"] for p in mcp.sessions.pool_stats().values()))
+        await call("browser_close", {"session_id": session_id})
+
+    from instrumentation import default_instrumentation
+
+    with default_instrumentation().sampler.window() as window:
+        started = time.perf_counter()
+        await asyncio.gather(*(session(slot) for slot in range(concurrency)))
+        wall = time.perf_counter() - started
+    await mcp.sessions.close_all()
+    resources = window.summary() if window else None
+    return {
+        "pages": len(urls),
+        "failures": failures,
+        "wall_s": round(wall, 2),
+        "pages_per_s": round(len(urls) / wall, 2),
+        "tools_ms": {name: summarize(values) for name, values in latencies.items()},
+        "browsers": browsers,
+        "rss_mb_per_browser": round(resources["rss_mb_max"] / browsers, 1)
+        if resources and browsers else None,
+    }
+
+
+def bench_mcp(source: PageSource, pages: int, levels: List[int], **_: Any) -> Dict[str, Any]:
+    if source.replayer is not None:
+        return {"skipped": "the MCP server does not replay archives"}
+    mcp = _load_mcp_server()
+    if mcp is None:
+        return {"skipped": "mcp is not installed"}
+
+    async def run():
+        return {f"c{level}": await _mcp_level(mcp, source, pages, level) for level in levels}
+
+    return asyncio.run(run())
+
+
+BENCHMARKS = {
+    "launch": bench_launch,
+    "browse": bench_browse,
+    "browse_async": bench_browse_async,
+    "mcp": bench_mcp,
+}
+
+
+def _environment() -> Dict[str, Any]:
+    from instrumentation import PSUTIL_AVAILABLE
+    from profile_store import camoufox_version
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True,
+                                text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "camoufox": camoufox_version(),
+        "psutil": PSUTIL_AVAILABLE,
+    }
+
+
+def run(scenarios: List[str], pages: int, levels: List[int], runs: int,
+        replay: Optional[str] = None) -> Dict[str, Any]:
+    """Run the scenarios against a fresh fixture server (or a recording) and return the report."""
+    report: Dict[str, Any] = {"environment": _environment(), "settings": {
+        "scenarios": scenarios, "pages": pages, "concurrency": levels, "launches": runs,
+        "replay": replay,
+    }, "results": {}}
+    with FixtureServer() as server:
+        source = PageSource(server, replay)
+        for name in scenarios:
+            print(f"[{name}] ...", file=sys.stderr, flush=True)
+            started = time.perf_counter()
+            report["results"][name] = BENCHMARKS[name](source, pages=pages, levels=levels, runs=runs)
+            print(f"[{name}] {time.perf_counter() - started:.1f}s", file=sys.stderr)
+        report["fixture_requests"] = server.requests
+    return report
+
+
+# -- comparison ---------------------------------------------------------------
+
+def _metrics(node: Any, prefix: str = "") -> Iterable[Tuple[str, float]]:
+    """Flatten comparable numbers: latencies, throughput and memory."""
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if key not in ("n", "errors", "skipped"):
+                yield from _metrics(value, f"{prefix}.{key}" if prefix else key)
+    elif isinstance(node, (int, float)) and not isinstance(node, bool):
+        yield prefix, float(node)
+
+
+def _higher_is_better(metric: str) -> bool:
+    return metric.endswith("pages_per_s")
+
+
+def _comparable(metric: str) -> bool:
+    leaf = metric.rsplit(".", 1)[-1]
+    return (leaf in ("p50", "p95", "p99", "mean", "pages_per_s", "failures")
+            or leaf.startswith("rss_mb"))
+
+
+def compare(before: Dict[str, Any], after: Dict[str, Any], threshold: float = 0.10) -> List[Dict[str, Any]]:
+    """Metrics whose relative change exceeds threshold, flagged as regressions or improvements."""
+    old = dict(_metrics(before["results"]))
+    changes = []
+    for metric, value in _metrics(after["results"]):
+        if metric not in old or not _comparable(metric):
+            continue
+        base = old[metric]
+        if base == value:
+            continue
+        change = (value - base) / base if base else math.inf
+        if abs(change) < threshold:
+            continue
+        worse = change < 0 if _higher_is_better(metric) else change > 0
+        changes.append({"metric": metric, "before": base, "after": value,
+                        "change": round(change, 3), "regression": worse})
+    return sorted(changes, key=lambda c: (not c["regression"], c["metric"]))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Offline benchmarks against local fixture sites")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run benchmarks and write a JSON report")
+    run_parser.add_argument("--scenarios", "-s", default=",".join(SCENARIOS),
+                            help=f"Comma separated subset of {','.join(SCENARIOS)}")
+    run_parser.add_argument("--pages", "-n", type=int, default=48, help="Pages per throughput scenario")
+    run_parser.add_argument("--concurrency", "-c", default="1,4,8", help="Concurrency levels")
+    run_parser.add_argument("--launches", type=int, default=5, help="Cold launches in the launch scenario")
+    run_parser.add_argument("--replay", help="record_replay archive whose pages are benchmarked instead")
+    run_parser.add_argument("--output", "-o", default="-", help="JSON report path ('-' for stdout)")
+
+    compare_parser = commands.add_parser("compare", help="Compare two JSON reports")
+    compare_parser.add_argument("before")
+    compare_parser.add_argument("after")
+    compare_parser.add_argument("--threshold", type=float, default=0.10,
+                                help="Relative change reported (0.10 = 10%%)")
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+        unknown = set(scenarios) - set(SCENARIOS)
+        if unknown:
+            parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+        levels = [int(level) for level in args.concurrency.split(",")]
+        report = run(scenarios, args.pages, levels, args.launches, args.replay)
+        data = json.dumps(report, indent=2, ensure_ascii=False)
+        if args.output == "-":
+            print(data)
+        else:
+            with open(args.output, "w", encoding="utf-8") as f:
+                f.write(data + "\n")
+        return 0
+
+    with open(args.before, encoding="utf-8") as f:
+        before = json.load(f)
+    with open(args.after, encoding="utf-8") as f:
+        after = json.load(f)
+    changes = compare(before, after, args.threshold)
+    for change in changes:
+        label = "REGRESSION" if change["regression"] else "improved"
+        print(f"{label:10} {change['metric']}: {change['before']:g} -> {change['after']:g} "
+              f"({change['change']:+.0%})")
+    if not changes:
+        print(f"No change beyond {args.threshold:.0%}")
+    return 1 if any(change["regression"] for change in changes) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
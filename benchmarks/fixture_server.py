@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Benchmark Fixture Server
+========================
+Local HTTP server with deterministic synthetic sites, so benchmarks measure
+the browser stack instead of the internet: same pages, same bytes, same
+delays on every run, no rate limits and no bans.
+
+Sites (<i> seeds the content; the same i always renders the same page):
+  /static/<i>    article page: paragraphs, links, a stylesheet and two images
+  /listing/<i>   MercadoLibre-shaped results page: ?items=48 `.poly-card` cards
+                 (img[title], price fraction, link, shipping) with thumbnails
+  /scroll/<i>    infinite scroll: ?batch=12 cards first, then more fetched from
+                 /api/cards as the page scrolls, up to ?total=96
+  /slow/<i>      page whose scripts and images answer after ?delay=800 ms
+  /files/<path>  static files under `root` (recorded fixture sites)
+
+Usage:
+  from fixture_server import FixtureServer
+
+  with FixtureServer() as server:
+      result = browse(server.url("/listing/1"), schema=MERCADOLIBRE_SCHEMA, rate_limiter=None)
+      urls = server.urls("listing", 20)
+
+  # Standalone, to look at the fixtures in a browser
+  python benchmarks/fixture_server.py --port 8800
+"""
+
+import html
+import json
+import mimetypes
+import os
+import random
+import struct
+import threading
+import time
+import zlib
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+KINDS = ("static", "listing", "scroll", "slow")
+
+_WORDS = (
+    "laptop gamer procesador memoria disco pantalla teclado bateria envio gratis "
+    "oferta garantia original nuevo usado color negro plata azul modelo pulgadas "
+    "rendimiento portatil oficina estudiante potente liviano delgado tienda"
+).split()
+
+_STYLE = """
+body { font-family: sans-serif; margin: 0 auto; max-width: 1100px; }
+.ui-search-layout { display: grid; grid-template-columns: repeat(4, 1fr); gap: 12px; list-style: none; }
+.poly-card { border: 1px solid #ddd; border-radius: 6px; padding: 8px; min-height: 300px; }
+.poly-card img { width: 160px; height: 160px; }
+.andes-money-amount__fraction { font-size: 22px; }
+article p { line-height: 1.5; }
+"""
+
+_SCROLL_JS = """
+(() => {
+  const list = document.querySelector('.ui-search-layout');
+  const params = new URLSearchParams(location.search);
+  const total = +(params.get('total') || 96), batch = +(params.get('batch') || 12);
+  const seed = +document.body.dataset.seed;
+  let loading = false;
+  async function more() {
+    const offset = list.children.length;
+    if (loading || offset >= total) return;
+    loading = true;
+    const response = await fetch(`/api/cards?seed=${seed}&offset=${offset}&count=${Math.min(batch, total - offset)}`);
+    list.insertAdjacentHTML('beforeend', (await response.json()).html);
+    loading = false;
+    if (innerHeight + scrollY >= document.body.scrollHeight - 600) more();
+  }
+  addEventListener('scroll', () => {
+    if (innerHeight + scrollY >= document.body.scrollHeight - 600) more();
+  }, {passive: true});
+})();
+"""
+
+
+@lru_cache(maxsize=64)
+def png(seed: int, size: int = 32) -> bytes:
+    """Solid-color PNG, a different color per seed."""
+    rng = random.Random(seed)
+    pixel = bytes(rng.randrange(256) for _ in range(3))
+    raw = b"".join(b"\x00" + pixel * size for _ in range(size))
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    header = struct.pack(">IIBBBBB", size, size, 8, 2, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header)
+            + chunk(b"IDAT", zlib.compress(raw)) + chunk(b"IEND", b""))
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(words)).capitalize()
+
+
+def card(seed: int, index: int) -> str:
+    """One result card, the same for the same (seed, index)."""
+    rng = random.Random(seed * 100003 + index)
+    title = html.escape(f"{_sentence(rng, 6)} #{seed}-{index}")
+    price = f"{rng.randrange(200, 9000) * 1000:,}".replace(",", ".")
+    shipping = '<div class="poly-component__shipping">Envío gratis</div>' if rng.random() < 0.6 else ""
+    return (
+        '<li class="ui-search-layout__item"><div class="poly-card">'
+        f'<div class="poly-card__portada"><img title="{title}" src="/img/{index % 24}.png" alt=""></div>'
+        '<div class="poly-card__content">'
+        f'<h3><a class="poly-component__title" href="/static/{seed * 1000 + index}">{title}</a></h3>'
+        '<div class="poly-component__price"><span class="andes-money-amount">'
+        f'<span class="andes-money-amount__fraction">{price}</span></span></div>'
+        f"{shipping}</div></div></li>"
+    )
+
+
+def _page(title: str, body: str, seed: int = 0, head: str = "") -> str:
+    return (
+        f'<!doctype html><html lang="es"><head><meta charset="utf-8"><title>{html.escape(title)}</title>'
+        f'<link rel="stylesheet" href="/asset/style.css">{head}</head>'
+        f'<body data-seed="{seed}">{body}</body></html>'
+    )
+
+
+def _article(seed: int) -> str:
+    rng = random.Random(seed)
+    paragraphs = "".join(f"<p>{_sentence(rng, rng.randrange(40, 90))}.</p>" for _ in range(12))
+    links = "".join(f'<li><a href="/static/{seed * 10 + k}">{_sentence(rng, 3)}</a></li>' for k in range(20))
+    return (f'<header><h1>Artículo {seed}</h1><img src="/img/{seed % 24}.png" alt=""></header>'
+            f'<article>{paragraphs}<img src="/img/{(seed + 1) % 24}.png" alt=""></article><ul>{links}</ul>')
+
+
+def render_static(seed: int) -> str:
+    return _page(f"Artículo {seed}", _article(seed), seed)
+
+
+def render_listing(seed: int, items: int = 48) -> str:
+    cards = "".join(card(seed, index) for index in range(items))
+    return _page(f"Resultados {seed}", f'<ol class="ui-search-layout">{cards}</ol>', seed)
+
+
+def render_scroll(seed: int, batch: int = 12) -> str:
+    cards = "".join(card(seed, index) for index in range(batch))
+    return _page(
+        f"Scroll {seed}",
+        f'<ol class="ui-search-layout">{cards}</ol><script>{_SCROLL_JS}</script>',
+        seed,
+    )
+
+
+def render_slow(seed: int, delay: int = 800) -> str:
+    assets = "".join(f'<script src="/asset/slow.js?delay={delay}&n={k}"></script>' for k in range(2))
+    images = "".join(f'<img src="/img/{k}.png?delay={delay}" alt="">' for k in range(3))
+    return _page(f"Lenta {seed}", images + _article(seed), seed, head=assets)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "_Server"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args: Any):
+        pass
+
+    def _send(self, body: bytes, content_type: str, status: int = 200):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+        segments = [s for s in parts.path.split("/") if s]
+        self.server.requests += 1
+        if self.server.latency_ms:
+            time.sleep(self.server.latency_ms / 1000)
+        delay = int(query.get("delay", "0"))
+        if delay and segments and segments[0] in ("asset", "img", "api"):
+            time.sleep(delay / 1000)
+        try:
+            self._route(segments, query)
+        except (ValueError, IndexError):
+            self._send(b"not found", "text/plain", 404)
+
+    def _route(self, segments: List[str], query: Dict[str, str]):
+        kind = segments[0] if segments else ""
+        page = "text/html; charset=utf-8"
+        if not segments:
+            links = "".join(f'<li><a href="/{k}/1">{k}</a></li>' for k in KINDS)
+            self._send(_page("Fixtures", f"<ul>{links}</ul>").encode(), page)
+        elif kind == "static":
+            self._send(render_static(int(segments[1])).encode(), page)
+        elif kind == "listing":
+            self._send(render_listing(int(segments[1]), int(query.get("items", "48"))).encode(), page)
+        elif kind == "scroll":
+            self._send(render_scroll(int(segments[1]), int(query.get("batch", "12"))).encode(), page)
+        elif kind == "slow":
+            self._send(render_slow(int(segments[1]), int(query.get("delay", "800"))).encode(), page)
+        elif kind == "api" and segments[1] == "cards":
+            seed, offset, count = (int(query[k]) for k in ("seed", "offset", "count"))
+            cards = "".join(card(seed, index) for index in range(offset, offset + count))
+            self._send(json.dumps({"html": cards}).encode(), "application/json")
+        elif kind == "img":
+            self._send(png(int(segments[1].split(".")[0])), "image/png")
+        elif kind == "asset" and segments[1] == "style.css":
+            self._send(_STYLE.encode(), "text/css")
+        elif kind == "asset" and segments[1] == "slow.js":
+            self._send(f"window.slow{query.get('n', '0')} = true;".encode(), "text/javascript")
+        elif kind == "files" and self.server.root:
+            self._send_file(segments[1:])
+        else:
+            raise ValueError(kind)
+
+    def _send_file(self, segments: List[str]):
+        root = os.path.realpath(self.server.root)
+        path = os.path.realpath(os.path.join(root, *segments))
+        if os.path.isdir(path):
+            path = os.path.join(path, "index.html")
+        if not path.startswith(root + os.sep) or not os.path.isfile(path):
+            raise ValueError(path)
+        with open(path, "rb") as f:
+            body = f.read()
+        self._send(body, mimetypes.guess_type(path)[0] or "application/octet-stream")
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, address, root: Optional[str], latency_ms: int):
+        super().__init__(address, _Handler)
+        self.root = root
+        self.latency_ms = latency_ms
+        self.requests = 0
+
+
+class FixtureServer:
+    """
+    Serves the fixture sites from a background thread.
+
+    Args:
+        host, port: Bind address (port 0: any free port)
+        root: Directory served under /files/ (recorded sites)
+        latency_ms: Delay added to every response (emulates a remote server)
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, root: Optional[str] = None,
+                 latency_ms: int = 0):
+        self._server = _Server((host, port), root, latency_ms)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def requests(self) -> int:
+        return self._server.requests
+
+    def url(self, path: str) -> str:
+        return self.base_url + path
+
+    def urls(self, kind: str, count: int, start: int = 1) -> List[str]:
+        """`count` distinct pages of one fixture kind."""
+        if kind not in KINDS:
+            raise ValueError(f"Unknown fixture kind: {kind} (expected one of {', '.join(KINDS)})")
+        return [self.url(f"/{kind}/{seed}") for seed in range(start, start + count)]
+
+    def start(self) -> "FixtureServer":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._server.serve_forever, name="fixture-server",
+                                            daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+
+    def __enter__(self) -> "FixtureServer":
+        return self.start()
+
+    def __exit__(self, *exc: Any):
+        self.stop()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve the benchmark fixture sites")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--root", help="Directory served under /files/")
+    parser.add_argument("--latency-ms", type=int, default=0, help="Delay added to every response")
+    args = parser.parse_args()
+
+    with FixtureServer(args.host, args.port, args.root, args.latency_ms) as server:
+        print(f"Fixtures at {server.base_url}/ (Ctrl-C to stop)")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
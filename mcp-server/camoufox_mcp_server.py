@@ -27,15 +27,29 @@ Herramientas disponibles:
 - browser_fill: Llenar un campo de texto
 - browser_screenshot: Tomar screenshot
 - browser_extract: Extraer datos de la página
-- browser_close: Cerrar navegador
+- browser_extract_schema: Extracción declarativa en columnas
+- browser_snapshot: Esquema compacto de la página con refs
+- browser_diff: Solo lo que cambió desde el snapshot anterior
+- browser_run_steps: Varias acciones en una sola llamada
+- browser_new_tab: Abrir otra pestaña en la sesión
+- browser_close: Cerrar pestaña o sesión
+- browser_sessions: Listar sesiones abiertas
+
+Sesiones:
+Cada herramienta acepta session_id y tab_id opcionales. Cada sesión es un
+contexto aislado sobre un pool compartido de navegadores; las llamadas a
+sesiones distintas corren en paralelo y las sesiones inactivas se cierran
+tras CAMOUFOX_MCP_SESSION_TTL segundos (900 por defecto).
 """
 
 import asyncio
 import json
 import base64
 import os
-from typing import Optional, Any
-from contextlib import asynccontextmanager
+import sys
+import time
+from typing import Optional, Any, Dict, List, Tuple
+from contextlib import asynccontextmanager, AsyncExitStack
 
 try:
     from mcp.server import Server
@@ -51,45 +65,323 @@ except ImportError:
     print("ERROR: Instalar camoufox con: pip install camoufox[geoip]")
     exit(1)
 
+# Módulos compartidos: src/python del repo o ~/.claude/browser-tools (install.sh)
+sys.path.insert(0, os.path.expanduser("~/.claude/browser-tools"))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "python"))
+
 try:
-    from pyvirtualdisplay import Display
+    from browser_pool import AsyncBrowserPool
+    from display_manager import get_display_manager, display_available
+    from resource_blocking import ResourceBlocker, PRESETS as BLOCK_PRESETS
+    from wait_strategies import track_requests, wait_until_ready_async
+    from proxy_pool import ProxyPool, detect_ban
+    from rate_limit import default_rate_limiter
+    from extraction import Schema, extract_async as extract_schema_async, rows
+    from page_snapshot import (
+        take_snapshot_async, element_for_ref_async, watch_changes_async, take_changes_async,
+    )
 except ImportError:
-    Display = None
+    print("ERROR: No se encuentran los módulos de src/python (copiar a ~/.claude/browser-tools)")
+    exit(1)
+
 
+class Session:
+    """
+    Sesión de navegación: un BrowserContext propio (cookies, storage) sobre
+    un navegador del pool compartido, con una o varias pestañas.
+    """
 
-class BrowserState:
-    def __init__(self):
-        self.browser = None
-        self.page = None
+    def __init__(self, session_id: str, visible: bool):
+        self.id = session_id
+        self.visible = visible
         self.context = None
-        self.display = None
-
-    async def ensure_browser(self, visible: bool = False):
-        if self.browser is None:
-            if not visible and Display:
-                self.display = Display(visible=False, size=(1920, 1080))
-                self.display.start()
-            self.context = AsyncCamoufox(
-                headless=False,
-                humanize=True,
-                i_know_what_im_doing=True
-            )
-            self.browser = await self.context.__aenter__()
-            self.page = await self.browser.new_page()
-        return self.page
+        self.tabs: Dict[str, Any] = {}
+        self.blockers: Dict[str, Any] = {}
+        self.snapshots: Dict[str, Any] = {}
+        self.diffs: Dict[str, Any] = {}
+        self.current_tab: Optional[str] = None
+        self.lock = asyncio.Lock()
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.proxies: Optional[ProxyPool] = None
+        self.proxy = None
+        self._stack = AsyncExitStack()
+        self._tab_counter = 0
+        # Resultado de open(): quien llega mientras se abre la sesión lo espera
+        self.opened: asyncio.Future = asyncio.get_running_loop().create_future()
+
+    async def open(self, pool: AsyncBrowserPool, proxies: Optional[ProxyPool] = None, first_tab: bool = True):
+        """Abre el contexto; sin first_tab no crea la pestaña inicial (browser_new_tab la crea)."""
+        options = {}
+        if proxies is not None:
+            # La sesión conserva su proxy (cookies y IP coherentes) hasta cerrarse
+            self.proxy = await proxies.acquire_async(timeout=PROXY_WAIT_S)
+            self.proxies = proxies
+            self._stack.callback(proxies.release, self.proxy)
+            options["proxy"] = self.proxy.settings()
+        try:
+            self.context = await self._stack.enter_async_context(pool.context(**options))
+        except BaseException:
+            await self._stack.aclose()
+            raise
+        if first_tab:
+            await self.new_tab()
+
+    def report_proxy(self, ok: bool, elapsed: float, status: Optional[int] = None,
+                     title: Optional[str] = None) -> bool:
+        """Puntúa el proxy de la sesión con una navegación; True si hubo bloqueo."""
+        if self.proxy is None:
+            return False
+        banned = ok and detect_ban({"status": status, "title": title})
+        self.proxies.record(self.proxy, ok=ok and not banned, latency=elapsed, banned=banned)
+        return banned
+
+    def touch(self):
+        self.last_used = time.monotonic()
+
+    async def new_tab(self, tab_id: Optional[str] = None) -> str:
+        if tab_id is None:
+            self._tab_counter += 1
+            tab_id = f"t{self._tab_counter}"
+        if tab_id in self.tabs:
+            raise ValueError(f"La pestaña {tab_id} ya existe")
+        page = await self.context.new_page()
+        track_requests(page)
+        self.tabs[tab_id] = page
+        self.current_tab = tab_id
+        return tab_id
+
+    def page(self, tab_id: Optional[str] = None):
+        """Página de la pestaña indicada (o la actual); la deja como actual."""
+        tab_id = tab_id or self.current_tab
+        if tab_id not in self.tabs:
+            raise ValueError(f"Pestaña desconocida: {tab_id} (abiertas: {', '.join(self.tabs) or 'ninguna'})")
+        self.current_tab = tab_id
+        return self.tabs[tab_id]
+
+    async def set_blocker(self, tab_id: str, spec):
+        """Reemplaza el bloqueo de recursos de una pestaña."""
+        page = self.tabs[tab_id]
+        blocker = self.blockers.pop(tab_id, None)
+        if blocker:
+            await blocker.detach_async(page)
+        blocker = ResourceBlocker.from_spec(spec)
+        if blocker:
+            await blocker.attach_async(page)
+            self.blockers[tab_id] = blocker
+
+    async def close_tab(self, tab_id: str):
+        page = self.tabs.pop(tab_id)
+        self.blockers.pop(tab_id, None)
+        self.snapshots.pop(tab_id, None)
+        self.diffs.pop(tab_id, None)
+        await page.close()
+        if self.current_tab == tab_id:
+            self.current_tab = next(reversed(list(self.tabs)), None)
 
     async def close(self):
-        if self.context:
-            await self.context.__aexit__(None, None, None)
-        if self.display:
-            self.display.stop()
-        self.browser = None
-        self.page = None
-        self.context = None
-        self.display = None
+        self.tabs.clear()
+        self.blockers.clear()
+        self.snapshots.clear()
+        self.diffs.clear()
+        self.current_tab = None
+        await self._stack.aclose()
 
+    async def describe(self) -> Dict[str, Any]:
+        tabs = {}
+        for tab_id, page in self.tabs.items():
+            try:
+                title = await page.title()
+            except Exception:
+                title = None
+            tabs[tab_id] = {"url": page.url, "title": title}
+        return {
+            "session_id": self.id,
+            "visible": self.visible,
+            "current_tab": self.current_tab,
+            "tabs": tabs,
+            "proxy": self.proxy.server if self.proxy else None,
+            "idle_s": round(time.monotonic() - self.last_used),
+        }
+
+
+class SessionManager:
+    """
+    Sesiones con nombre sobre pools de navegadores compartidos (uno por
+    visibilidad). Cada sesión tiene su propio lock: las llamadas a sesiones
+    distintas corren en paralelo, las de una misma sesión en orden.
+    Las sesiones sin uso durante idle_timeout segundos se cierran solas.
+    """
+
+    def __init__(
+        self,
+        idle_timeout: float = 900.0,
+        max_browsers: int = 2,
+        contexts_per_browser: int = 8,
+        proxies: Optional[ProxyPool] = None,
+    ):
+        self.idle_timeout = idle_timeout
+        self.proxies = proxies
+        self.max_browsers = max_browsers
+        self.contexts_per_browser = contexts_per_browser
+        self.sessions: Dict[str, Session] = {}
+        self._pools: Dict[bool, AsyncBrowserPool] = {}
+        self._lock = asyncio.Lock()
+        self._reaper: Optional[asyncio.Task] = None
+
+    def _pool(self, visible: bool) -> AsyncBrowserPool:
+        if visible not in self._pools:
+            self._pools[visible] = AsyncBrowserPool(
+                min_size=0,
+                max_size=self.max_browsers,
+                contexts_per_browser=self.contexts_per_browser,
+                visible=visible or not display_available(),
+            )
+        return self._pools[visible]
+
+    async def get(self, session_id: str, create: bool = False, visible: bool = False,
+                  first_tab: bool = True) -> Optional[Session]:
+        async with self._lock:
+            session = self.sessions.get(session_id)
+            if session is None and not create:
+                return None
+            opening = session is None
+            if opening:
+                # Registrada ya, pero bloqueada hasta abrir su contexto: otras
+                # llamadas a la misma sesión esperan sin frenar a las demás
+                session = self.sessions[session_id] = Session(session_id, visible)
+                await session.lock.acquire()
+        if not opening:
+            # Si la apertura falla, quien esperaba recibe el mismo error
+            await asyncio.shield(session.opened)
+            return session
+        try:
+            await session.open(self._pool(visible), self.proxies, first_tab=first_tab)
+        except BaseException as e:
+            self.sessions.pop(session_id, None)
+            error = e if isinstance(e, Exception) else RuntimeError(f"Apertura de la sesión {session_id} cancelada")
+            session.opened.set_exception(error)
+            session.opened.exception()  # marcada como leída aunque nadie espere
+            raise
+        else:
+            session.opened.set_result(None)
+        finally:
+            session.lock.release()
+        if self._reaper is None and self.idle_timeout:
+            self._reaper = asyncio.ensure_future(self._reap_loop())
+        return session
+
+    async def close(self, session_id: str) -> bool:
+        async with self._lock:
+            session = self.sessions.pop(session_id, None)
+        if session is None:
+            return False
+        async with session.lock:
+            await session.close()
+        return True
+
+    async def collect_idle(self) -> List[str]:
+        """Cierra las sesiones inactivas (que no estén ejecutando una herramienta)."""
+        now = time.monotonic()
+        idle = [
+            s.id for s in list(self.sessions.values())
+            if not s.lock.locked() and now - s.last_used >= self.idle_timeout
+        ]
+        for session_id in idle:
+            await self.close(session_id)
+        return idle
+
+    async def _reap_loop(self):
+        interval = max(1.0, min(self.idle_timeout / 2, 60.0))
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.collect_idle()
+            except Exception:
+                pass
+
+    def pool_stats(self) -> Dict[str, Any]:
+        return {
+            ("visible" if visible else "background"): pool.stats()
+            for visible, pool in self._pools.items()
+        }
 
-state = BrowserState()
+    async def close_all(self):
+        if self._reaper is not None:
+            self._reaper.cancel()
+            self._reaper = None
+        for session_id in list(self.sessions):
+            await self.close(session_id)
+        for pool in self._pools.values():
+            await pool.close()
+        self._pools.clear()
+
+
+# Condiciones de espera por defecto tras cada acción: (condiciones, tope en ms).
+# Reemplazan los sleeps fijos; terminan en cuanto la página está lista.
+DEFAULT_WAITS = {
+    "browser_navigate": ("network_quiet:500/2,dom_quiet:300", 3000),
+    "browser_click": ("dom_quiet:200", 2000),
+    "browser_press": ("dom_quiet:200", 2000),
+    "browser_scroll": ("dom_quiet:150", 1000),
+}
+
+WAIT_SCHEMA = {
+    "wait": {
+        "type": "string",
+        "description": "Condiciones de espera tras la acción, separadas por coma: "
+                       "selector:CSS, dom_quiet:MS, network_quiet:MS[/MAX_EN_VUELO], load:ESTADO, sleep:MS, js:EXPR. "
+                       "Vacío = no esperar"
+    },
+    "wait_timeout": {
+        "type": "integer",
+        "description": "Tope de la espera en milisegundos"
+    }
+}
+
+
+async def settle(page, tool: str, arguments: dict) -> dict:
+    """
+    Espera a que la página esté lista según `wait` o el default de la herramienta.
+    El resultado queda en arguments["_ready"] para que run_step lo verifique.
+    """
+    conditions, timeout = DEFAULT_WAITS[tool]
+    conditions = arguments.get("wait", conditions)
+    timeout = arguments.get("wait_timeout", timeout)
+    ready = await wait_until_ready_async(page, conditions, timeout=timeout)
+    arguments["_ready"] = ready
+    return ready
+
+
+SESSION_SCHEMA = {
+    "session_id": {
+        "type": "string",
+        "description": "Sesión (contexto aislado con sus cookies y pestañas). Por defecto: \"default\""
+    },
+    "tab_id": {
+        "type": "string",
+        "description": "Pestaña de la sesión (ej: \"t2\"). Por defecto: la pestaña actual"
+    }
+}
+
+REF_SCHEMA = {
+    "ref": {
+        "type": "string",
+        "description": "Ref de browser_snapshot (ej: \"e12\"), alternativa a selector"
+    }
+}
+
+DEFAULT_SESSION = "default"
+
+# Con proxies, una sesión nueva espera hasta este tope a que haya uno libre
+PROXY_WAIT_S = float(os.environ.get("CAMOUFOX_MCP_PROXY_WAIT", "60"))
+
+sessions = SessionManager(
+    idle_timeout=float(os.environ.get("CAMOUFOX_MCP_SESSION_TTL", "900")),
+    max_browsers=int(os.environ.get("CAMOUFOX_MCP_BROWSERS", "2")),
+    contexts_per_browser=int(os.environ.get("CAMOUFOX_MCP_CONTEXTS", "8")),
+    proxies=ProxyPool.from_env(max_per_proxy=int(os.environ.get("CAMOUFOX_MCP_SESSIONS_PER_PROXY", "2"))),
+)
 server = Server("camoufox-browser")
 
 
@@ -116,23 +408,31 @@ async def list_tools():
                         "type": "string",
                         "description": "Evento de espera: domcontentloaded, load, networkidle",
                         "default": "domcontentloaded"
-                    }
+                    },
+                    "block": {
+                        "type": "string",
+                        "description": "Recursos a bloquear: " + ", ".join(BLOCK_PRESETS) + " (separados por coma). Vacío = sin bloqueo. Si se omite se mantiene el bloqueo actual."
+                    },
+                    **WAIT_SCHEMA,
+                    **SESSION_SCHEMA
                 },
                 "required": ["url"]
             }
         ),
         Tool(
             name="browser_click",
-            description="Hacer click en un elemento usando selector CSS",
+            description="Hacer click en un elemento usando selector CSS o ref de browser_snapshot",
             inputSchema={
                 "type": "object",
                 "properties": {
                     "selector": {
                         "type": "string",
                         "description": "Selector CSS del elemento (ej: '#boton', '.clase', 'button')"
-                    }
-                },
-                "required": ["selector"]
+                    },
+                    **REF_SCHEMA,
+                    **WAIT_SCHEMA,
+                    **SESSION_SCHEMA
+                }
             }
         ),
         Tool(
@@ -148,9 +448,11 @@ async def list_tools():
                     "value": {
                         "type": "string",
                         "description": "Texto a escribir"
-                    }
+                    },
+                    **REF_SCHEMA,
+                    **SESSION_SCHEMA
                 },
-                "required": ["selector", "value"]
+                "required": ["value"]
             }
         ),
         Tool(
@@ -166,14 +468,17 @@ async def list_tools():
                     "key": {
                         "type": "string",
                         "description": "Tecla a presionar (Enter, Tab, Escape, ArrowDown, etc.)"
-                    }
+                    },
+                    **REF_SCHEMA,
+                    **WAIT_SCHEMA,
+                    **SESSION_SCHEMA
                 },
-                "required": ["selector", "key"]
+                "required": ["key"]
             }
         ),
         Tool(
             name="browser_screenshot",
-            description="Tomar screenshot de la página actual",
+            description="Tomar screenshot de la página actual (a archivo o inline como JPEG)",
             inputSchema={
                 "type": "object",
                 "properties": {
@@ -185,7 +490,18 @@ async def list_tools():
                         "type": "boolean",
                         "description": "Capturar página completa o solo viewport",
                         "default": False
-                    }
+                    },
+                    "inline": {
+                        "type": "boolean",
+                        "description": "Devolver la imagen en la respuesta (JPEG) en vez de guardarla",
+                        "default": False
+                    },
+                    "quality": {
+                        "type": "integer",
+                        "description": "Calidad JPEG para inline (1-100)",
+                        "default": 60
+                    },
+                    **SESSION_SCHEMA
                 }
             }
         ),
@@ -198,21 +514,120 @@ async def list_tools():
                     "script": {
                         "type": "string",
                         "description": "Código JavaScript que retorna los datos a extraer"
-                    }
+                    },
+                    **SESSION_SCHEMA
                 },
                 "required": ["script"]
             }
         ),
+        Tool(
+            name="browser_extract_schema",
+            description=(
+                "Extraer registros repetidos con un esquema declarativo (contenedor + campos). "
+                "Un solo recorrido del DOM; devuelve columnas compactas {campo: [valores]}"
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "container": {
+                        "type": "string",
+                        "description": "Selector CSS de cada registro (ej: '.product-card')"
+                    },
+                    "fields": {
+                        "type": "object",
+                        "description": (
+                            "Campos: nombre -> 'selector' (texto), 'selector@atributo', '@atributo' "
+                            "(del contenedor) u objeto {selector, attr, prop, source, transform, "
+                            "required, all, default}. Transforms: trim, collapse, digits, int, "
+                            "float, lower, upper"
+                        )
+                    },
+                    "unique": {
+                        "type": "string",
+                        "description": "Campo para descartar registros duplicados"
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "description": "Máximo de registros"
+                    },
+                    "format": {
+                        "type": "string",
+                        "enum": ["columns", "rows"],
+                        "description": "columns (por defecto, más compacto) o rows (un objeto por registro)"
+                    },
+                    **SESSION_SCHEMA
+                },
+                "required": ["fields"]
+            }
+        ),
         Tool(
             name="browser_get_content",
-            description="Obtener el contenido de texto de la página o un elemento",
+            description="Obtener el contenido de texto de la página o un elemento, por tramos (offset)",
             inputSchema={
                 "type": "object",
                 "properties": {
                     "selector": {
                         "type": "string",
                         "description": "Selector CSS (opcional, usa 'body' si no se especifica)"
-                    }
+                    },
+                    "offset": {
+                        "type": "integer",
+                        "description": "Carácter desde el que leer (el siguiente offset viene en la respuesta)",
+                        "default": 0
+                    },
+                    "max_chars": {
+                        "type": "integer",
+                        "description": "Caracteres máximos por respuesta",
+                        "default": 5000
+                    },
+                    **SESSION_SCHEMA
+                }
+            }
+        ),
+        Tool(
+            name="browser_snapshot",
+            description="Esquema compacto de la página: títulos, regiones, elementos interactivos con ref "
+                        "(usable en click/fill/press), resumen de enlaces y formularios. Paginado con cursor.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "cursor": {
+                        "type": "integer",
+                        "description": "Posición desde la que continuar (next_cursor de la respuesta anterior)",
+                        "default": 0
+                    },
+                    "max_chars": {
+                        "type": "integer",
+                        "description": "Tamaño máximo del tramo",
+                        "default": 4000
+                    },
+                    "links": {
+                        "type": "boolean",
+                        "description": "Incluir cada enlace en el esquema (siempre se resumen)",
+                        "default": True
+                    },
+                    **SESSION_SCHEMA
+                }
+            }
+        ),
+        Tool(
+            name="browser_diff",
+            description="Solo los nodos agregados (+), cambiados (~) o eliminados (-) desde el snapshot o diff "
+                        "anterior de la pestaña. Tras navegar devuelve un snapshot completo como nueva base.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "cursor": {
+                        "type": "integer",
+                        "description": "Posición desde la que continuar el mismo diff (next_cursor)",
+                        "default": 0
+                    },
+                    "max_chars": {
+                        "type": "integer",
+                        "description": "Tamaño máximo del tramo",
+                        "default": 4000
+                    },
+                    **SESSION_SCHEMA
                 }
             }
         ),
@@ -225,14 +640,16 @@ async def list_tools():
                     "y": {
                         "type": "integer",
                         "description": "Pixels a hacer scroll hacia abajo (negativo = arriba)"
-                    }
+                    },
+                    **WAIT_SCHEMA,
+                    **SESSION_SCHEMA
                 },
                 "required": ["y"]
             }
         ),
         Tool(
             name="browser_wait",
-            description="Esperar un tiempo o hasta que aparezca un elemento",
+            description="Esperar un tiempo, un elemento o condiciones de la página (DOM estable, red inactiva, JS)",
             inputSchema={
                 "type": "object",
                 "properties": {
@@ -243,21 +660,93 @@ async def list_tools():
                     "selector": {
                         "type": "string",
                         "description": "Selector CSS a esperar (alternativa a milliseconds)"
-                    }
+                    },
+                    "condition": {
+                        "type": "string",
+                        "description": "Condiciones separadas por coma: selector:CSS, dom_quiet:MS, network_quiet:MS[/MAX_EN_VUELO], load:ESTADO, js:EXPR"
+                    },
+                    "timeout": {
+                        "type": "integer",
+                        "description": "Tope en milisegundos para selector/condition",
+                        "default": 10000
+                    },
+                    **SESSION_SCHEMA
+                }
+            }
+        ),
+        Tool(
+            name="browser_run_steps",
+            description="Ejecutar varias acciones en orden en una sola llamada (navigate, click, fill, press, "
+                        "scroll, wait, extract, get_content, screenshot...). Devuelve tiempo y salida de cada paso.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "steps": {
+                        "type": "array",
+                        "description": "Pasos en orden. Cada paso: {\"action\": \"click\", ...argumentos de la "
+                                       "herramienta browser_<action>}; admite además wait/wait_timeout "
+                                       "y continue_on_error",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "action": {"type": "string"}
+                            },
+                            "required": ["action"]
+                        }
+                    },
+                    "stop_on_error": {
+                        "type": "boolean",
+                        "description": "Detenerse en el primer paso que falle",
+                        "default": True
+                    },
+                    "visible": {
+                        "type": "boolean",
+                        "description": "Solo al crear la sesión: True para ver el navegador",
+                        "default": False
+                    },
+                    **SESSION_SCHEMA
+                },
+                "required": ["steps"]
+            }
+        ),
+        Tool(
+            name="browser_new_tab",
+            description="Abrir una pestaña nueva en la sesión (la crea si no existe) y dejarla como actual",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "url": {
+                        "type": "string",
+                        "description": "URL a abrir en la pestaña nueva (opcional)"
+                    },
+                    "visible": {
+                        "type": "boolean",
+                        "description": "Solo al crear la sesión: True para ver el navegador",
+                        "default": False
+                    },
+                    **SESSION_SCHEMA
                 }
             }
         ),
         Tool(
             name="browser_close",
-            description="Cerrar el navegador",
+            description="Cerrar una pestaña (si se indica tab_id) o la sesión completa",
             inputSchema={
                 "type": "object",
-                "properties": {}
+                "properties": {**SESSION_SCHEMA}
             }
         ),
         Tool(
             name="browser_status",
-            description="Obtener estado actual del navegador (URL, título, etc.)",
+            description="Obtener estado actual de la sesión (URL, título, pestañas, etc.)",
+            inputSchema={
+                "type": "object",
+                "properties": {**SESSION_SCHEMA}
+            }
+        ),
+        Tool(
+            name="browser_sessions",
+            description="Listar las sesiones abiertas con sus pestañas y la ocupación de los navegadores",
             inputSchema={
                 "type": "object",
                 "properties": {}
@@ -266,112 +755,394 @@ async def list_tools():
     ]
 
 
+
+def text(message: str) -> list:
+    return [TextContent(type="text", text=message)]
+
+
+async def tool_navigate(session: Session, arguments: dict) -> list:
+    page = session.page(arguments.get("tab_id"))
+    tab_id = session.current_tab
+    url = arguments["url"]
+    wait_until = arguments.get("wait_until", "domcontentloaded")
+    if "block" in arguments:
+        await session.set_blocker(tab_id, arguments["block"])
+    elif tab_id in session.blockers:
+        session.blockers[tab_id].reset()
+    # Límite por dominio compartido con browse()/browse_many() del mismo proceso
+    limiter = default_rate_limiter()
+    waited = 0.0
+    started = None
+    navigated = False
+    try:
+        if limiter:
+            waited = await limiter.acquire_async(url)
+        started = time.monotonic()
+        response = await page.goto(url, wait_until=wait_until)
+        navigated = True
+        ready = await settle(page, "browser_navigate", arguments)
+        title = await page.title()
+    except BaseException:
+        # Sin started, acquire_async() se interrumpió y ya liberó su turno
+        if started is not None:
+            if not navigated:
+                session.report_proxy(False, time.monotonic() - started)
+            if limiter:
+                limiter.report(url, ok=None)
+        raise
+    status = response.status if response else None
+    banned = session.report_proxy(True, time.monotonic() - started, status, title)
+    if limiter:
+        banned = limiter.report(url, ok=True, status=status, title=title) or banned
+    message = f"Navegado a: {url}\nTítulo: {title}\nListo en: {ready['elapsed_ms']}ms"
+    if waited >= 1:
+        message += f"\nEspera por límite de tasa del dominio: {waited:.1f}s"
+    if session.proxy:
+        message += f"\nProxy: {session.proxy.server}"
+    if banned and session.proxy:
+        message += (f"\nAVISO: el sitio bloqueó este proxy (status {status}). Cierra la sesión "
+                    "con browser_close y ábrela de nuevo para continuar con otro proxy.")
+    elif banned:
+        message += (f"\nAVISO: el sitio parece bloquear la navegación (status {status}); "
+                    "el ritmo hacia este dominio se redujo automáticamente.")
+    if tab_id in session.blockers:
+        message += f"\nBloqueados: {json.dumps(session.blockers[tab_id].stats(), ensure_ascii=False)}"
+    return text(message)
+
+
+async def on_target(page, arguments: dict, method: str, *args) -> str:
+    """page.<method>(selector, ...) o el mismo método sobre el elemento de `ref`."""
+    if arguments.get("ref"):
+        handle = await element_for_ref_async(page, arguments["ref"])
+        await getattr(handle, method)(*args)
+        return arguments["ref"]
+    if not arguments.get("selector"):
+        raise ValueError("Especifica selector o ref")
+    await getattr(page, method)(arguments["selector"], *args)
+    return arguments["selector"]
+
+
+async def tool_click(session: Session, arguments: dict) -> list:
+    page = session.page(arguments.get("tab_id"))
+    target = await on_target(page, arguments, "click")
+    await settle(page, "browser_click", arguments)
+    return text(f"Click realizado en: {target}")
+
+
+async def tool_fill(session: Session, arguments: dict) -> list:
+    page = session.page(arguments.get("tab_id"))
+    value = arguments["value"]
+    target = await on_target(page, arguments, "fill", value)
+    return text(f"Campo {target} llenado con: {value}")
+
+
+async def tool_press(session: Session, arguments: dict) -> list:
+    page = session.page(arguments.get("tab_id"))
+    key = arguments["key"]
+    target = await on_target(page, arguments, "press", key)
+    await settle(page, "browser_press", arguments)
+    return text(f"Tecla {key} presionada en {target}")
+
+
+async def tool_screenshot(session: Session, arguments: dict) -> list:
+    page = session.page(arguments.get("tab_id"))
+    full_page = arguments.get("full_page", False)
+    if arguments.get("inline"):
+        data = await page.screenshot(type="jpeg", quality=arguments.get("quality", 60), full_page=full_page)
+        return [ImageContent(type="image", data=base64.b64encode(data).decode("ascii"), mimeType="image/jpeg")]
+    path = arguments.get("path", f"/tmp/mcp_screenshot_{session.id}_{session.current_tab}.png")
+    await page.screenshot(path=path, full_page=full_page)
+    return text(f"Screenshot guardado en: {path}")
+
+
+async def tool_extract(session: Session, arguments: dict) -> list:
+    page = session.page(arguments.get("tab_id"))
+    result = await page.evaluate(arguments["script"])
+    return text(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+async def tool_extract_schema(session: Session, arguments: dict) -> list:
+    page = session.page(arguments.get("tab_id"))
+    schema = Schema({key: arguments.get(key) for key in ("container", "fields", "unique", "limit")})
+    data = await extract_schema_async(page, schema)
+    if arguments.get("format") == "rows":
+        data["rows"] = list(rows(data))
+        del data["columns"]
+    return text(json.dumps(data, ensure_ascii=False, separators=(",", ":")))
+
+
+async def tool_get_content(session: Session, arguments: dict) -> list:
+    page = session.page(arguments.get("tab_id"))
+    selector = arguments.get("selector", "body")
+    offset = max(0, arguments.get("offset", 0))
+    max_chars = arguments.get("max_chars", 5000)
+    content = await page.inner_text(selector)
+    end = min(len(content), offset + max_chars)
+    if offset == 0 and end == len(content):
+        return text(content)
+    footer = f"\n[caracteres {offset}-{end} de {len(content)}"
+    footer += f"; continuar con offset={end}]" if end < len(content) else "; fin]"
+    return text(content[offset:end] + footer)
+
+
+async def render_snapshot(session: Session, page, cursor: int, max_chars: int, links: bool = True, **extra) -> list:
+    """Tramo del snapshot de la pestaña actual; cursor 0 toma uno nuevo."""
+    tab_id = session.current_tab
+    snapshot = session.snapshots.get(tab_id)
+    # Los tramos siguientes salen del mismo snapshot para que el cursor sea coherente
+    if cursor == 0 or snapshot is None or snapshot.url != page.url:
+        # El snapshot es la base de browser_diff: el registro de cambios se
+        # reinicia antes de tomarlo para no perder mutaciones entre ambos
+        await watch_changes_async(page)
+        snapshot = await take_snapshot_async(page, links=links)
+        session.snapshots[tab_id] = snapshot
+        cursor = 0 if cursor >= len(snapshot.lines) else cursor
+    chunk = snapshot.chunk(cursor, max_chars)
+    header = {"snapshot_id": chunk["snapshot_id"], "cursor": chunk["cursor"],
+              "next_cursor": chunk["next_cursor"], "total": chunk["total"], **extra}
+    if chunk["cursor"] == 0:
+        header["summary"] = snapshot.summary()
+    return text(json.dumps(header, ensure_ascii=False) + "\n" + "\n".join(chunk["lines"]))
+
+
+async def tool_snapshot(session: Session, arguments: dict) -> list:
+    page = session.page(arguments.get("tab_id"))
+    return await render_snapshot(
+        session, page, arguments.get("cursor", 0), arguments.get("max_chars", 4000),
+        links=arguments.get("links", True),
+    )
+
+
+async def tool_diff(session: Session, arguments: dict) -> list:
+    page = session.page(arguments.get("tab_id"))
+    tab_id = session.current_tab
+    cursor = arguments.get("cursor", 0)
+    max_chars = arguments.get("max_chars", 4000)
+    changes = session.diffs.get(tab_id)
+    if cursor == 0 or changes is None:
+        changes = await take_changes_async(page)
+        if changes is None:
+            # Documento nuevo (o sin base): snapshot completo como base
+            session.diffs.pop(tab_id, None)
+            return await render_snapshot(session, page, 0, max_chars, baseline=True)
+        session.diffs[tab_id] = changes
+        cursor = 0
+    chunk = changes.chunk(cursor, max_chars)
+    header = {"seq": chunk["seq"], "cursor": chunk["cursor"],
+              "next_cursor": chunk["next_cursor"], "total": chunk["total"]}
+    if chunk["cursor"] == 0:
+        header["summary"] = changes.summary()
+    if changes.empty:
+        return text(json.dumps(header, ensure_ascii=False) + "\nSin cambios")
+    return text(json.dumps(header, ensure_ascii=False) + "\n" + "\n".join(chunk["lines"]))
+
+
+async def tool_scroll(session: Session, arguments: dict) -> list:
+    page = session.page(arguments.get("tab_id"))
+    y = arguments["y"]
+    await page.evaluate(f"window.scrollBy(0, {y})")
+    await settle(page, "browser_scroll", arguments)
+    return text(f"Scroll realizado: {y}px")
+
+
+async def tool_wait(session: Session, arguments: dict) -> list:
+    page = session.page(arguments.get("tab_id"))
+    if "milliseconds" in arguments:
+        ms = arguments["milliseconds"]
+        await asyncio.sleep(ms / 1000)
+        return text(f"Esperado {ms}ms")
+    elif "selector" in arguments:
+        selector = arguments["selector"]
+        await page.wait_for_selector(selector, timeout=arguments.get("timeout", 10000))
+        return text(f"Elemento encontrado: {selector}")
+    elif "condition" in arguments:
+        ready = await wait_until_ready_async(
+            page, arguments["condition"], timeout=arguments.get("timeout", 10000)
+        )
+        return text(json.dumps(ready, ensure_ascii=False))
+    return text("Especifica milliseconds, selector o condition")
+
+
+async def tool_new_tab(session: Session, arguments: dict) -> list:
+    tab_id = await session.new_tab(arguments.get("tab_id"))
+    message = f"Pestaña abierta: {tab_id} (sesión {session.id})"
+    if arguments.get("url"):
+        page = session.page(tab_id)
+        await page.goto(arguments["url"], wait_until="domcontentloaded")
+        await settle(page, "browser_navigate", arguments)
+        message += f"\nNavegado a: {arguments['url']}\nTítulo: {await page.title()}"
+    return text(message)
+
+
+async def tool_status(session: Session, arguments: dict) -> list:
+    page = session.page(arguments.get("tab_id"))
+    url = page.url
+    title = await page.title()
+    tabs = ", ".join(session.tabs)
+    displays = json.dumps(get_display_manager().health(), ensure_ascii=False)
+    return text(
+        f"Sesión: {session.id}\nPestaña: {session.current_tab} (abiertas: {tabs})\n"
+        f"URL: {url}\nTítulo: {title}\nEstado: Activo\nDisplays: {displays}"
+    )
+
+
+async def tool_close(arguments: dict) -> list:
+    session_id = arguments.get("session_id", DEFAULT_SESSION)
+    tab_id = arguments.get("tab_id")
+    session = await sessions.get(session_id)
+    if session is None:
+        return text(f"Sesión {session_id} no existe")
+    if tab_id and len(session.tabs) > 1:
+        async with session.lock:
+            await session.close_tab(tab_id)
+        return text(f"Pestaña {tab_id} cerrada (sesión {session_id})")
+    await sessions.close(session_id)
+    return text(f"Sesión {session_id} cerrada")
+
+
+async def tool_sessions(arguments: dict) -> list:
+    listing = {
+        "sessions": [await s.describe() for s in list(sessions.sessions.values())],
+        "pools": sessions.pool_stats(),
+        "proxies": sessions.proxies.stats() if sessions.proxies else None,
+        "rate_limits": default_rate_limiter().stats() if default_rate_limiter() else None,
+        "idle_timeout_s": sessions.idle_timeout,
+    }
+    return text(json.dumps(listing, ensure_ascii=False, indent=2))
+
+
+async def run_step(session: Session, step: dict, defaults: dict) -> Tuple[str, list]:
+    """
+    Ejecuta un paso de browser_run_steps con el handler de su herramienta.
+    Devuelve el texto del paso y sus imágenes (capturas inline) por separado.
+    """
+    action = step.get("action", "")
+    tool = action if action.startswith("browser_") else f"browser_{action}"
+    if tool not in STEP_TOOLS:
+        raise ValueError(f"Acción desconocida: {action} (disponibles: {', '.join(sorted(STEP_TOOLS))})")
+    arguments = {**defaults, **step}
+    contents = await STEP_TOOLS[tool](session, arguments)
+    if step.get("wait"):
+        # La espera del paso es obligatoria: si no se cumple, el lote se detiene
+        ready = arguments.get("_ready")
+        if ready is None:
+            page = session.page(arguments.get("tab_id"))
+            ready = await wait_until_ready_async(page, step["wait"], timeout=step.get("wait_timeout", 5000))
+        if not ready["ready"]:
+            raise TimeoutError(f"Espera no cumplida ({ready['timed_out']}): {ready['error']}")
+    output = "\n".join(c.text for c in contents if isinstance(c, TextContent))
+    return output, [c for c in contents if isinstance(c, ImageContent)]
+
+
+async def tool_run_steps(session: Session, arguments: dict) -> list:
+    steps = arguments["steps"]
+    stop_on_error = arguments.get("stop_on_error", True)
+    defaults = {"tab_id": arguments["tab_id"]} if "tab_id" in arguments else {}
+    started = time.monotonic()
+    report = []
+    images = []
+    for index, step in enumerate(steps):
+        step_started = time.monotonic()
+        entry: Dict[str, Any] = {"index": index, "action": step.get("action")}
+        try:
+            entry["output"], step_images = await run_step(session, step, defaults)
+            if step_images:
+                # Las imágenes van tras el resumen, en el orden de los pasos
+                entry["images"] = len(step_images)
+                images.extend(step_images)
+            entry["ok"] = True
+        except Exception as e:
+            entry["ok"] = False
+            entry["error"] = str(e).splitlines()[0] if str(e) else type(e).__name__
+        entry["elapsed_ms"] = round((time.monotonic() - step_started) * 1000)
+        entry["tab_id"] = session.current_tab
+        report.append(entry)
+        # Un paso que cambia de pestaña fija la pestaña de los siguientes
+        defaults = {"tab_id": session.current_tab} if session.current_tab else {}
+        if not entry["ok"] and stop_on_error and not step.get("continue_on_error"):
+            break
+    summary = {
+        "ok": all(e["ok"] for e in report) and len(report) == len(steps),
+        "completed": sum(e["ok"] for e in report),
+        "total": len(steps),
+        "elapsed_ms": round((time.monotonic() - started) * 1000),
+        "steps": report,
+    }
+    return text(json.dumps(summary, ensure_ascii=False, indent=2)) + images
+
+
+# Herramientas que operan sobre una sesión: (función, crea la sesión si no existe)
+SESSION_TOOLS = {
+    "browser_navigate": (tool_navigate, True),
+    "browser_new_tab": (tool_new_tab, True),
+    "browser_click": (tool_click, False),
+    "browser_fill": (tool_fill, False),
+    "browser_press": (tool_press, False),
+    "browser_screenshot": (tool_screenshot, False),
+    "browser_extract": (tool_extract, False),
+    "browser_extract_schema": (tool_extract_schema, False),
+    "browser_get_content": (tool_get_content, False),
+    "browser_snapshot": (tool_snapshot, False),
+    "browser_diff": (tool_diff, False),
+    "browser_scroll": (tool_scroll, False),
+    "browser_wait": (tool_wait, False),
+    "browser_status": (tool_status, False),
+    "browser_run_steps": (tool_run_steps, True),
+}
+
+# Acciones disponibles como pasos de browser_run_steps
+STEP_TOOLS = {
+    name: handler for name, (handler, _) in SESSION_TOOLS.items()
+    if name != "browser_run_steps"
+}
+
+# Herramientas sobre el conjunto de sesiones
+MANAGER_TOOLS = {
+    "browser_close": tool_close,
+    "browser_sessions": tool_sessions,
+}
+
+
 @server.call_tool()
 async def call_tool(name: str, arguments: dict) -> list:
-    """Ejecutar una herramienta"""
+    """Ejecutar una herramienta en su sesión (en paralelo con otras sesiones)"""
     try:
-        if name == "browser_navigate":
-            page = await state.ensure_browser(arguments.get("visible", False))
-            url = arguments["url"]
-            wait_until = arguments.get("wait_until", "domcontentloaded")
-            await page.goto(url, wait_until=wait_until)
-            await asyncio.sleep(1)  # Pequeña espera para estabilidad
-            title = await page.title()
-            return [TextContent(type="text", text=f"Navegado a: {url}\nTítulo: {title}")]
-
-        elif name == "browser_click":
-            if state.page is None:
-                return [TextContent(type="text", text="Error: Navegador no inicializado. Usa browser_navigate primero.")]
-            selector = arguments["selector"]
-            await state.page.click(selector)
-            await asyncio.sleep(0.5)
-            return [TextContent(type="text", text=f"Click realizado en: {selector}")]
-
-        elif name == "browser_fill":
-            if state.page is None:
-                return [TextContent(type="text", text="Error: Navegador no inicializado.")]
-            selector = arguments["selector"]
-            value = arguments["value"]
-            await state.page.fill(selector, value)
-            return [TextContent(type="text", text=f"Campo {selector} llenado con: {value}")]
-
-        elif name == "browser_press":
-            if state.page is None:
-                return [TextContent(type="text", text="Error: Navegador no inicializado.")]
-            selector = arguments["selector"]
-            key = arguments["key"]
-            await state.page.press(selector, key)
-            await asyncio.sleep(0.5)
-            return [TextContent(type="text", text=f"Tecla {key} presionada en {selector}")]
-
-        elif name == "browser_screenshot":
-            if state.page is None:
-                return [TextContent(type="text", text="Error: Navegador no inicializado.")]
-            path = arguments.get("path", "/tmp/mcp_screenshot.png")
-            full_page = arguments.get("full_page", False)
-            await state.page.screenshot(path=path, full_page=full_page)
-            return [TextContent(type="text", text=f"Screenshot guardado en: {path}")]
-
-        elif name == "browser_extract":
-            if state.page is None:
-                return [TextContent(type="text", text="Error: Navegador no inicializado.")]
-            script = arguments["script"]
-            result = await state.page.evaluate(script)
-            return [TextContent(type="text", text=json.dumps(result, ensure_ascii=False, indent=2))]
-
-        elif name == "browser_get_content":
-            if state.page is None:
-                return [TextContent(type="text", text="Error: Navegador no inicializado.")]
-            selector = arguments.get("selector", "body")
-            content = await state.page.inner_text(selector)
-            # Limitar contenido para no saturar
-            if len(content) > 5000:
-                content = content[:5000] + "\n... (truncado)"
-            return [TextContent(type="text", text=content)]
-
-        elif name == "browser_scroll":
-            if state.page is None:
-                return [TextContent(type="text", text="Error: Navegador no inicializado.")]
-            y = arguments["y"]
-            await state.page.evaluate(f"window.scrollBy(0, {y})")
-            await asyncio.sleep(0.3)
-            return [TextContent(type="text", text=f"Scroll realizado: {y}px")]
-
-        elif name == "browser_wait":
-            if state.page is None:
-                return [TextContent(type="text", text="Error: Navegador no inicializado.")]
-            if "milliseconds" in arguments:
-                ms = arguments["milliseconds"]
-                await asyncio.sleep(ms / 1000)
-                return [TextContent(type="text", text=f"Esperado {ms}ms")]
-            elif "selector" in arguments:
-                selector = arguments["selector"]
-                await state.page.wait_for_selector(selector, timeout=10000)
-                return [TextContent(type="text", text=f"Elemento encontrado: {selector}")]
-            return [TextContent(type="text", text="Especifica milliseconds o selector")]
-
-        elif name == "browser_close":
-            await state.close()
-            return [TextContent(type="text", text="Navegador cerrado")]
-
-        elif name == "browser_status":
-            if state.page is None:
-                return [TextContent(type="text", text="Navegador: No inicializado")]
-            url = state.page.url
-            title = await state.page.title()
-            return [TextContent(type="text", text=f"URL: {url}\nTítulo: {title}\nEstado: Activo")]
+        if name in MANAGER_TOOLS:
+            return await MANAGER_TOOLS[name](arguments)
+        if name not in SESSION_TOOLS:
+            return text(f"Herramienta desconocida: {name}")
 
-        else:
-            return [TextContent(type="text", text=f"Herramienta desconocida: {name}")]
+        handler, creates = SESSION_TOOLS[name]
+        session_id = arguments.get("session_id", DEFAULT_SESSION)
+        # browser_new_tab en una sesión nueva abre su pestaña, no una t1 vacía antes
+        steps = arguments.get("steps") or [{}]
+        first = steps[0].get("action", "") if name == "browser_run_steps" else name
+        session = await sessions.get(
+            session_id, create=creates, visible=arguments.get("visible", False),
+            first_tab=first not in ("browser_new_tab", "new_tab"),
+        )
+        if session is None:
+            if name == "browser_status":
+                return text("Navegador: No inicializado")
+            return text(f"Error: Sesión {session_id} no inicializada. Usa browser_navigate primero.")
+        async with session.lock:
+            session.touch()
+            try:
+                return await handler(session, arguments)
+            finally:
+                session.touch()
 
     except Exception as e:
-        return [TextContent(type="text", text=f"Error: {str(e)}")]
+        return text(f"Error: {str(e)}")
 
 
 async def main():
     """Iniciar servidor MCP"""
-    async with stdio_server() as (read_stream, write_stream):
-        await server.run(read_stream, write_stream, server.create_initialization_options())
+    try:
+        async with stdio_server() as (read_stream, write_stream):
+            await server.run(read_stream, write_stream, server.create_initialization_options())
+    finally:
+        await sessions.close_all()
 
 
 if __name__ == "__main__":
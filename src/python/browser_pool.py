@@ -0,0 +1,423 @@
+#!/usr/bin/env python3
+"""
+Camoufox Browser Pool
+=====================
+Keeps N warm Camoufox instances alive and hands out fresh, isolated
+browser contexts, so callers skip the Firefox cold start on every call.
+
+Usage:
+  from browser_pool import BrowserPool
+  from camoufox_browser import browse
+
+  with BrowserPool(min_size=1, max_size=2, visible=False) as pool:
+      for url in urls:
+          result = browse(url, pool=pool)
+
+  # Launches drawing pre-generated identities from a ProfileStore
+  with BrowserPool(max_size=2, profiles=ProfileStore("~/.cache/camoufox/profiles.db")) as pool:
+      ...
+
+  # Async
+  async with AsyncBrowserPool(max_size=4) as pool:
+      async with pool.context() as context:
+          page = await context.new_page()
+"""
+
+import asyncio
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from contextlib import contextmanager, asynccontextmanager
+from camoufox.sync_api import Camoufox
+from camoufox.async_api import AsyncCamoufox
+from display_manager import get_display_manager
+from profile_store import ProfileStore, default_profile_store
+
+
+class PoolExhaustedError(RuntimeError):
+    """Raised when a sync pool has no free capacity and cannot grow."""
+
+
+class PooledBrowser:
+    """A warm Camoufox instance tracked by a pool."""
+
+    def __init__(self, manager: Any, browser: Any, display: Optional[str] = None):
+        self.manager = manager
+        self.browser = browser
+        self.display = display
+        self.uses = 0
+        self.active = 0
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+    def is_connected(self) -> bool:
+        try:
+            return self.browser.is_connected()
+        except Exception:
+            return False
+
+
+class _PoolBase:
+    """Bookkeeping shared by the sync and async pools."""
+
+    def __init__(
+        self,
+        min_size: int = 1,
+        max_size: int = 4,
+        max_uses: int = 50,
+        idle_timeout: float = 300.0,
+        contexts_per_browser: int = 1,
+        visible: bool = False,
+        humanize: bool = True,
+        profiles: Optional[ProfileStore] = None,
+        **launch_options: Any,
+    ):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("Expected 0 <= min_size <= max_size and max_size >= 1")
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_uses = max_uses
+        self.idle_timeout = idle_timeout
+        self.contexts_per_browser = contexts_per_browser
+        self.visible = visible
+        self.humanize = humanize
+        self.launch_options = launch_options
+        self.profiles = profiles if profiles is not None else default_profile_store()
+        self._browsers: List[PooledBrowser] = []
+        self._launching = 0
+        self._closed = False
+        self._launched = 0
+        self._recycled = 0
+        self._evicted = 0
+
+    def _camoufox_options(self, display: Optional[str]) -> Dict[str, Any]:
+        if self.profiles is not None:
+            return self.profiles.launch_kwargs(
+                display, humanize=2.0 if self.humanize else False, **self.launch_options
+            )
+        options = {
+            "headless": False,
+            "humanize": 2.0 if self.humanize else False,
+            "i_know_what_im_doing": True,
+            "virtual_display": display,
+        }
+        options.update(self.launch_options)
+        return options
+
+    def _lease_display(self) -> Optional[str]:
+        """Background browsers share Xvfb servers through the display manager."""
+        return None if self.visible else get_display_manager().acquire()
+
+    def _release_display(self, display: Optional[str]):
+        get_display_manager().release(display)
+
+    def _size(self) -> int:
+        return len(self._browsers) + self._launching
+
+    def _pick(self) -> Optional[PooledBrowser]:
+        """Least busy healthy browser with spare context capacity."""
+        candidates = [
+            pb for pb in self._browsers
+            if pb.active < self.contexts_per_browser and pb.uses < self.max_uses
+        ]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda pb: (pb.active, pb.uses))
+
+    def _take(self, pb: PooledBrowser) -> PooledBrowser:
+        pb.active += 1
+        pb.uses += 1
+        pb.last_used = time.monotonic()
+        return pb
+
+    def _retirable(self, now: float) -> List[PooledBrowser]:
+        """Browsers to close: dead, worn out, or idle above min_size."""
+        retire = []
+        keep = len(self._browsers)
+        for pb in sorted(self._browsers, key=lambda b: b.last_used):
+            if pb.active:
+                continue
+            if not pb.is_connected():
+                retire.append(pb)
+                keep -= 1
+            elif pb.uses >= self.max_uses:
+                retire.append(pb)
+                keep -= 1
+                self._recycled += 1
+            elif keep > self.min_size and now - pb.last_used >= self.idle_timeout:
+                retire.append(pb)
+                keep -= 1
+                self._evicted += 1
+        for pb in retire:
+            self._browsers.remove(pb)
+        return retire
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of pool occupancy and lifetime counters."""
+        return {
+            "size": len(self._browsers),
+            "launching": self._launching,
+            "active_contexts": sum(pb.active for pb in self._browsers),
+            "uses": [pb.uses for pb in self._browsers],
+            "launched": self._launched,
+            "recycled": self._recycled,
+            "evicted": self._evicted,
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+        }
+
+
+class BrowserPool(_PoolBase):
+    """
+    Pool of warm sync Camoufox browsers.
+
+    Playwright's sync API is bound to the thread that created it, so a
+    BrowserPool must be used from a single thread. Each context() call
+    yields a new BrowserContext (fresh cookies/storage) on a warm browser.
+
+    Args:
+        min_size: Browsers kept alive even when idle
+        max_size: Upper bound of simultaneously running browsers
+        max_uses: Contexts served before a browser is recycled
+        idle_timeout: Seconds before an idle browser above min_size is closed
+        contexts_per_browser: Concurrent contexts allowed per browser
+        visible: True to see browsers, False for background (virtual display)
+        humanize: Enable human-like cursor movement (max 2 seconds)
+        profiles: ProfileStore to launch from (default: default_profile_store());
+                  launch_options then select (proxy, locale) or generate profiles
+        **launch_options: Extra keyword arguments for Camoufox()
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self._lock = threading.RLock()
+
+    def __enter__(self) -> "BrowserPool":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info: Any):
+        self.close()
+
+    def start(self) -> "BrowserPool":
+        """Launch browsers up to min_size."""
+        with self._lock:
+            while len(self._browsers) < self.min_size:
+                self._browsers.append(self._launch())
+        return self
+
+    def _launch(self) -> PooledBrowser:
+        display = self._lease_display()
+        try:
+            manager = Camoufox(**self._camoufox_options(display))
+            browser = manager.__enter__()
+        except BaseException:
+            self._release_display(display)
+            raise
+        self._launched += 1
+        return PooledBrowser(manager, browser, display)
+
+    def _shutdown(self, pb: PooledBrowser):
+        try:
+            pb.manager.__exit__(None, None, None)
+        except Exception:
+            pass
+        self._release_display(pb.display)
+
+    def evict_idle(self) -> int:
+        """Close dead, worn-out and idle browsers. Returns how many were closed."""
+        with self._lock:
+            retired = self._retirable(time.monotonic())
+        for pb in retired:
+            self._shutdown(pb)
+        return len(retired)
+
+    def _checkout(self) -> PooledBrowser:
+        if self._closed:
+            raise RuntimeError("BrowserPool is closed")
+        self.evict_idle()
+        with self._lock:
+            pb = self._pick()
+            if pb is None:
+                if self._size() >= self.max_size:
+                    raise PoolExhaustedError(
+                        f"All {self.max_size} pooled browsers are busy"
+                    )
+                pb = self._launch()
+                self._browsers.append(pb)
+            return self._take(pb)
+
+    def _checkin(self, pb: PooledBrowser):
+        with self._lock:
+            pb.active -= 1
+            pb.last_used = time.monotonic()
+        self.evict_idle()
+        if not self._closed:
+            self.start()
+
+    @contextmanager
+    def context(self, **context_options: Any):
+        """Yield a fresh BrowserContext on a warm browser; closed on exit."""
+        pb = self._checkout()
+        context = None
+        try:
+            context = pb.browser.new_context(**context_options)
+            yield context
+        finally:
+            if context is not None:
+                try:
+                    context.close()
+                except Exception:
+                    pass
+            self._checkin(pb)
+
+    def close(self):
+        """Close every pooled browser."""
+        with self._lock:
+            self._closed = True
+            browsers, self._browsers = self._browsers, []
+        for pb in browsers:
+            self._shutdown(pb)
+
+
+class AsyncBrowserPool(_PoolBase):
+    """
+    Pool of warm async Camoufox browsers. See BrowserPool for arguments.
+
+    When every browser is busy and the pool is at max_size, context()
+    waits until a context is released instead of failing.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self._cond = asyncio.Condition()
+        self._reaper: Optional[asyncio.Task] = None
+
+    async def __aenter__(self) -> "AsyncBrowserPool":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info: Any):
+        await self.close()
+
+    async def start(self) -> "AsyncBrowserPool":
+        """Launch browsers up to min_size and start the idle reaper."""
+        while True:
+            async with self._cond:
+                if self._size() >= self.min_size:
+                    break
+                self._launching += 1
+            await self._add_launched()
+        if self._reaper is None and self.idle_timeout:
+            self._reaper = asyncio.ensure_future(self._reap_loop())
+        return self
+
+    async def _lease_display_async(self) -> Optional[str]:
+        """_lease_display() in a thread: starting Xvfb must not stall the event loop."""
+        lease = asyncio.ensure_future(asyncio.to_thread(self._lease_display))
+        try:
+            return await asyncio.shield(lease)
+        except asyncio.CancelledError:
+            # The lease still completes in its thread; hand it back when it does
+            def give_back(future: "asyncio.Future[Optional[str]]"):
+                if not future.cancelled() and future.exception() is None:
+                    asyncio.get_running_loop().run_in_executor(None, self._release_display, future.result())
+            lease.add_done_callback(give_back)
+            raise
+
+    async def _release_display_async(self, display: Optional[str]):
+        await asyncio.to_thread(self._release_display, display)
+
+    async def _add_launched(self):
+        """Launch one browser for a slot already reserved in _launching."""
+        display = None
+        try:
+            display = await self._lease_display_async()
+            manager = AsyncCamoufox(**self._camoufox_options(display))
+            browser = await manager.__aenter__()
+        except BaseException:
+            await self._release_display_async(display)
+            async with self._cond:
+                self._launching -= 1
+                self._cond.notify_all()
+            raise
+        async with self._cond:
+            self._launching -= 1
+            self._launched += 1
+            self._browsers.append(PooledBrowser(manager, browser, display))
+            self._cond.notify_all()
+
+    async def _shutdown(self, pb: PooledBrowser):
+        try:
+            await pb.manager.__aexit__(None, None, None)
+        except Exception:
+            pass
+        await self._release_display_async(pb.display)
+
+    async def evict_idle(self) -> int:
+        """Close dead, worn-out and idle browsers. Returns how many were closed."""
+        async with self._cond:
+            retired = self._retirable(time.monotonic())
+            if retired:
+                self._cond.notify_all()
+        for pb in retired:
+            await self._shutdown(pb)
+        return len(retired)
+
+    async def _reap_loop(self):
+        interval = max(1.0, min(self.idle_timeout / 2, 30.0))
+        while not self._closed:
+            await asyncio.sleep(interval)
+            await self.evict_idle()
+
+    async def _checkout(self) -> PooledBrowser:
+        await self.evict_idle()
+        while True:
+            async with self._cond:
+                if self._closed:
+                    raise RuntimeError("AsyncBrowserPool is closed")
+                pb = self._pick()
+                if pb is not None:
+                    return self._take(pb)
+                if self._size() >= self.max_size:
+                    await self._cond.wait()
+                    continue
+                self._launching += 1
+            await self._add_launched()
+
+    async def _checkin(self, pb: PooledBrowser):
+        async with self._cond:
+            pb.active -= 1
+            pb.last_used = time.monotonic()
+            self._cond.notify_all()
+        await self.evict_idle()
+        if not self._closed:
+            await self.start()
+
+    @asynccontextmanager
+    async def context(self, **context_options: Any):
+        """Yield a fresh BrowserContext on a warm browser; closed on exit."""
+        pb = await self._checkout()
+        context = None
+        try:
+            context = await pb.browser.new_context(**context_options)
+            yield context
+        finally:
+            if context is not None:
+                try:
+                    await context.close()
+                except Exception:
+                    pass
+            await self._checkin(pb)
+
+    async def close(self):
+        """Close every pooled browser and stop the reaper."""
+        async with self._cond:
+            self._closed = True
+            browsers, self._browsers = self._browsers, []
+            self._cond.notify_all()
+        if self._reaper is not None:
+            self._reaper.cancel()
+            self._reaper = None
+        for pb in browsers:
+            await self._shutdown(pb)
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Columnar Results and Streaming Writers
+======================================
+Bulk scrapes produce tens of thousands of records; keeping them as one list
+of dicts and dumping it with json.dumps(indent=2) dominates memory and CPU.
+ColumnBatch keeps a batch as one list per field (the shape extraction
+schemas already return) and the writers append batches to a file as they
+arrive, so a run never holds more than one batch.
+
+Formats:
+  jsonl     one compact JSON object per line (no dependencies)
+  arrow     Arrow IPC stream, readable zero-copy (needs pyarrow)
+  parquet   Parquet file, one row group per batch (needs pyarrow)
+
+Usage:
+  from columnar import ColumnBatch, open_writer
+
+  with open_writer("parquet", "/tmp/products.parquet") as writer:
+      for result in browse_many(urls, schema=schema):
+          writer.write_batch(ColumnBatch.from_extracted(result["extracted"]))
+
+  with open_writer("jsonl", "-") as writer:            # "-" is stdout
+      writer.write_rows(search_mercadolibre_iter("laptop", max_results=5000))
+
+  # Arrow/Parquet columns declared up front (otherwise taken from the first batch)
+  open_writer("parquet", "/tmp/products.parquet",
+              schema={"title": "string", "price": "int64", "tags": "list<string>"})
+
+  # CLI
+  python camoufox_browser.py --urls-file urls.txt --schema schema.json \\
+      --output-format parquet --output products.parquet
+"""
+
+import json
+import sys
+from typing import Any, Dict, IO, Iterable, Iterator, List, Optional, Union
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+    import pyarrow.parquet as pa_parquet
+    ARROW_AVAILABLE = True
+except ImportError:
+    ARROW_AVAILABLE = False
+
+FORMATS = ("jsonl", "arrow", "parquet")
+
+
+class ColumnBatch:
+    """
+    Records stored column by column: {field: [values]}, all of equal length.
+
+    Args:
+        columns: Field name -> list of values
+    """
+
+    def __init__(self, columns: Dict[str, List[Any]]):
+        lengths = {len(values) for values in columns.values()}
+        if len(lengths) > 1:
+            raise ValueError(f"Columns have different lengths: {sorted(lengths)}")
+        self.columns = columns
+        self._length = lengths.pop() if lengths else 0
+
+    @classmethod
+    def from_extracted(cls, data: Dict[str, Any]) -> "ColumnBatch":
+        """Wrap an extraction.extract() result without copying its lists."""
+        return cls(data["columns"])
+
+    @classmethod
+    def from_rows(cls, records: Iterable[Dict[str, Any]], names: Optional[List[str]] = None) -> "ColumnBatch":
+        """
+        Build a batch from row dicts. Fields missing from a record are None;
+        without `names`, fields are taken in first-seen order.
+        """
+        records = list(records)
+        if names is None:
+            names = list(dict.fromkeys(name for record in records for name in record))
+        return cls({name: [record.get(name) for record in records] for name in names})
+
+    @property
+    def names(self) -> List[str]:
+        return list(self.columns)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def with_constant(self, name: str, value: Any) -> "ColumnBatch":
+        """Same batch plus a column repeating value (e.g. the source URL)."""
+        return ColumnBatch(dict(self.columns, **{name: [value] * self._length}))
+
+    def rows(self) -> Iterator[Dict[str, Any]]:
+        names = self.names
+        for values in zip(*(self.columns[name] for name in names)):
+            yield dict(zip(names, values))
+
+
+def _batches(records: Iterable[Dict[str, Any]], batch_size: int) -> Iterator[ColumnBatch]:
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= batch_size:
+            yield ColumnBatch.from_rows(chunk)
+            chunk = []
+    if chunk:
+        yield ColumnBatch.from_rows(chunk)
+
+
+class _Writer:
+    """Common batching and context-manager plumbing of the writers."""
+
+    rows_written = 0
+
+    def write_batch(self, batch: ColumnBatch):
+        raise NotImplementedError
+
+    def write_rows(self, records: Iterable[Dict[str, Any]], batch_size: int = 1000) -> int:
+        """Write row dicts in batches of batch_size; returns rows written."""
+        before = self.rows_written
+        for batch in _batches(records, batch_size):
+            self.write_batch(batch)
+        return self.rows_written - before
+
+    def close(self):
+        raise NotImplementedError
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _open_text(path: str) -> IO[str]:
+    return sys.stdout if path == "-" else open(path, "w", encoding="utf-8")
+
+
+class JsonLinesWriter(_Writer):
+    """One compact JSON object per line; path "-" writes to stdout."""
+
+    def __init__(self, path: str):
+        self._file = _open_text(path)
+        self.rows_written = 0
+
+    def write_batch(self, batch: ColumnBatch):
+        dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=str).encode
+        self._file.writelines(dumps(row) + "\n" for row in batch.rows())
+        self.rows_written += len(batch)
+
+    def close(self):
+        if self._file is sys.stdout:
+            self._file.flush()
+        else:
+            self._file.close()
+
+
+def _require_arrow(fmt: str):
+    if not ARROW_AVAILABLE:
+        raise RuntimeError(f"Output format {fmt!r} needs pyarrow: pip install pyarrow")
+
+
+def _arrow_type(name: str) -> "pa.DataType":
+    if name.startswith("list<") and name.endswith(">"):
+        return pa.list_(_arrow_type(name[5:-1]))
+    return pa.type_for_alias(name)
+
+
+def arrow_schema(schema: Union[None, Dict[str, str], "pa.Schema"]) -> Optional["pa.Schema"]:
+    """pa.Schema from {field: type name} ("string", "int64", "double", "bool", "list<string>"...)."""
+    if schema is None or isinstance(schema, pa.Schema):
+        return schema
+    return pa.schema([pa.field(name, _arrow_type(type_name)) for name, type_name in schema.items()])
+
+
+def _infer_schema(batch: ColumnBatch) -> "pa.Schema":
+    # Columns all null in the first batch become strings; declare the schema
+    # when such a column can hold other types later
+    schema = pa.Table.from_pydict(batch.columns).schema
+    return pa.schema([pa.field(f.name, pa.string()) if pa.types.is_null(f.type) else f for f in schema])
+
+
+def _arrow_table(batch: ColumnBatch, schema: "pa.Schema") -> "pa.Table":
+    """Batch as a table of exactly schema; raises ValueError instead of dropping or mangling data."""
+    extra = [name for name in batch.names if schema.get_field_index(name) < 0]
+    if extra:
+        raise ValueError(f"Columns not in the output schema: {', '.join(extra)} (declare them up front)")
+    arrays = []
+    for field in schema:
+        values = batch.columns.get(field.name, [None] * len(batch))
+        try:
+            arrays.append(pa.array(values, type=field.type))
+        except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+            raise ValueError(f"Column {field.name!r} does not fit the output schema ({field.type}): {e}") from e
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+class _ArrowBase(_Writer):
+    """
+    Writes every batch with one schema: the declared one, or the first
+    batch's. Batches that do not fit it raise ValueError.
+    """
+
+    fmt = ""
+
+    def __init__(self, path: str, schema: Union[None, Dict[str, str], "pa.Schema"] = None):
+        _require_arrow(self.fmt)
+        self.path = path
+        self.schema: Optional["pa.Schema"] = arrow_schema(schema)
+        self._sink = None
+        self.rows_written = 0
+
+    def _open(self, schema: "pa.Schema"):
+        raise NotImplementedError
+
+    def write_batch(self, batch: ColumnBatch):
+        if not len(batch):
+            return
+        if self.schema is None:
+            self.schema = _infer_schema(batch)
+        table = _arrow_table(batch, self.schema)
+        if self._sink is None:
+            self._sink = self._open(self.schema)
+        self._sink.write_table(table)
+        self.rows_written += len(batch)
+
+    def close(self):
+        if self._sink is not None:
+            self._sink.close()
+
+
+class ArrowWriter(_ArrowBase):
+    """Arrow IPC stream (pyarrow.ipc.open_stream reads it back)."""
+
+    fmt = "arrow"
+
+    def _open(self, schema):
+        return pa_ipc.new_stream(self.path, schema)
+
+
+class ParquetWriter(_ArrowBase):
+    """Parquet file written one row group per batch."""
+
+    fmt = "parquet"
+
+    def _open(self, schema):
+        return pa_parquet.ParquetWriter(self.path, schema)
+
+
+def open_writer(fmt: str, path: str, schema: Union[None, Dict[str, str], "pa.Schema"] = None) -> _Writer:
+    """
+    Streaming writer for fmt ("jsonl", "arrow" or "parquet") at path.
+    schema ({field: type name} or a pa.Schema) fixes the Arrow/Parquet
+    columns; JSON lines need none.
+    """
+    if fmt == "jsonl":
+        return JsonLinesWriter(path)
+    if fmt in ("arrow", "parquet") and path == "-":
+        raise ValueError(f"Output format {fmt!r} needs a file path")
+    if fmt == "arrow":
+        return ArrowWriter(path, schema)
+    if fmt == "parquet":
+        return ParquetWriter(path, schema)
+    raise ValueError(f"Unknown output format {fmt!r} (expected {', '.join(FORMATS)})")
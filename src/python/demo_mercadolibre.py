@@ -5,6 +5,9 @@ Usa extraccion basada en estructura visible de la pagina
 """
 
 from camoufox.sync_api import Camoufox
+from wait_strategies import wait_until_ready
+from harvester import Harvester
+from camoufox_browser import MERCADOLIBRE_CARD_JS
 import json
 import time
 
@@ -35,70 +38,28 @@ with Camoufox(
     print(f"      Status: {response.status if response else 'OK'}")
 
     print("\n[3/6] Esperando renderizado completo...")
-    # Wait for page to fully render
-    page.wait_for_load_state("networkidle")
-    time.sleep(3)
+    # Listo cuando aparecen las tarjetas y el DOM deja de cambiar
+    listo = wait_until_ready(page, "selector:.poly-card,dom_quiet:500", timeout=30000)
+    if not listo["ready"]:
+        print(f"      Sin productos visibles tras {listo['elapsed_ms']}ms ({listo['timed_out']})")
 
-    # Scroll to load lazy content
+    # Scroll until enough products appear, extracting each batch as it renders
     print("\n[4/6] Haciendo scroll para cargar productos...")
-    for i in range(5):
-        page.evaluate(f"window.scrollTo(0, {i * 500})")
-        time.sleep(0.5)
-    page.evaluate("window.scrollTo(0, 0)")
-    time.sleep(2)
+    print("\n[5/6] Extrayendo productos a medida que aparecen...")
 
-    print("\n[5/6] Extrayendo productos de la pagina...")
-
-    # Get HTML for manual parsing if needed
-    html = page.content()
-
-    # Try multiple extraction strategies
     products = []
-
-    # Strategy 1: Look for product structure based on visible layout
+    harvester = Harvester(".poly-card", MERCADOLIBRE_CARD_JS, key="link", max_items=15, stall_rounds=2)
     try:
-        products = page.evaluate("""() => {
-            const results = [];
-
-            // Get all price elements first (most reliable)
-            const priceElements = document.querySelectorAll('[class*="andes-money-amount"], [class*="price"]');
-
-            for (const priceEl of priceElements) {
-                // Navigate up to find product container
-                let container = priceEl.parentElement;
-                for (let i = 0; i < 10 && container; i++) {
-                    // Check if this container has a product link
-                    const link = container.querySelector('a[href*="MLO"], a[href*="articulo"], a[href*="producto"]');
-                    if (link) {
-                        const href = link.href;
-                        if (results.some(r => r.link === href)) break;
-
-                        // Find title
-                        let title = '';
-                        const h2 = container.querySelector('h2, h3');
-                        const img = container.querySelector('img');
-
-                        if (h2) title = h2.innerText.trim();
-                        else if (img?.alt) title = img.alt;
-
-                        // Get price
-                        const fraction = priceEl.querySelector('.andes-money-amount__fraction') || priceEl;
-                        const price = fraction.innerText.replace(/[^0-9.,]/g, '');
-
-                        if (title && title.length > 10 && price) {
-                            results.push({ title, price, link: href });
-                        }
-                        break;
-                    }
-                    container = container.parentElement;
-                }
-            }
-
-            return results.slice(0, 15);
-        }""")
+        for product in harvester.harvest(page):
+            products.append(product)
+            print(f"      {len(products):2d}. {product['title'][:60]}")
+        print(f"      Rondas de scroll: {harvester.stats['rounds']} (fin: {harvester.stats['stop']})")
     except Exception as e:
         print(f"      Estrategia 1 fallo: {e}")
 
+    # Get HTML for manual parsing if needed
+    html = page.content()
+
     # Strategy 2: Search for any visible text that looks like products
     if not products:
         print("      Intentando estrategia alternativa...")
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Shared Virtual Display Manager
+==============================
+Process-wide, reference-counted Xvfb displays for background browsers.
+Instead of one X server per browser, every background browser leases a
+DISPLAY from a small set of shared Xvfb servers. Displays start lazily on
+the first lease and stop when their last user releases them.
+
+Usage:
+  from display_manager import get_display_manager
+
+  manager = get_display_manager()
+  with manager.lease() as display:          # e.g. ":99"
+      with Camoufox(headless=False, virtual_display=display) as browser:
+          ...
+
+  print(manager.health())
+
+Environment:
+  CAMOUFOX_DISPLAY_SHARDS: number of Xvfb servers to spread users over (default 1)
+  CAMOUFOX_DISPLAY_USERS: users per display before another shard starts (default 16)
+"""
+
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from contextlib import contextmanager
+
+
+def display_available() -> bool:
+    """True if pyvirtualdisplay can be imported (Xvfb itself is checked on start)."""
+    try:
+        import pyvirtualdisplay  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class _Shard:
+    """One running Xvfb server and its lease count."""
+
+    def __init__(self, display: Any):
+        self.display = display
+        self.var = display.new_display_var
+        self.refcount = 0
+        self.leases = 0
+        self.started_at = time.time()
+
+    def is_alive(self) -> bool:
+        try:
+            return self.display.is_alive()
+        except Exception:
+            return False
+
+
+class DisplayManager:
+    """
+    Reference-counted pool of Xvfb displays.
+
+    Args:
+        shards: Maximum number of Xvfb servers to run at once
+        users_per_display: Leases a display takes before another shard starts
+                           (once all shards run, leases go to the least loaded)
+        size: Screen size of each display
+    """
+
+    def __init__(
+        self,
+        shards: int = 1,
+        users_per_display: int = 16,
+        size: Tuple[int, int] = (1920, 1080),
+    ):
+        if shards < 1:
+            raise ValueError("shards must be >= 1")
+        self.shards = shards
+        self.users_per_display = users_per_display
+        self.size = size
+        self._lock = threading.Lock()
+        self._active: List[_Shard] = []
+        self._started = 0
+        self._restarted = 0
+
+    def _start_shard(self) -> _Shard:
+        from pyvirtualdisplay import Display
+        display = Display(visible=False, size=self.size, manage_global_env=False)
+        display.start()
+        self._started += 1
+        shard = _Shard(display)
+        self._active.append(shard)
+        return shard
+
+    def _stop_shard(self, shard: _Shard):
+        if shard in self._active:
+            self._active.remove(shard)
+        try:
+            shard.display.stop()
+        except Exception:
+            pass
+
+    def acquire(self) -> str:
+        """Lease a display, starting one if needed. Returns its DISPLAY value."""
+        with self._lock:
+            for shard in [s for s in self._active if not s.is_alive()]:
+                self._restarted += 1
+                self._stop_shard(shard)
+
+            shard = min(self._active, key=lambda s: s.refcount, default=None)
+            if shard is None or (
+                shard.refcount >= self.users_per_display
+                and len(self._active) < self.shards
+            ):
+                shard = self._start_shard()
+            shard.refcount += 1
+            shard.leases += 1
+            return shard.var
+
+    def release(self, display_var: Optional[str]):
+        """Return a lease; the display stops when its last user releases it."""
+        if display_var is None:
+            return
+        with self._lock:
+            for shard in self._active:
+                if shard.var == display_var:
+                    shard.refcount -= 1
+                    if shard.refcount <= 0:
+                        self._stop_shard(shard)
+                    return
+
+    @contextmanager
+    def lease(self):
+        """Context manager around acquire()/release()."""
+        display_var = self.acquire()
+        try:
+            yield display_var
+        finally:
+            self.release(display_var)
+
+    def health(self) -> Dict[str, Any]:
+        """Running displays with their users, liveness and uptime."""
+        with self._lock:
+            now = time.time()
+            return {
+                "shards": self.shards,
+                "started": self._started,
+                "restarted": self._restarted,
+                "displays": [
+                    {
+                        "display": s.var,
+                        "pid": getattr(s.display, "pid", None),
+                        "users": s.refcount,
+                        "leases": s.leases,
+                        "alive": s.is_alive(),
+                        "uptime": round(now - s.started_at, 1),
+                    }
+                    for s in self._active
+                ],
+            }
+
+    def stop_all(self):
+        """Stop every display regardless of outstanding leases."""
+        with self._lock:
+            for shard in list(self._active):
+                self._stop_shard(shard)
+
+
+_manager: Optional[DisplayManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_display_manager() -> DisplayManager:
+    """Process-wide DisplayManager, configured from the environment on first use."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = DisplayManager(
+                shards=int(os.environ.get("CAMOUFOX_DISPLAY_SHARDS", "1")),
+                users_per_display=int(os.environ.get("CAMOUFOX_DISPLAY_USERS", "16")),
+            )
+        return _manager
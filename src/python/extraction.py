@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Declarative Extraction Schemas
+==============================
+Describe what to extract (a container selector plus field selectors,
+attributes and transforms) and get it back in one in-page call that walks
+each container's subtree once, returning compact columnar arrays instead
+of one object per item.
+
+Field specs:
+  "h2"                       text of the first matching descendant
+  "a@href"                   attribute (href/src/action resolve to absolute URLs)
+  "@data-id"                 attribute of the container itself
+  {"selector": "span.price", "transform": ["digits", "int"], "required": True}
+  {"selector": "img", "attr": "src", "all": True}      every match, as a list
+  {"selector": "time", "js": "(value, el) => el.dateTime"}
+
+  source: "text" (default, textContent collapsed), "inner_text", "html",
+          or attr="name" / prop="name"
+  transforms: trim, collapse, digits, int, float, lower, upper
+  type: column type for Arrow/Parquet output ("string", "int64", "double",
+        "bool"); defaults to int64/double after an int/float transform,
+        else string (set it for js fields returning other types)
+
+Usage:
+  from extraction import Schema, extract, rows
+
+  schema = Schema({
+      "container": ".poly-card",
+      "fields": {
+          "title": {"selector": "img[title]", "attr": "title", "required": True},
+          "price": {"selector": "[class*='fraction']", "transform": "digits", "required": True},
+          "link": "a[href]@href",
+      },
+      "unique": "title",
+  })
+  data = extract(page, schema)      # {"columns": {"title": [...], ...}, "count": 48, ...}
+  for row in rows(data):            # dicts, when a row view is needed
+      print(row["title"])
+
+  # Through browse() / browse_many(): result["extracted"]
+  result = browse(url, schema=schema)
+"""
+
+import hashlib
+import json
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+TRANSFORMS = ("trim", "collapse", "digits", "int", "float", "lower", "upper")
+SOURCES = ("text", "inner_text", "html", "attr", "prop")
+
+# Attributes whose DOM property is the resolved absolute URL
+_URL_ATTRS = ("href", "src", "action")
+
+# Per-document engine: reads one container into an array of field values
+# (null when a required field is missing). %(spec)s and %(custom)s are
+# inlined at compile time; no eval, so page CSP does not interfere.
+_ENGINE = """
+    const spec = %(spec)s;
+    const CUSTOM = [%(custom)s];
+    const T = {
+        trim: v => v.trim(),
+        collapse: v => v.replace(/\\s+/g, " ").trim(),
+        digits: v => v.replace(/[^0-9]/g, ""),
+        int: v => { const n = parseInt(v.replace(/[^0-9-]/g, ""), 10); return isNaN(n) ? null : n; },
+        float: v => { const n = parseFloat(v.replace(/[^0-9.-]/g, "")); return isNaN(n) ? null : n; },
+        lower: v => v.toLowerCase(),
+        upper: v => v.toUpperCase(),
+    };
+    const fields = spec.fields;
+    const nf = fields.length;
+    const read = (f, el) => {
+        let v;
+        switch (f.source) {
+            case "attr": v = el.getAttribute(f.name); break;
+            case "prop": v = el[f.name]; break;
+            case "html": v = el.innerHTML; break;
+            case "inner_text": v = el.innerText; break;
+            default: v = el.textContent.replace(/\\s+/g, " ").trim();
+        }
+        for (const t of f.transforms) {
+            if (v === null || v === undefined) break;
+            v = T[t](String(v));
+        }
+        if (f.custom >= 0) v = CUSTOM[f.custom](v, el);
+        return v === undefined ? null : v;
+    };
+    const extractOne = (c) => {
+        const vals = new Array(nf).fill(undefined);
+        let pending = 0;
+        for (let i = 0; i < nf; i++) {
+            const f = fields[i];
+            if (!f.selector) vals[i] = f.all ? [read(f, c)] : read(f, c);
+            else if (f.all) { vals[i] = []; pending++; }
+            else pending++;
+        }
+        if (pending) {
+            const walker = document.createTreeWalker(c, NodeFilter.SHOW_ELEMENT);
+            let remaining = fields.filter(f => f.selector && !f.all).length;
+            const collecting = fields.some(f => f.all);
+            for (let el = walker.nextNode(); el && (remaining || collecting); el = walker.nextNode()) {
+                for (let i = 0; i < nf; i++) {
+                    const f = fields[i];
+                    if (!f.selector || (!f.all && vals[i] !== undefined) || !el.matches(f.selector)) continue;
+                    if (f.all) vals[i].push(read(f, el));
+                    else { vals[i] = read(f, el); remaining--; }
+                }
+            }
+        }
+        for (let i = 0; i < nf; i++) {
+            if (vals[i] === undefined) vals[i] = fields[i].default;
+            if (fields[i].required && (vals[i] === null || vals[i] === "" ||
+                                       (Array.isArray(vals[i]) && !vals[i].length))) return null;
+        }
+        return vals;
+    };
+"""
+
+_COLUMNS_JS = """() => {
+    const X = window[%(key)r] || (window[%(key)r] = (() => {%(engine)s
+        return {spec, fields, extractOne};
+    })());
+    const {spec, fields, extractOne} = X;
+    const columns = {};
+    for (const f of fields) columns[f.key] = [];
+    const uniqueAt = spec.unique === null ? -1 : fields.findIndex(f => f.key === spec.unique);
+    const seen = new Set();
+    let count = 0, skipped = 0, duplicates = 0;
+    const containers = spec.container ? document.querySelectorAll(spec.container) : [document.documentElement];
+    for (const c of containers) {
+        if (spec.limit && count >= spec.limit) break;
+        const vals = extractOne(c);
+        if (!vals) { skipped++; continue; }
+        if (uniqueAt >= 0) {
+            const k = JSON.stringify(vals[uniqueAt]);
+            if (seen.has(k)) { duplicates++; continue; }
+            seen.add(k);
+        }
+        for (let i = 0; i < fields.length; i++) columns[fields[i].key].push(vals[i]);
+        count++;
+    }
+    return {columns, count, skipped, duplicates, containers: containers.length};
+}"""
+
+_ITEM_JS = """(el) => {
+    const X = window[%(key)r] || (window[%(key)r] = (() => {%(engine)s
+        return {spec, fields, extractOne};
+    })());
+    const vals = X.extractOne(el);
+    if (!vals) return null;
+    const row = {};
+    for (let i = 0; i < X.fields.length; i++) row[X.fields[i].key] = vals[i];
+    return row;
+}"""
+
+
+def _field(key: str, spec: Union[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Normalize a field spec into the engine's representation."""
+    if isinstance(spec, str):
+        selector, _, attr = spec.partition("@")
+        spec = {"selector": selector.strip()}
+        if attr:
+            spec["attr"] = attr.strip()
+    spec = dict(spec)
+
+    source, name = spec.get("source", "text"), None
+    if "attr" in spec:
+        name = spec["attr"]
+        source = "prop" if name in _URL_ATTRS else "attr"
+    elif "prop" in spec:
+        source, name = "prop", spec["prop"]
+    if source not in SOURCES:
+        raise ValueError(f"Field {key!r}: unknown source {source!r} (expected {', '.join(SOURCES)})")
+
+    transforms = spec.get("transform", spec.get("transforms", []))
+    if isinstance(transforms, str):
+        transforms = [transforms]
+    for t in transforms:
+        if t not in TRANSFORMS:
+            raise ValueError(f"Field {key!r}: unknown transform {t!r} (expected {', '.join(TRANSFORMS)})")
+
+    return {
+        "key": key,
+        "selector": spec.get("selector", "").strip() or None,
+        "source": source,
+        "name": name,
+        "transforms": list(transforms),
+        "required": bool(spec.get("required", False)),
+        "all": bool(spec.get("all", False)),
+        "default": spec.get("default"),
+        "js": spec.get("js"),
+        "type": spec.get("type"),
+    }
+
+
+class Schema:
+    """
+    A compiled extraction schema.
+
+    Args:
+        spec: {"container": css, "fields": {name: field spec}, "unique":
+              field name to dedupe rows on, "limit": max rows}
+    """
+
+    def __init__(self, spec: Dict[str, Any]):
+        if not spec.get("fields"):
+            raise ValueError("Schema needs at least one field")
+        self.spec = spec
+        self.container: Optional[str] = spec.get("container")
+        self.fields = [_field(key, field) for key, field in spec["fields"].items()]
+        self.unique: Optional[str] = spec.get("unique")
+        if self.unique is not None and self.unique not in spec["fields"]:
+            raise ValueError(f"unique field {self.unique!r} is not in fields")
+        self.limit: Optional[int] = spec.get("limit")
+
+        custom = []
+        engine_fields = []
+        for f in self.fields:
+            engine_field = {k: v for k, v in f.items() if k != "js"}
+            engine_field["custom"] = -1
+            if f["js"]:
+                engine_field["custom"] = len(custom)
+                custom.append(f["js"])
+            engine_fields.append(engine_field)
+        engine_spec = {"container": self.container, "fields": engine_fields,
+                       "unique": self.unique, "limit": self.limit}
+        engine = _ENGINE % {"spec": json.dumps(engine_spec), "custom": ", ".join(custom)}
+        self.id = hashlib.sha1(engine.encode("utf-8")).hexdigest()[:12]
+        key = f"__cfx_{self.id}"
+        self.columns_js = _COLUMNS_JS % {"key": key, "engine": engine}
+        self.item_js = _ITEM_JS % {"key": key, "engine": engine}
+
+    @property
+    def names(self) -> List[str]:
+        return [f["key"] for f in self.fields]
+
+    def column_types(self) -> Dict[str, str]:
+        """{field: Arrow type name} of the extracted columns ("all" fields are lists)."""
+        types = {}
+        for f in self.fields:
+            numeric = [t for t in f["transforms"] if t in ("int", "float")]
+            kind = f["type"] or {"int": "int64", "float": "double"}.get(numeric[-1] if numeric else "", "string")
+            types[f["key"]] = f"list<{kind}>" if f["all"] else kind
+        return types
+
+    @classmethod
+    def coerce(cls, schema: Union["Schema", Dict[str, Any]]) -> "Schema":
+        return schema if isinstance(schema, Schema) else cls(schema)
+
+
+def extract(page: Any, schema: Union[Schema, Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Run a schema on a sync page.
+
+    Returns:
+        Dict with: columns ({field: [values]}), count (rows), skipped (rows
+        missing a required field), duplicates (rows dropped by unique),
+        containers (elements matched)
+    """
+    return page.evaluate(Schema.coerce(schema).columns_js)
+
+
+async def extract_async(page: Any, schema: Union[Schema, Dict[str, Any]]) -> Dict[str, Any]:
+    """Async version of extract()."""
+    return await page.evaluate(Schema.coerce(schema).columns_js)
+
+
+def rows(data: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Row dicts from a columnar extract() result, built lazily."""
+    columns = data["columns"]
+    names = list(columns)
+    for values in zip(*(columns[name] for name in names)):
+        yield dict(zip(names, values))
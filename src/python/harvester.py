@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Infinite-Scroll Harvester
+=========================
+Scrolls (or clicks "load more"/"next") until a target item count or an end
+condition is reached, extracting only the items that appeared since the
+previous round and yielding deduplicated records as they arrive. Callers
+get the first records after the first round instead of after the page is
+exhausted, and nothing is accumulated besides the dedupe keys.
+
+Each round is a single evaluate call that extracts unseen items (tracked in
+a WeakSet in the isolated world) and then scrolls; a readiness wait follows
+instead of a fixed sleep.
+
+Usage:
+  from harvester import Harvester
+
+  harvester = Harvester(
+      item_selector=".poly-card",
+      extract="(card) => ({title: card.querySelector('h3')?.innerText, link: card.querySelector('a')?.href})",
+      key="link",
+      max_items=200,
+  )
+  for record in harvester.harvest(page):
+      print(record["title"])
+
+  async for record in harvester.harvest_async(page):
+      ...
+"""
+
+import hashlib
+import itertools
+import json
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Union
+
+from wait_strategies import wait_until_ready, wait_until_ready_async
+
+_run_ids = itertools.count(1)
+
+# The extractor and end condition are inlined (no eval, so page CSP cannot
+# interfere). Items whose extractor returns null are retried next round,
+# which covers cards that are still hydrating.
+_ROUND_JS = """(opts) => {
+    const extract = %s;
+    const H = window.__cfHarvest || (window.__cfHarvest = {});
+    const seen = H[opts.run] || (H[opts.run] = new WeakSet());
+    const records = [];
+    let errors = 0;
+    for (const el of document.querySelectorAll(opts.selector)) {
+        if (seen.has(el)) continue;
+        try {
+            const record = extract(el);
+            if (!record) continue;
+            records.push(record);
+        } catch (e) {
+            errors++;
+        }
+        seen.add(el);
+        if (records.length >= opts.batch) break;
+    }
+    const ended = !!(%s);
+    const scroller = document.scrollingElement || document.documentElement;
+    const before = scroller.scrollTop;
+    if (opts.scroll && records.length < opts.batch) {
+        window.scrollBy(0, Math.round(window.innerHeight * opts.scroll));
+    }
+    const atBottom = scroller.scrollTop + window.innerHeight >= scroller.scrollHeight - 2;
+    return {records, errors, ended, moved: scroller.scrollTop !== before, atBottom};
+}"""
+
+_END_SELECTOR_JS = "(selector) => !!document.querySelector(selector)"
+
+
+def _default_key(record: Dict[str, Any]) -> str:
+    raw = json.dumps(record, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class Harvester:
+    """
+    Incremental item extraction from infinite-scroll and paginated listings.
+
+    Args:
+        item_selector: CSS selector of one item (card, row...)
+        extract: JS function source `(el) => record` (return null to skip)
+        key: Record field (or function(record) -> hashable) used to dedupe;
+             default: the whole record
+        max_items: Stop after yielding this many records
+        max_rounds: Stop after this many scroll/click rounds
+        scroll: Viewport heights scrolled per round (0 disables scrolling)
+        settle: Readiness conditions after each scroll (see wait_strategies)
+        settle_timeout: Upper bound in ms for settle
+        stall_rounds: Rounds without new records (at the bottom) before
+                      trying next_selector or stopping
+        next_selector: "Load more"/"next page" control clicked when stalled
+        next_settle: Readiness conditions after clicking next_selector
+        end_selector: Stop once this element exists (e.g. "end of results")
+        end_condition: Stop once this JS expression is truthy
+        batch: Max records extracted per round (bounds payload size)
+    """
+
+    def __init__(
+        self,
+        item_selector: str,
+        extract: str,
+        key: Union[None, str, Callable[[Dict[str, Any]], Any]] = None,
+        max_items: Optional[int] = None,
+        max_rounds: int = 100,
+        scroll: float = 0.9,
+        settle: Any = "dom_quiet:200",
+        settle_timeout: int = 3000,
+        stall_rounds: int = 3,
+        next_selector: Optional[str] = None,
+        next_settle: Any = "network_quiet:500/2,dom_quiet:300",
+        end_selector: Optional[str] = None,
+        end_condition: Optional[str] = None,
+        batch: int = 500,
+    ):
+        self.item_selector = item_selector
+        self.extract = extract
+        if key is None:
+            self._key = _default_key
+        elif isinstance(key, str):
+            self._key = lambda record, field=key: record.get(field)
+        else:
+            self._key = key
+        self.max_items = max_items
+        self.max_rounds = max_rounds
+        self.scroll = scroll
+        self.settle = settle
+        self.settle_timeout = settle_timeout
+        self.stall_rounds = stall_rounds
+        self.next_selector = next_selector
+        self.next_settle = next_settle
+        self.end_selector = end_selector
+        self.end_condition = end_condition
+        self.batch = batch
+        self._js = _ROUND_JS % (extract, end_condition or "false")
+        self.stats: Dict[str, Any] = {}
+
+    def _start(self) -> Dict[str, Any]:
+        self.stats = {"rounds": 0, "yielded": 0, "duplicates": 0, "errors": 0, "next_clicks": 0, "stop": None}
+        return {
+            "run": f"h{next(_run_ids)}",
+            "selector": self.item_selector,
+            "scroll": self.scroll,
+            "batch": self.batch,
+            "stall": 0,
+            "seen": set(),
+        }
+
+    def _fresh(self, state: Dict[str, Any], round_result: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """New unique records of a round, updating stall and stop bookkeeping."""
+        self.stats["rounds"] += 1
+        self.stats["errors"] += round_result["errors"]
+        fresh = []
+        for record in round_result["records"]:
+            key = self._key(record)
+            if key is None or key in state["seen"]:
+                self.stats["duplicates"] += 1
+                continue
+            state["seen"].add(key)
+            fresh.append(record)
+            if self.max_items is not None and self.stats["yielded"] + len(fresh) >= self.max_items:
+                break
+        self.stats["yielded"] += len(fresh)
+        moving = round_result["moved"] and not round_result["atBottom"]
+        state["stall"] = 0 if fresh or moving else state["stall"] + 1
+        return fresh
+
+    def _stop_reason(self, state: Dict[str, Any], round_result: Dict[str, Any], end_seen: bool) -> Optional[str]:
+        if self.max_items is not None and self.stats["yielded"] >= self.max_items:
+            return "max_items"
+        if round_result["ended"] or end_seen:
+            return "end_condition"
+        if self.stats["rounds"] >= self.max_rounds:
+            return "max_rounds"
+        if state["stall"] >= self.stall_rounds and not self.next_selector:
+            return "exhausted"
+        return None
+
+    def _options(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        return {k: state[k] for k in ("run", "selector", "scroll", "batch")}
+
+    def harvest(self, page: Any) -> Iterator[Dict[str, Any]]:
+        """Yield unique records from a sync page until a stop condition."""
+        state = self._start()
+        while True:
+            round_result = page.evaluate(self._js, self._options(state))
+            yield from self._fresh(state, round_result)
+            end_seen = bool(self.end_selector) and page.evaluate(_END_SELECTOR_JS, self.end_selector)
+            reason = self._stop_reason(state, round_result, end_seen)
+            if reason:
+                self.stats["stop"] = reason
+                return
+            if state["stall"] >= self.stall_rounds:
+                button = page.query_selector(self.next_selector)
+                if button is None or not button.is_visible():
+                    self.stats["stop"] = "exhausted"
+                    return
+                button.click()
+                self.stats["next_clicks"] += 1
+                state["stall"] = 0
+                wait_until_ready(page, self.next_settle, timeout=self.settle_timeout * 3)
+            elif self.settle:
+                wait_until_ready(page, self.settle, timeout=self.settle_timeout)
+
+    async def harvest_async(self, page: Any) -> AsyncIterator[Dict[str, Any]]:
+        """Async version of harvest()."""
+        state = self._start()
+        while True:
+            round_result = await page.evaluate(self._js, self._options(state))
+            for record in self._fresh(state, round_result):
+                yield record
+            end_seen = bool(self.end_selector) and await page.evaluate(_END_SELECTOR_JS, self.end_selector)
+            reason = self._stop_reason(state, round_result, end_seen)
+            if reason:
+                self.stats["stop"] = reason
+                return
+            if state["stall"] >= self.stall_rounds:
+                button = await page.query_selector(self.next_selector)
+                if button is None or not await button.is_visible():
+                    self.stats["stop"] = "exhausted"
+                    return
+                await button.click()
+                self.stats["next_clicks"] += 1
+                state["stall"] = 0
+                await wait_until_ready_async(page, self.next_settle, timeout=self.settle_timeout * 3)
+            elif self.settle:
+                await wait_until_ready_async(page, self.settle, timeout=self.settle_timeout)
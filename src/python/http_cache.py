@@ -0,0 +1,455 @@
+#!/usr/bin/env python3
+"""
+HTTP Response Cache
+===================
+Interception-based cache in front of a page's network layer. Responses are
+stored in a size-bounded on-disk store (SQLite index + body files) with LRU
+eviction, keyed by URL + the request headers named in Vary. Cache-Control /
+Expires freshness and ETag / Last-Modified revalidation are honored, and
+per-domain overrides can force-cache static assets.
+
+Camoufox runs with the browser cache disabled and Playwright bypasses it
+whenever routing is active, so without this layer every visit re-downloads
+every asset through the proxy.
+
+Usage:
+  from http_cache import HttpCache
+
+  cache = HttpCache("~/.cache/camoufox-browser/http", max_bytes=512 * 2**20,
+                    force_cache={"http2.mlstatic.com": 7 * 86400})
+  result = browse(url, http_cache=cache)
+  print(result["http_cache"])   # hits, misses, revalidated, bytes_saved...
+
+  session = cache.attach(page)  # or: await cache.attach_async(page)
+  page.goto(url)
+  print(session.stats(), cache.stats())
+"""
+
+import asyncio
+import email.utils
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+DEFAULT_CACHE_DIR = "~/.cache/camoufox-browser/http"
+
+# Not replayed from the cache: bodies are stored decoded, cookies are per session.
+_DROP_HEADERS = {
+    "content-encoding", "content-length", "transfer-encoding", "connection",
+    "keep-alive", "set-cookie", "set-cookie2",
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    vary TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    headers TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    stored_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_url ON entries(url);
+CREATE INDEX IF NOT EXISTS entries_access ON entries(last_access);
+"""
+
+
+def _cache_control(headers: Dict[str, str]) -> Dict[str, Optional[str]]:
+    directives: Dict[str, Optional[str]] = {}
+    for part in headers.get("cache-control", "").split(","):
+        name, _, value = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = value.strip('"') or None
+    return directives
+
+
+def _http_date(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return email.utils.parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def _host_matches(host: str, domains: Dict[str, float]) -> Optional[float]:
+    for domain, ttl in domains.items():
+        if host == domain or host.endswith("." + domain):
+            return ttl
+    return None
+
+
+class CacheEntry:
+    """Metadata of a stored response (the body lives in a file)."""
+
+    def __init__(self, row: sqlite3.Row):
+        self.key = row["key"]
+        self.url = row["url"]
+        self.vary = json.loads(row["vary"])
+        self.status = row["status"]
+        self.headers = json.loads(row["headers"])
+        self.size = row["size"]
+        self.expires_at = row["expires_at"]
+        self.etag = row["etag"]
+        self.last_modified = row["last_modified"]
+
+    def is_fresh(self, now: float) -> bool:
+        return now < self.expires_at
+
+    def validators(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["if-none-match"] = self.etag
+        if self.last_modified:
+            headers["if-modified-since"] = self.last_modified
+        return headers
+
+
+class HttpCache:
+    """
+    Shared on-disk response store. Thread-safe; attach() it to any number
+    of pages/contexts, each getting its own CacheSession counters.
+
+    Args:
+        directory: Where the index and bodies live
+        max_bytes: Total body size kept before least recently used entries go
+        force_cache: {domain: seconds} treated as fresh for that long
+                     regardless of response headers (static asset hosts)
+        resource_types: Only cache these Playwright resource types (None = all)
+    """
+
+    def __init__(
+        self,
+        directory: str = DEFAULT_CACHE_DIR,
+        max_bytes: int = 512 * 1024 * 1024,
+        force_cache: Optional[Dict[str, float]] = None,
+        resource_types: Optional[List[str]] = None,
+    ):
+        self.directory = os.path.expanduser(directory)
+        self.max_bytes = max_bytes
+        self.force_cache = dict(force_cache or {})
+        self.resource_types = set(resource_types) if resource_types else None
+        os.makedirs(os.path.join(self.directory, "bodies"), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(
+            os.path.join(self.directory, "index.sqlite"), check_same_thread=False
+        )
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        self._total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        self.evictions = 0
+
+    # -- storage -----------------------------------------------------------
+
+    def _body_path(self, key: str) -> str:
+        return os.path.join(self.directory, "bodies", key[:2], key)
+
+    @staticmethod
+    def _key(url: str, vary: Dict[str, str]) -> str:
+        raw = url + "\n" + json.dumps(vary, sort_keys=True)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def lookup(self, url: str, request_headers: Dict[str, str]) -> Optional[CacheEntry]:
+        """Stored entry whose Vary'd request headers match, if any."""
+        with self._lock:
+            rows = self._db.execute("SELECT * FROM entries WHERE url = ?", (url,)).fetchall()
+        for row in rows:
+            entry = CacheEntry(row)
+            if all(request_headers.get(name, "") == value for name, value in entry.vary.items()):
+                return entry
+        return None
+
+    def read_body(self, entry: CacheEntry) -> Optional[bytes]:
+        try:
+            with open(self._body_path(entry.key), "rb") as f:
+                body = f.read()
+        except OSError:
+            self.delete(entry.key)
+            return None
+        with self._lock:
+            self._db.execute(
+                "UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), entry.key)
+            )
+            self._db.commit()
+        return body
+
+    def freshness(self, url: str, headers: Dict[str, str], now: float) -> Optional[float]:
+        """Expiry timestamp for a response, or None if it must not be stored."""
+        host = (urlsplit(url).hostname or "").lower()
+        forced = _host_matches(host, self.force_cache)
+        if forced is not None:
+            return now + forced
+
+        cc = _cache_control(headers)
+        if "no-store" in cc or headers.get("vary", "").strip() == "*":
+            return None
+        has_validator = "etag" in headers or "last-modified" in headers
+        if "no-cache" in cc:
+            return now if has_validator else None
+        if cc.get("max-age") is not None:
+            try:
+                age = float(headers.get("age", 0) or 0)
+                return now + max(0.0, float(cc["max-age"]) - age)
+            except ValueError:
+                pass
+        expires = _http_date(headers.get("expires"))
+        if expires is not None:
+            date = _http_date(headers.get("date")) or now
+            return now + max(0.0, expires - date)
+        last_modified = _http_date(headers.get("last-modified"))
+        if last_modified is not None:
+            # RFC 9111 heuristic: 10% of the time since last modification, max 1 day
+            return now + min(86400.0, max(0.0, now - last_modified) * 0.1)
+        return now if has_validator else None
+
+    def store(
+        self,
+        url: str,
+        request_headers: Dict[str, str],
+        status: int,
+        headers: Dict[str, str],
+        body: bytes,
+    ) -> bool:
+        """Store a response if cacheable. Returns True if stored."""
+        now = time.time()
+        if status != 200:
+            return False
+        expires_at = self.freshness(url, headers, now)
+        if expires_at is None or len(body) > self.max_bytes // 4:
+            return False
+
+        vary_names = [
+            name.strip().lower() for name in headers.get("vary", "").split(",") if name.strip()
+        ]
+        vary = {name: request_headers.get(name, "") for name in vary_names}
+        key = self._key(url, vary)
+        kept = {k: v for k, v in headers.items() if k.lower() not in _DROP_HEADERS}
+
+        path = self._body_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(body)
+        os.replace(tmp, path)
+
+        with self._lock:
+            old = self._db.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            self._total += len(body) - (old["size"] if old else 0)
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, url, json.dumps(vary), status, json.dumps(kept), len(body), now,
+                 expires_at, headers.get("etag"), headers.get("last-modified"), now),
+            )
+            self._db.commit()
+        self._evict()
+        return True
+
+    def refresh(self, entry: CacheEntry, headers: Dict[str, str]):
+        """Extend an entry after a 304 Not Modified."""
+        now = time.time()
+        merged = dict(entry.headers)
+        merged.update({k: v for k, v in headers.items() if k.lower() not in _DROP_HEADERS})
+        expires_at = self.freshness(entry.url, merged, now) or now
+        with self._lock:
+            self._db.execute(
+                "UPDATE entries SET headers = ?, expires_at = ?, last_access = ? WHERE key = ?",
+                (json.dumps(merged), expires_at, now, entry.key),
+            )
+            self._db.commit()
+
+    def delete(self, key: str):
+        with self._lock:
+            row = self._db.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            if row:
+                self._total -= row["size"]
+                self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._db.commit()
+        try:
+            os.remove(self._body_path(key))
+        except OSError:
+            pass
+
+    def _evict(self):
+        """Drop least recently used entries until 90% of max_bytes."""
+        if self._total <= self.max_bytes:
+            return
+        target = self.max_bytes * 0.9
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT key, size FROM entries ORDER BY last_access"
+            ).fetchall()
+        for row in rows:
+            if self._total <= target:
+                break
+            self.delete(row["key"])
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            keys = [row["key"] for row in self._db.execute("SELECT key FROM entries")]
+        for key in keys:
+            self.delete(key)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        return {
+            "entries": entries,
+            "size_bytes": self._total,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+        }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    # -- interception --------------------------------------------------------
+
+    def session(self) -> "CacheSession":
+        return CacheSession(self)
+
+    def attach(self, target: Any) -> "CacheSession":
+        """Serve a sync Page/BrowserContext through the cache."""
+        session = self.session()
+        target.route("**/*", session._handle)
+        return session
+
+    async def attach_async(self, target: Any) -> "CacheSession":
+        """Serve an async Page/BrowserContext through the cache."""
+        session = self.session()
+        await target.route("**/*", session._handle_async)
+        return session
+
+
+class CacheSession:
+    """Route handlers plus hit/miss counters for one page or context."""
+
+    def __init__(self, cache: HttpCache):
+        self.cache = cache
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.stored = 0
+        self.failed = 0
+        self.bytes_saved = 0
+
+    def _cacheable(self, request: Any) -> bool:
+        if request.method != "GET" or not request.url.startswith(("http://", "https://")):
+            return False
+        if self.cache.resource_types and request.resource_type not in self.cache.resource_types:
+            return False
+        return "range" not in request.headers
+
+    def _plan(self, request: Any) -> Tuple[str, Optional[CacheEntry], Optional[bytes]]:
+        """("fresh" | "stale" | "miss", entry, cached body)."""
+        entry = self.cache.lookup(request.url, request.headers)
+        if entry is None:
+            return "miss", None, None
+        body = self.cache.read_body(entry)
+        if body is None:
+            return "miss", None, None
+        if entry.is_fresh(time.time()):
+            return "fresh", entry, body
+        if entry.validators():
+            return "stale", entry, body
+        return "miss", None, None
+
+    def _hit(self, entry: CacheEntry, body: bytes) -> Dict[str, Any]:
+        self.hits += 1
+        self.bytes_saved += len(body)
+        return {"status": entry.status, "headers": entry.headers, "body": body}
+
+    def _update(self, request: Any, entry: Optional[CacheEntry], status: int, headers: Dict[str, str],
+                fetched: Optional[bytes]) -> str:
+        """Update the store after a fetch: "revalidated", "stored" or "miss"."""
+        if entry is not None and status == 304:
+            self.cache.refresh(entry, headers)
+            return "revalidated"
+        if fetched is not None and self.cache.store(request.url, request.headers, status, headers, fetched):
+            return "stored"
+        return "miss"
+
+    def _count(self, outcome: str, entry: Optional[CacheEntry], body: Optional[bytes]) -> Optional[Dict[str, Any]]:
+        """Count an _update() outcome; returns fulfill kwargs when serving from cache."""
+        if outcome == "revalidated":
+            self.revalidated += 1
+            return self._hit(entry, body)
+        self.misses += 1
+        if outcome == "stored":
+            self.stored += 1
+        return None
+
+    def _handle(self, route: Any):
+        request = route.request
+        if not self._cacheable(request):
+            route.fallback()
+            return
+        state, entry, body = self._plan(request)
+        if state == "fresh":
+            route.fulfill(**self._hit(entry, body))
+            return
+        extra = entry.validators() if state == "stale" else {}
+        try:
+            # 3xx are passed on (never stored) so the final page is not cached under this URL
+            response = route.fetch(headers={**request.headers, **extra}, max_redirects=0)
+            fetched = response.body() if response.status == 200 else None
+        except Exception:
+            self.failed += 1
+            route.abort("failed")
+            return
+        outcome = self._update(request, entry, response.status, response.headers, fetched)
+        cached = self._count(outcome, entry, body)
+        if cached:
+            route.fulfill(**cached)
+        else:
+            route.fulfill(response=response, body=fetched)
+
+    async def _handle_async(self, route: Any):
+        request = route.request
+        if not self._cacheable(request):
+            await route.fallback()
+            return
+        # The index and body files are blocking I/O: keep them off the event loop
+        state, entry, body = await asyncio.to_thread(self._plan, request)
+        if state == "fresh":
+            await route.fulfill(**self._hit(entry, body))
+            return
+        extra = entry.validators() if state == "stale" else {}
+        try:
+            response = await route.fetch(headers={**request.headers, **extra}, max_redirects=0)
+            fetched = await response.body() if response.status == 200 else None
+        except Exception:
+            self.failed += 1
+            await route.abort("failed")
+            return
+        outcome = await asyncio.to_thread(
+            self._update, request, entry, response.status, response.headers, fetched
+        )
+        cached = self._count(outcome, entry, body)
+        if cached:
+            await route.fulfill(**cached)
+        else:
+            await route.fulfill(response=response, body=fetched)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidated": self.revalidated,
+            "stored": self.stored,
+            "failed": self.failed,
+            "bytes_saved": self.bytes_saved,
+            "hit_rate": round(self.hits / total, 3) if total else None,
+        }
@@ -0,0 +1,674 @@
+#!/usr/bin/env python3
+"""
+Browse Instrumentation
+======================
+Per-call latency breakdown, network stats and browser resource usage for
+browse()/browse_async(), attached to every result and optionally exported.
+
+Each call is measured as a set of phases:
+  proxy       waiting for a proxy lease
+  display     starting (or leasing) the virtual display
+  launch      starting Camoufox and opening the page (cold launches)
+  context     borrowing a pool browser and opening a fresh context and page
+  rate_limit  waiting for the domain's rate limit
+  navigate    page.goto() up to DOMContentLoaded
+  wait        wait_for selector and readiness conditions
+  extract     text, links and schema extraction
+  screenshot  capture (or hand-off to a ScreenshotPipeline)
+  action      the caller's action
+
+and reported in result["timings"] as "<phase>_ms" plus "total_ms". Requests
+the page makes are counted in result["network"] (requests, failed, bytes from
+Content-Length, per resource type, and the slowest resources). With psutil
+installed, the browser process tree (Playwright driver and Camoufox
+processes) is sampled in the background while calls run, and
+result["resources"] holds RSS and CPU over the call. Samples cover every
+browser of this process, so concurrent calls see the same figures.
+
+Exporters receive each measured result:
+  PrometheusExporter(path=..., port=...)  text exposition format: a file for
+                                          node_exporter's textfile collector
+                                          and/or a local /metrics endpoint
+  SpanExporter(path=..., url=...)         OpenTelemetry-style traces (OTLP/JSON,
+                                          a "browse" span with a child span per
+                                          phase) as JSON lines or POSTed to an
+                                          OTLP/HTTP collector (/v1/traces)
+
+Usage:
+  from instrumentation import default_instrumentation, PrometheusExporter, SpanExporter
+
+  result = browse(url)
+  print(result["timings"])     # {"launch_ms": 2210.4, "navigate_ms": 640.2, ..., "total_ms": 3300.8}
+  print(result["network"])     # {"requests": 42, "failed": 1, "bytes": 812345, "slowest": [...], ...}
+  print(result["resources"])   # {"rss_mb_max": 512.3, "cpu_pct_avg": 37.5, ...} (needs psutil)
+
+  instrumentation = default_instrumentation()
+  instrumentation.add_exporter(PrometheusExporter(path="/var/lib/node_exporter/camoufox.prom"))
+  instrumentation.add_exporter(SpanExporter(url="http://localhost:4318/v1/traces"))
+  instrumentation.add_exporter(lambda result, measurement: print(result["timings"]))
+
+Environment (default_instrumentation):
+  CAMOUFOX_METRICS_FILE: Prometheus textfile to keep updated
+  CAMOUFOX_METRICS_PORT: Serve Prometheus metrics on 127.0.0.1:<port>/metrics
+  CAMOUFOX_TRACES_FILE: Append OTLP/JSON trace batches to this file
+  CAMOUFOX_TRACES_URL: POST OTLP/JSON trace batches to this collector URL
+  CAMOUFOX_SAMPLE_INTERVAL: Seconds between resource samples (0 disables)
+"""
+
+import atexit
+import heapq
+import json
+import os
+import queue
+import threading
+import time
+import urllib.request
+from contextlib import AsyncExitStack, ExitStack, asynccontextmanager, contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+
+class NetworkStats:
+    """Counts the requests of one page (attach before navigating)."""
+
+    def __init__(self, slowest: int = 5):
+        self.slowest = slowest
+        self.requests = 0
+        self.failed = 0
+        self.bytes = 0
+        self.unsized = 0      # responses without Content-Length (chunked, streamed)
+        self.by_type: Dict[str, int] = {}
+        self._started: Dict[Any, float] = {}
+        self._status: Dict[Any, int] = {}
+        self._heap: List[Tuple[float, int, Dict[str, Any]]] = []
+        self._seq = 0
+
+    def attach(self, page):
+        # Plain callbacks work with both the sync and the async API
+        page.on("request", self._on_request)
+        page.on("response", self._on_response)
+        page.on("requestfinished", self._on_finished)
+        page.on("requestfailed", self._on_failed)
+
+    def _on_request(self, request):
+        self.requests += 1
+        kind = request.resource_type
+        self.by_type[kind] = self.by_type.get(kind, 0) + 1
+        self._started[request] = time.perf_counter()
+
+    def _on_response(self, response):
+        self._status[response.request] = response.status
+        length = response.headers.get("content-length")
+        if length and length.isdigit():
+            self.bytes += int(length)
+        else:
+            self.unsized += 1
+
+    def _on_finished(self, request):
+        started = self._started.pop(request, None)
+        status = self._status.pop(request, None)
+        if started is None:
+            return
+        elapsed = (time.perf_counter() - started) * 1000
+        self._seq += 1
+        entry = (elapsed, self._seq, {"url": request.url, "type": request.resource_type,
+                                      "status": status, "ms": round(elapsed, 1)})
+        if len(self._heap) < self.slowest:
+            heapq.heappush(self._heap, entry)
+        elif elapsed > self._heap[0][0]:
+            heapq.heapreplace(self._heap, entry)
+
+    def _on_failed(self, request):
+        self.failed += 1
+        self._started.pop(request, None)
+        self._status.pop(request, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "failed": self.failed,
+            "bytes": self.bytes,
+            "unsized": self.unsized,
+            "by_type": dict(self.by_type),
+            "slowest": [entry for _, _, entry in sorted(self._heap, reverse=True)],
+        }
+
+
+class _Window:
+    """Resource samples taken while one call was running."""
+
+    def __init__(self):
+        self.samples = 0
+        self.rss_max = 0
+        self.rss_sum = 0
+        self.cpu_max = 0.0
+        self.cpu_sum = 0.0
+        self.processes = 0
+
+    def add(self, rss: int, cpu: float, processes: int):
+        self.samples += 1
+        self.rss_max = max(self.rss_max, rss)
+        self.rss_sum += rss
+        self.cpu_max = max(self.cpu_max, cpu)
+        self.cpu_sum += cpu
+        self.processes = max(self.processes, processes)
+
+    def summary(self) -> Optional[Dict[str, Any]]:
+        if not self.samples:
+            return None
+        return {
+            "rss_mb_max": round(self.rss_max / 2**20, 1),
+            "rss_mb_avg": round(self.rss_sum / self.samples / 2**20, 1),
+            "cpu_pct_max": round(self.cpu_max, 1),
+            "cpu_pct_avg": round(self.cpu_sum / self.samples, 1),
+            "processes": self.processes,
+            "samples": self.samples,
+        }
+
+
+class ResourceSampler:
+    """
+    Samples RSS and CPU of this process's descendants (the browsers) from one
+    background thread, only while at least one window is open.
+    """
+
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self._windows: List[_Window] = []
+        self._processes: Dict[int, Any] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def available(self) -> bool:
+        return PSUTIL_AVAILABLE and self.interval > 0
+
+    @contextmanager
+    def window(self) -> Iterator[Optional[_Window]]:
+        if not self.available:
+            yield None
+            return
+        window = _Window()
+        with self._lock:
+            self._windows.append(window)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="resource-sampler", daemon=True)
+                self._thread.start()
+        try:
+            yield window
+        finally:
+            with self._lock:
+                self._windows.remove(window)
+            if not window.samples:
+                # Calls shorter than the interval still get one reading
+                reading = self.sample()
+                if reading[2]:
+                    window.add(*reading)
+
+    def sample(self) -> Tuple[int, float, int]:
+        """Current (rss bytes, cpu percent, process count) of the browser processes."""
+        try:
+            children = psutil.Process().children(recursive=True)
+        except psutil.Error:
+            return 0, 0.0, 0
+        rss, cpu, alive = 0, 0.0, {}
+        with self._lock:
+            for child in children:
+                # cpu_percent() compares with the previous call on the same object
+                process = self._processes.get(child.pid, child)
+                try:
+                    rss += process.memory_info().rss
+                    cpu += process.cpu_percent()
+                except psutil.Error:
+                    continue
+                alive[child.pid] = process
+            self._processes = alive
+        return rss, cpu, len(alive)
+
+    def _run(self):
+        while True:
+            reading = self.sample()
+            with self._lock:
+                if not self._windows:
+                    self._thread = None
+                    return
+                for window in self._windows:
+                    window.add(*reading)
+            time.sleep(self.interval)
+
+
+class Measurement:
+    """Phases, network stats and resource window of one browse call."""
+
+    def __init__(self, url: str, slowest: int = 5):
+        self.url = url
+        self.started = time.time()
+        self.network = NetworkStats(slowest)
+        self.resources: Optional[_Window] = None
+        self.spans: List[Tuple[str, float, float]] = []   # (phase, start s, end s) from start
+        self.elapsed: Optional[float] = None
+        self._t0 = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter() - self._t0
+        try:
+            yield
+        finally:
+            self.spans.append((name, start, time.perf_counter() - self._t0))
+
+    @contextmanager
+    def timed(self, name: str, manager: Any):
+        """Enter a context manager, timing only its setup as `name`."""
+        with ExitStack() as stack:
+            with self.phase(name):
+                value = stack.enter_context(manager)
+            yield value
+
+    @asynccontextmanager
+    async def timed_async(self, name: str, manager: Any):
+        async with AsyncExitStack() as stack:
+            with self.phase(name):
+                value = await stack.enter_async_context(manager)
+            yield value
+
+    def attach(self, page):
+        self.network.attach(page)
+
+    def phase_seconds(self) -> Dict[str, float]:
+        """Seconds per phase (a phase entered more than once is summed)."""
+        totals: Dict[str, float] = {}
+        for name, start, end in self.spans:
+            totals[name] = totals.get(name, 0.0) + (end - start)
+        return totals
+
+    def timings(self) -> Dict[str, float]:
+        timings = {f"{name}_ms": round(seconds * 1000, 1) for name, seconds in self.phase_seconds().items()}
+        elapsed = self.elapsed if self.elapsed is not None else time.perf_counter() - self._t0
+        timings["total_ms"] = round(elapsed * 1000, 1)
+        return timings
+
+
+class Exporter:
+    """Hook interface: export() is called with every measured result."""
+
+    def export(self, result: Dict[str, Any], measurement: Measurement):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class _CallbackExporter(Exporter):
+    def __init__(self, callback: Callable[[Dict[str, Any], Measurement], Any]):
+        self.callback = callback
+
+    def export(self, result: Dict[str, Any], measurement: Measurement):
+        self.callback(result, measurement)
+
+
+_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class _Histogram:
+    def __init__(self):
+        self.counts = [0] * len(_BUCKETS)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(_BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+
+    def render(self, name: str, labels: str) -> List[str]:
+        sep = "," if labels else ""
+        lines = [f'{name}_bucket{{{labels}{sep}le="{bound}"}} {count}'
+                 for bound, count in zip(_BUCKETS, self.counts)]
+        lines.append(f'{name}_bucket{{{labels}{sep}le="+Inf"}} {self.count}')
+        suffix = f"{{{labels}}}" if labels else ""
+        lines.append(f"{name}_sum{suffix} {self.sum:.6f}")
+        lines.append(f"{name}_count{suffix} {self.count}")
+        return lines
+
+
+class PrometheusExporter(Exporter):
+    """
+    Aggregates results into Prometheus metrics (text exposition format).
+
+    Args:
+        path: Textfile rewritten atomically, at most every `interval` seconds
+        port: Serve GET /metrics on 127.0.0.1:port
+        interval: Minimum seconds between textfile rewrites
+    """
+
+    def __init__(self, path: Optional[str] = None, port: Optional[int] = None, interval: float = 5.0):
+        self.path = os.path.expanduser(path) if path else None
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._calls = {"true": 0, "false": 0}
+        self._total = _Histogram()
+        self._phases: Dict[str, _Histogram] = {}
+        self._network = {"requests": 0, "failed": 0, "bytes": 0}
+        self._rss = 0
+        self._cpu = 0.0
+        self._written = 0.0
+        self._server = None
+        if port:
+            self._serve(port)
+
+    def export(self, result: Dict[str, Any], measurement: Measurement):
+        with self._lock:
+            self._calls["true" if result.get("success") else "false"] += 1
+            for name, seconds in measurement.phase_seconds().items():
+                self._phases.setdefault(name, _Histogram()).observe(seconds)
+            self._total.observe(measurement.elapsed or 0.0)
+            network = result.get("network") or {}
+            for key in self._network:
+                self._network[key] += network.get(key, 0)
+            resources = result.get("resources")
+            if resources:
+                self._rss = int(resources["rss_mb_max"] * 2**20)
+                self._cpu = resources["cpu_pct_avg"]
+            due = self.path and time.monotonic() - self._written >= self.interval
+        if due:
+            self.write()
+
+    def render(self) -> str:
+        with self._lock:
+            lines = [
+                "# HELP camoufox_browse_total Browse calls by outcome.",
+                "# TYPE camoufox_browse_total counter",
+            ]
+            lines += [f'camoufox_browse_total{{success="{k}"}} {v}' for k, v in self._calls.items()]
+            lines += [
+                "# HELP camoufox_browse_seconds Wall time of browse calls.",
+                "# TYPE camoufox_browse_seconds histogram",
+            ]
+            lines += self._total.render("camoufox_browse_seconds", "")
+            lines += [
+                "# HELP camoufox_phase_seconds Time spent per phase of a browse call.",
+                "# TYPE camoufox_phase_seconds histogram",
+            ]
+            for name in sorted(self._phases):
+                lines += self._phases[name].render("camoufox_phase_seconds", f'phase="{name}"')
+            for key, help_text in (("requests", "Requests made by pages."),
+                                   ("failed", "Page requests that failed or were blocked."),
+                                   ("bytes", "Response bytes (Content-Length) received by pages.")):
+                lines += [
+                    f"# HELP camoufox_network_{key}_total {help_text}",
+                    f"# TYPE camoufox_network_{key}_total counter",
+                    f"camoufox_network_{key}_total {self._network[key]}",
+                ]
+            lines += [
+                "# HELP camoufox_browser_rss_bytes Peak RSS of the browser processes in the last sampled call.",
+                "# TYPE camoufox_browser_rss_bytes gauge",
+                f"camoufox_browser_rss_bytes {self._rss}",
+                "# HELP camoufox_browser_cpu_percent Average CPU of the browser processes in the last sampled call.",
+                "# TYPE camoufox_browser_cpu_percent gauge",
+                f"camoufox_browser_cpu_percent {self._cpu}",
+            ]
+        return "\n".join(lines) + "\n"
+
+    def write(self):
+        """Rewrite the textfile now (atomic rename, so scrapers never see half a file)."""
+        if not self.path:
+            return
+        with self._lock:
+            self._written = time.monotonic()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(tmp, self.path)
+
+    def _serve(self, port: int):
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = exporter.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="prometheus-exporter", daemon=True).start()
+
+    def close(self):
+        self.write()
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def _attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+class SpanExporter(Exporter):
+    """
+    Exports each call as an OpenTelemetry-style trace in OTLP/JSON: a root
+    "browse" span and a child span per phase. Batches are written from a
+    background thread, so a slow collector never delays browsing.
+
+    Args:
+        path: File receiving one OTLP/JSON payload per line
+        url: OTLP/HTTP traces endpoint (e.g. http://localhost:4318/v1/traces)
+        service: service.name resource attribute
+        batch: Spans per payload at most
+        flush_s: Seconds a partial batch waits before being sent
+    """
+
+    def __init__(self, path: Optional[str] = None, url: Optional[str] = None,
+                 service: str = "camoufox-browser", batch: int = 256, flush_s: float = 5.0):
+        if not path and not url:
+            raise ValueError("SpanExporter needs a path or a url")
+        self.path = os.path.expanduser(path) if path else None
+        self.url = url
+        self.service = service
+        self.batch = batch
+        self.flush_s = flush_s
+        self.sent = 0
+        self.errors = 0
+        self._queue: "queue.Queue[Optional[List[Dict[str, Any]]]]" = queue.Queue(maxsize=10000)
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def spans(self, result: Dict[str, Any], measurement: Measurement) -> List[Dict[str, Any]]:
+        trace_id = os.urandom(16).hex()
+        root_id = os.urandom(8).hex()
+        origin = int(measurement.started * 1e9)
+        end = origin + int((measurement.elapsed or 0.0) * 1e9)
+        network = result.get("network") or {}
+        attributes = [
+            _attribute("url.full", result.get("url")),
+            _attribute("browse.success", bool(result.get("success"))),
+            _attribute("network.requests", network.get("requests", 0)),
+            _attribute("network.bytes", network.get("bytes", 0)),
+        ]
+        if result.get("status") is not None:
+            attributes.append(_attribute("http.response.status_code", result["status"]))
+        if result.get("proxy"):
+            attributes.append(_attribute("browse.proxy", result["proxy"]))
+        for key, value in (result.get("resources") or {}).items():
+            attributes.append(_attribute(f"process.{key}", value))
+        root = {
+            "traceId": trace_id, "spanId": root_id, "name": "browse", "kind": 3,
+            "startTimeUnixNano": str(origin), "endTimeUnixNano": str(end),
+            "attributes": attributes,
+            "status": {"code": 1} if result.get("success") else
+                      {"code": 2, "message": str(result.get("error") or "")},
+        }
+        spans = [root]
+        for name, start, stop in measurement.spans:
+            spans.append({
+                "traceId": trace_id, "spanId": os.urandom(8).hex(), "parentSpanId": root_id,
+                "name": name, "kind": 1,
+                "startTimeUnixNano": str(origin + int(start * 1e9)),
+                "endTimeUnixNano": str(origin + int(stop * 1e9)),
+            })
+        return spans
+
+    def export(self, result: Dict[str, Any], measurement: Measurement):
+        try:
+            self._queue.put_nowait(self.spans(result, measurement))
+        except queue.Full:
+            self.errors += 1
+
+    def payload(self, spans: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return {"resourceSpans": [{
+            "resource": {"attributes": [_attribute("service.name", self.service)]},
+            "scopeSpans": [{"scope": {"name": "camoufox_browser"}, "spans": spans}],
+        }]}
+
+    def _send(self, spans: List[Dict[str, Any]]):
+        data = json.dumps(self.payload(spans), separators=(",", ":")).encode()
+        try:
+            if self.path:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                # One write per payload keeps lines whole when processes share the file
+                fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                try:
+                    os.write(fd, data + b"\n")
+                finally:
+                    os.close(fd)
+            if self.url:
+                request = urllib.request.Request(
+                    self.url, data=data, method="POST", headers={"Content-Type": "application/json"},
+                )
+                with urllib.request.urlopen(request, timeout=10) as response:
+                    response.read()
+            self.sent += len(spans)
+        except Exception:
+            self.errors += 1
+
+    def _run(self):
+        pending: List[Dict[str, Any]] = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = []
+            if item:
+                pending.extend(item)
+                deadline = deadline or time.monotonic() + self.flush_s
+            if pending and (item is None or len(pending) >= self.batch or time.monotonic() >= deadline):
+                self._send(pending)
+                pending, deadline = [], None
+            if item is None:
+                return
+
+    def close(self):
+        """Send what is queued and stop the background thread."""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(30)
+
+
+class Instrumentation:
+    """
+    Measures browse calls and hands each result to the exporters.
+
+    Args:
+        exporters: Exporter objects, or callables taking (result, measurement)
+        sample_interval: Seconds between browser resource samples (0: none)
+        slowest: Slowest resources kept per call in result["network"]
+    """
+
+    def __init__(self, exporters: Any = (), sample_interval: float = 0.5, slowest: int = 5):
+        self.exporters: List[Exporter] = []
+        self.sampler = ResourceSampler(sample_interval)
+        self.slowest = slowest
+        self.errors = 0
+        for exporter in exporters:
+            self.add_exporter(exporter)
+
+    def add_exporter(self, exporter: Union[Exporter, Callable]) -> Exporter:
+        if not isinstance(exporter, Exporter):
+            exporter = _CallbackExporter(exporter)
+        self.exporters.append(exporter)
+        return exporter
+
+    @contextmanager
+    def measure(self, result: Dict[str, Any]) -> Iterator[Measurement]:
+        """
+        Measure the call filling `result`: on exit, result gets "timings",
+        "network" and (when sampled) "resources", then exporters run.
+        """
+        measurement = Measurement(result.get("url"), self.slowest)
+        with self.sampler.window() as window:
+            yield measurement
+        measurement.elapsed = time.perf_counter() - measurement._t0
+        measurement.resources = window
+        result["timings"] = measurement.timings()
+        result["network"] = measurement.network.stats()
+        resources = window.summary() if window else None
+        if resources:
+            result["resources"] = resources
+        for exporter in self.exporters:
+            try:
+                exporter.export(result, measurement)
+            except Exception:
+                # A broken exporter must never fail the browse call
+                self.errors += 1
+
+    def close(self):
+        for exporter in self.exporters:
+            exporter.close()
+
+
+_default: Optional[Instrumentation] = None
+_default_lock = threading.Lock()
+
+
+def default_instrumentation() -> Instrumentation:
+    """
+    Process-wide Instrumentation used by every browse path, with exporters
+    configured from the environment on first use.
+    """
+    global _default
+    with _default_lock:
+        if _default is None:
+            exporters: List[Exporter] = []
+            metrics_file = os.environ.get("CAMOUFOX_METRICS_FILE")
+            metrics_port = int(os.environ.get("CAMOUFOX_METRICS_PORT", "0"))
+            if metrics_file or metrics_port:
+                exporters.append(PrometheusExporter(path=metrics_file, port=metrics_port or None))
+            traces_file = os.environ.get("CAMOUFOX_TRACES_FILE")
+            traces_url = os.environ.get("CAMOUFOX_TRACES_URL")
+            if traces_file or traces_url:
+                exporters.append(SpanExporter(path=traces_file, url=traces_url))
+            _default = Instrumentation(
+                exporters,
+                sample_interval=float(os.environ.get("CAMOUFOX_SAMPLE_INTERVAL", "0.5")),
+            )
+            if exporters:
+                atexit.register(_default.close)
+        return _default
@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+"""
+Durable Job Queue
+=================
+SQLite-backed crawl queue, so a run over tens of thousands of URLs that
+dies halfway resumes where it stopped instead of starting over.
+
+Jobs move pending -> leased -> done | failed. A claim leases jobs for
+lease_s seconds under a token; leases of crashed runs expire and the jobs
+are claimed again (recover() settles leases of dead local processes at
+once). Failed attempts, including those of runs that died mid-job, go back
+to pending with exponential backoff until max_attempts, so a page that
+keeps crashing the browser ends up failed instead of retried forever.
+Results are written once per job: completing a job twice keeps the first
+result. Enqueue is idempotent per key (the job "id", or its URL), so
+re-running the same enqueue adds nothing. Batched claims and WAL mode keep
+it at thousands of operations per second.
+
+Usage:
+  from job_queue import JobQueue, run_queue
+
+  queue = JobQueue("crawl.db", max_attempts=3, backoff_s=30)
+  queue.enqueue(urls)                               # URLs or dicts of browse options
+  for result in run_queue(queue, concurrency=8, extract_text=True):
+      print(result["url"], result["success"])       # already persisted
+  print(queue.counts())                             # {"pending": 0, "done": 49870, ...}
+  for result in queue.results():                    # stored results, by job order
+      ...
+
+  # Manual workers
+  for job in queue.claim(16):
+      try:
+          queue.complete(job.id, do_work(job.payload), job.token)
+      except Exception as e:
+          queue.fail(job.id, str(e), job.token)
+
+  # CLI
+  python camoufox_browser.py crawl crawl.db --urls-file urls.txt -c 8 --text
+  python camoufox_browser.py resume crawl.db -o pages.parquet -f parquet
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+STATES = ("pending", "leased", "done", "failed")
+
+
+class Job:
+    """A claimed job: payload plus the lease token to settle it with."""
+
+    def __init__(self, id: int, key: str, payload: Dict[str, Any], attempts: int, token: str):
+        self.id = id
+        self.key = key
+        self.payload = payload
+        self.attempts = attempts
+        self.token = token
+
+    def __repr__(self) -> str:
+        return f"Job({self.id}, {self.key!r}, attempt {self.attempts})"
+
+
+class JobQueue:
+    """
+    Durable job queue in one SQLite file (shared by processes on one host).
+
+    Args:
+        path: Database file
+        lease_s: Seconds a claim is valid before the job can be claimed again
+        max_attempts: Attempts before a job is marked failed
+        backoff_s: Delay before the first retry (doubles per attempt)
+        backoff_max_s: Upper bound of the retry delay
+    """
+
+    def __init__(
+        self,
+        path: str,
+        lease_s: float = 600.0,
+        max_attempts: int = 3,
+        backoff_s: float = 30.0,
+        backoff_max_s: float = 3600.0,
+    ):
+        path = os.path.expanduser(path)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.lease_s = lease_s
+        self.max_attempts = max_attempts
+        self.backoff_s = backoff_s
+        self.backoff_max_s = backoff_max_s
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=60, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS jobs (id INTEGER PRIMARY KEY AUTOINCREMENT, key TEXT NOT NULL UNIQUE,"
+            " payload TEXT NOT NULL, state TEXT NOT NULL DEFAULT 'pending', attempts INTEGER NOT NULL DEFAULT 0,"
+            " not_before REAL NOT NULL DEFAULT 0, owner TEXT, token TEXT, lease_expires REAL, error TEXT,"
+            " updated REAL NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS jobs_ready ON jobs(state, not_before, id);"
+            "CREATE TABLE IF NOT EXISTS results (job_id INTEGER PRIMARY KEY, result TEXT NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);"
+        )
+
+    def _transaction(self, fn: Any) -> Any:
+        """Run fn(db) in an IMMEDIATE transaction (one writer across processes)."""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                value = fn(self._db)
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+            return value
+
+    # -- producing -----------------------------------------------------------
+
+    def enqueue(self, jobs: Iterable[Any], batch: int = 1000) -> int:
+        """Add URLs or job dicts; jobs whose key already exists are skipped. Returns added."""
+        added = 0
+        rows: List[tuple] = []
+
+        def flush(db: sqlite3.Connection) -> int:
+            before = db.total_changes
+            db.executemany(
+                "INSERT OR IGNORE INTO jobs (key, payload, updated) VALUES (?, ?, ?)", rows
+            )
+            return db.total_changes - before
+
+        now = time.time()
+        for job in jobs:
+            payload = dict(job) if isinstance(job, dict) else {"url": job}
+            key = str(payload.pop("id", None) or payload["url"])
+            rows.append((key, json.dumps(payload, ensure_ascii=False), now))
+            if len(rows) >= batch:
+                added += self._transaction(flush)
+                rows = []
+        if rows:
+            added += self._transaction(flush)
+        return added
+
+    # -- consuming -----------------------------------------------------------
+
+    def claim(self, n: int = 1, lease_s: Optional[float] = None) -> List[Job]:
+        """Lease up to n ready jobs (pending past their backoff, or with an expired lease)."""
+        lease_s = self.lease_s if lease_s is None else lease_s
+        token = f"{self.owner}:{uuid.uuid4().hex[:12]}"
+
+        def take(db: sqlite3.Connection) -> List[Job]:
+            now = time.time()
+            # An expired lease is a crashed attempt: the last one allowed fails the job
+            db.execute(
+                "UPDATE jobs SET state = 'failed', error = ?, token = NULL, lease_expires = NULL, updated = ?"
+                " WHERE state = 'leased' AND lease_expires < ? AND attempts >= ?",
+                ("lease expired (worker died?)", now, now, self.max_attempts),
+            )
+            rows = db.execute(
+                "SELECT id, key, payload, attempts FROM jobs"
+                " WHERE (state = 'pending' AND not_before <= ?) OR (state = 'leased' AND lease_expires < ?)"
+                " ORDER BY id LIMIT ?",
+                (now, now, n),
+            ).fetchall()
+            db.executemany(
+                "UPDATE jobs SET state = 'leased', attempts = attempts + 1, owner = ?, token = ?,"
+                " lease_expires = ?, updated = ? WHERE id = ?",
+                [(self.owner, token, now + lease_s, now, row[0]) for row in rows],
+            )
+            return [Job(id, key, json.loads(payload), attempts + 1, token)
+                    for id, key, payload, attempts in rows]
+
+        return self._transaction(take)
+
+    def complete(self, job_id: int, result: Dict[str, Any], token: Optional[str] = None) -> bool:
+        """
+        Store a job's result and mark it done; False if it was already done.
+        The token is not required: work finished after its lease expired is
+        still kept, and whichever attempt completes first wins.
+        """
+        data = json.dumps(result, ensure_ascii=False, default=str)
+
+        def settle(db: sqlite3.Connection) -> bool:
+            row = db.execute("SELECT state FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None or row[0] == "done":
+                return False
+            # A late finisher of an expired lease still delivers the work once
+            db.execute("INSERT OR REPLACE INTO results (job_id, result) VALUES (?, ?)", (job_id, data))
+            db.execute(
+                "UPDATE jobs SET state = 'done', error = NULL, token = NULL, lease_expires = NULL,"
+                " updated = ? WHERE id = ?",
+                (time.time(), job_id),
+            )
+            return True
+
+        return self._transaction(settle)
+
+    def fail(self, job_id: int, error: str, token: str, result: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Record a failed attempt: back to pending with backoff, or "failed"
+        after max_attempts (keeping result, if given). Returns the new state;
+        a stale token (the lease passed to someone else) changes nothing.
+        """
+        def settle(db: sqlite3.Connection) -> str:
+            row = db.execute("SELECT state, attempts, token FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                raise KeyError(job_id)
+            state, attempts, current = row
+            if state != "leased" or current != token:
+                return state
+            if attempts >= self.max_attempts and result is not None:
+                db.execute("INSERT OR REPLACE INTO results (job_id, result) VALUES (?, ?)",
+                           (job_id, json.dumps(result, ensure_ascii=False, default=str)))
+            return self._retry(db, job_id, attempts, error)
+
+        return self._transaction(settle)
+
+    def _retry(self, db: sqlite3.Connection, job_id: int, attempts: int, error: str) -> str:
+        """Settle a failed attempt (transaction held): pending with backoff, or failed."""
+        now = time.time()
+        if attempts >= self.max_attempts:
+            db.execute(
+                "UPDATE jobs SET state = 'failed', error = ?, token = NULL, lease_expires = NULL,"
+                " updated = ? WHERE id = ?",
+                (error, now, job_id),
+            )
+            return "failed"
+        delay = min(self.backoff_max_s, self.backoff_s * 2 ** (attempts - 1))
+        db.execute(
+            "UPDATE jobs SET state = 'pending', error = ?, not_before = ?, token = NULL,"
+            " lease_expires = NULL, updated = ? WHERE id = ?",
+            (error, now + delay, now, job_id),
+        )
+        return "pending"
+
+    def release(self, job_id: int, token: str):
+        """Give back a claimed job that was not attempted (its attempt is not counted)."""
+        self._transaction(lambda db: db.execute(
+            "UPDATE jobs SET state = 'pending', attempts = attempts - 1, token = NULL, lease_expires = NULL,"
+            " updated = ? WHERE id = ? AND state = 'leased' AND token = ?",
+            (time.time(), job_id, token),
+        ))
+
+    def recover(self) -> int:
+        """
+        Settle leases held by dead processes of this host now (others wait
+        for expiry). The attempt counts as failed: the job may be what
+        crashed the process.
+        """
+        host = socket.gethostname()
+
+        def sweep(db: sqlite3.Connection) -> int:
+            stale = 0
+            rows = db.execute("SELECT id, owner, attempts FROM jobs WHERE state = 'leased'").fetchall()
+            for job_id, owner, attempts in rows:
+                owner_host, _, pid = (owner or "").rpartition(":")
+                if owner_host == host and pid.isdigit() and int(pid) != os.getpid() and not _alive(int(pid)):
+                    self._retry(db, job_id, attempts, f"worker {owner} died during attempt {attempts}")
+                    stale += 1
+            return stale
+
+        return self._transaction(sweep)
+
+    def retry_failed(self) -> int:
+        """Send failed jobs back to pending with a fresh attempt budget."""
+        return self._transaction(lambda db: db.execute(
+            "UPDATE jobs SET state = 'pending', attempts = 0, not_before = 0, updated = ? WHERE state = 'failed'",
+            (time.time(),),
+        ).rowcount)
+
+    # -- inspection ----------------------------------------------------------
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._db.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall()
+        counts = dict.fromkeys(STATES, 0)
+        counts.update(rows)
+        return counts
+
+    def next_ready_in(self) -> Optional[float]:
+        """Seconds until some unfinished job can be claimed; None when none is left."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT MIN(CASE state WHEN 'pending' THEN not_before ELSE lease_expires END)"
+                " FROM jobs WHERE state IN ('pending', 'leased')"
+            ).fetchone()
+        return None if row[0] is None else max(0.0, row[0] - time.time())
+
+    def results(self, state: Optional[str] = "done") -> Iterator[Dict[str, Any]]:
+        """Stored results in job order (state None: done and failed)."""
+        query = "SELECT r.result FROM results r JOIN jobs j ON j.id = r.job_id"
+        params: tuple = ()
+        if state:
+            query += " WHERE j.state = ?"
+            params = (state,)
+        # Separate connection so a long export does not hold the queue's lock
+        db = sqlite3.connect(self.path)
+        try:
+            for (data,) in db.execute(query + " ORDER BY r.job_id", params):
+                yield json.loads(data)
+        finally:
+            db.close()
+
+    def get_meta(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set_meta(self, key: str, value: Any):
+        self._transaction(lambda db: db.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, json.dumps(value))
+        ))
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def run_queue(
+    queue: JobQueue,
+    concurrency: int = 4,
+    workers: Optional[int] = None,
+    batch: Optional[int] = None,
+    **browse_options: Any,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Work a JobQueue until nothing is left, persisting each result as it arrives.
+
+    Jobs run through browse_many() (or a ShardedRunner when workers is set);
+    retries are the queue's (max_attempts with backoff), so a crash at any
+    point loses at most the pages in flight. Jobs waiting for their backoff
+    are picked up in later rounds.
+
+    Args:
+        concurrency: Pages in flight (per worker with workers)
+        workers: Worker processes for a ShardedRunner (None: this process only)
+        batch: Jobs leased per claim (default: concurrency)
+        **browse_options: Options for every job (extract_text, schema, ...)
+
+    Yields:
+        Result dicts (with "job": the job key and "attempt"), after they are stored
+    """
+    from camoufox_browser import browse_many
+    from sharded_runner import ShardedRunner
+
+    queue.recover()
+    batch = batch or concurrency
+    while True:
+        claimed: Dict[int, Job] = {}
+
+        def jobs() -> Iterator[Dict[str, Any]]:
+            # Ends when nothing is claimable right now, so the round drains
+            while True:
+                taken = queue.claim(batch)
+                if not taken:
+                    return
+                claimed.update((job.id, job) for job in taken)
+                for job in taken:
+                    yield dict(job.payload, id=job.id)
+
+        if workers:
+            results = ShardedRunner(workers=workers, concurrency=concurrency, **browse_options).run(jobs())
+        else:
+            results = browse_many(jobs(), concurrency=concurrency, **browse_options)
+        try:
+            for result in results:
+                job = claimed.pop(result.pop("id"))
+                result["job"], result["attempt"] = job.key, job.attempts
+                if result["success"]:
+                    queue.complete(job.id, result, job.token)
+                else:
+                    queue.fail(job.id, result.get("error") or "failed", job.token, result)
+                yield result
+        finally:
+            # Leased but never finished (consumer stopped early): back to pending
+            for job in claimed.values():
+                queue.release(job.id, job.token)
+
+        wait = queue.next_ready_in()
+        if wait is None:
+            return
+        time.sleep(min(wait, 60.0))
@@ -0,0 +1,461 @@
+#!/usr/bin/env python3
+"""
+Page Snapshots
+==============
+Compact structured outline of a page for agents: headings, landmarks and
+interactive elements (links, buttons, inputs...) in document order, each
+interactive element with a stable ref, plus link and form summaries.
+Large outlines are served in chunks through a cursor instead of being
+truncated.
+
+Refs ("e12") are kept in Camoufox's isolated world (never written to the
+DOM) and stay the same for an element across snapshots while it lives.
+
+Usage:
+  from page_snapshot import take_snapshot, element_for_ref, watch_changes, take_changes
+
+  snap = take_snapshot(page)
+  chunk = snap.chunk(cursor=0, max_chars=4000)
+  print("\\n".join(chunk["lines"]))       # [e3] link "Ofertas" -> /ofertas
+  while chunk["next_cursor"] is not None:
+      chunk = snap.chunk(chunk["next_cursor"])
+
+  element_for_ref(page, "e3").click()
+
+  # Incremental: only what changed since the snapshot (watch first, then snapshot)
+  watch_changes(page)
+  snap = take_snapshot(page)
+  page.click("text=Ver más")
+  changes = take_changes(page)           # None after a navigation
+  print("\\n".join(changes.lines))      # + [e51] li "..."  ~ [e7] span "..."  - li "..."
+
+  # Async
+  snap = await take_snapshot_async(page)
+  await (await element_for_ref_async(page, "e3")).click()
+"""
+
+import hashlib
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+# Shared helpers, installed once per document in the isolated world.
+_PRELUDE = r"""
+    const S = window.__cfSnap || (window.__cfSnap = (() => {
+        const R = {n: 0, byEl: new WeakMap(), byRef: new Map()};
+        const refOf = (el) => {
+            let ref = R.byEl.get(el);
+            if (!ref) {
+                ref = "e" + (++R.n);
+                R.byEl.set(el, ref);
+                R.byRef.set(ref, new WeakRef(el));
+            }
+            return ref;
+        };
+        const clip = (s, n) => {
+            s = (s || "").replace(/\s+/g, " ").trim();
+            return s.length > n ? s.slice(0, n - 1) + "…" : s;
+        };
+        const shown = (el) => {
+            if (!el.getClientRects().length) return false;
+            const style = getComputedStyle(el);
+            return style.visibility !== "hidden" && style.display !== "none";
+        };
+        const labelOf = (el, n) => clip(
+            el.getAttribute("aria-label")
+            || (el.labels && el.labels[0] && el.labels[0].innerText)
+            || el.getAttribute("placeholder") || el.getAttribute("title")
+            || el.getAttribute("alt") || el.getAttribute("name") || "", n);
+
+        const LANDMARK_TAGS = {HEADER: "banner", NAV: "navigation", MAIN: "main", ASIDE: "complementary",
+                               FOOTER: "contentinfo", SEARCH: "search"};
+        const LANDMARK_ROLES = new Set(["banner", "navigation", "main", "complementary", "contentinfo",
+                                        "search", "region", "dialog"]);
+        const SKIP = new Set(["SCRIPT", "STYLE", "NOSCRIPT", "TEMPLATE", "SVG", "svg", "IFRAME"]);
+        const BUTTON_ROLES = new Set(["button", "tab", "menuitem", "checkbox", "radio", "switch", "option"]);
+
+        // Outline item for one element (null if it is not outline material)
+        const itemOf = (el, opts, acc) => {
+            const tag = el.tagName;
+            const role = el.getAttribute("role");
+            const n = opts.textLimit;
+            let item = null;
+            if (/^H[1-6]$/.test(tag) || role === "heading") {
+                item = {kind: "heading", level: +(el.getAttribute("aria-level") || tag[1] || 2),
+                        text: clip(el.innerText, n)};
+            } else if (LANDMARK_TAGS[tag] || LANDMARK_ROLES.has(role)) {
+                item = {kind: "landmark", role: role || LANDMARK_TAGS[tag], label: labelOf(el, n)};
+            } else if (tag === "FORM") {
+                const fields = Array.from(el.elements).filter(f => f.type !== "hidden" && f.name).map(f => f.name);
+                acc.forms.push({ref: refOf(el), action: el.getAttribute("action") || "",
+                                method: (el.getAttribute("method") || "get").toLowerCase(),
+                                fields: fields.slice(0, 20)});
+                item = {kind: "form", label: labelOf(el, n), fields: fields.length};
+            } else if (tag === "A" && el.hasAttribute("href")) {
+                let href = el.href;
+                try {
+                    const u = new URL(href);
+                    acc.links.total++;
+                    if (u.hostname === location.hostname) {
+                        acc.links.internal++;
+                        href = u.pathname + u.search;
+                    } else {
+                        acc.links.external++;
+                        acc.links.domains[u.hostname] = (acc.links.domains[u.hostname] || 0) + 1;
+                    }
+                } catch (e) {}
+                if (opts.links) item = {kind: "link", text: clip(el.innerText || labelOf(el, n), n), href: clip(href, 120)};
+            } else if (tag === "BUTTON" || tag === "SUMMARY" || BUTTON_ROLES.has(role)) {
+                item = {kind: role && role !== "button" ? role : "button", text: clip(el.innerText || labelOf(el, n), n)};
+                if (el.disabled) item.disabled = true;
+            } else if (tag === "INPUT" && el.type !== "hidden") {
+                item = {kind: "input", type: el.type, label: labelOf(el, n)};
+                if (el.type === "checkbox" || el.type === "radio") item.checked = el.checked;
+                else if (el.type !== "password" && el.value) item.value = clip(el.value, 60);
+            } else if (tag === "TEXTAREA") {
+                item = {kind: "textarea", label: labelOf(el, n)};
+                if (el.value) item.value = clip(el.value, 60);
+            } else if (tag === "SELECT") {
+                const selected = el.selectedOptions[0];
+                item = {kind: "select", label: labelOf(el, n), options: el.options.length,
+                        value: selected ? clip(selected.text, 60) : ""};
+            } else if (el.isContentEditable && !(el.parentElement && el.parentElement.isContentEditable)) {
+                item = {kind: "editable", label: labelOf(el, n), text: clip(el.innerText, n)};
+            }
+            if (!item || !shown(el)) return null;
+            if (item.kind !== "heading" && item.kind !== "landmark") item.ref = refOf(el);
+            return item;
+        };
+
+        // Outline of the subtree under root, in document order
+        const walk = (root, opts) => {
+            const acc = {items: [], links: {total: 0, internal: 0, external: 0, domains: {}}, forms: [],
+                         truncated: false};
+            const walker = document.createTreeWalker(root, NodeFilter.SHOW_ELEMENT, {
+                acceptNode: (el) => (SKIP.has(el.tagName) || el.hidden || el.getAttribute("aria-hidden") === "true")
+                    ? NodeFilter.FILTER_REJECT : NodeFilter.FILTER_ACCEPT
+            });
+            for (let el = root; el; el = walker.nextNode()) {
+                if (acc.items.length >= opts.maxItems) { acc.truncated = true; break; }
+                const item = itemOf(el, opts, acc);
+                if (item) acc.items.push(item);
+            }
+            return acc;
+        };
+
+        return {R, refOf, clip, itemOf, walk};
+    })());
+"""
+
+_SNAPSHOT_JS = "(opts) => {" + _PRELUDE + r"""
+    const acc = S.walk(document.body || document.documentElement, opts);
+    const domains = Object.entries(acc.links.domains).sort((a, b) => b[1] - a[1]).slice(0, 10);
+    return {url: location.href, title: document.title, items: acc.items, truncated: acc.truncated,
+            links: {total: acc.links.total, internal: acc.links.internal, external: acc.links.external,
+                    top_domains: Object.fromEntries(domains)},
+            forms: acc.forms};
+}"""
+
+_RESOLVE_JS = """(ref) => {
+    const entry = window.__cfSnap && window.__cfSnap.R.byRef.get(ref);
+    const el = entry && entry.deref();
+    return el && el.isConnected ? el : null;
+}"""
+
+
+# Change log: a MutationObserver collects added roots, changed elements and
+# removed nodes until the next take; installing again resets the log.
+_WATCH_JS = "(opts) => {" + _PRELUDE + r"""
+    const C = window.__cfChanges;
+    if (C) {
+        C.added.clear(); C.changed.clear(); C.removed = []; C.overflow = false;
+        return false;
+    }
+    const state = window.__cfChanges = {added: new Set(), changed: new Set(), removed: [], overflow: false, seq: 0};
+    const limit = opts.maxTracked;
+    const mark = (set, el) => {
+        if (!el) return;
+        if (set.size >= limit) state.overflow = true;
+        else set.add(el);
+    };
+    new MutationObserver((records) => {
+        for (const r of records) {
+            if (r.type === "childList") {
+                for (const node of r.addedNodes) {
+                    if (node.nodeType === 1) mark(state.added, node);
+                    else if (node.nodeType === 3) mark(state.changed, r.target);
+                }
+                for (const node of r.removedNodes) {
+                    if (node.nodeType !== 1) { mark(state.changed, r.target); continue; }
+                    if (state.added.delete(node)) continue;
+                    if (state.removed.length >= limit) { state.overflow = true; continue; }
+                    state.removed.push({ref: S.R.byEl.get(node) || null, tag: node.tagName.toLowerCase(),
+                                        text: S.clip(node.textContent, opts.textLimit)});
+                }
+            } else if (r.type === "characterData") {
+                mark(state.changed, r.target.parentElement);
+            } else {
+                mark(state.changed, r.target);
+            }
+        }
+    }).observe(document.documentElement, {
+        subtree: true, childList: true, characterData: true, attributes: true,
+        attributeFilter: ["value", "checked", "selected", "disabled", "hidden", "open",
+                          "aria-expanded", "aria-selected", "aria-checked", "aria-hidden", "href", "src"]
+    });
+    return true;
+}"""
+
+_TAKE_CHANGES_JS = "(opts) => {" + _PRELUDE + r"""
+    const state = window.__cfChanges;
+    if (!state) return null;
+    const inside = (el, set) => {
+        for (let p = el.parentElement; p; p = p.parentElement) if (set.has(p)) return true;
+        return false;
+    };
+    const describe = (el) => ({ref: S.refOf(el), tag: el.tagName.toLowerCase(),
+                               text: S.clip(el.innerText, opts.textLimit)});
+    const roots = [...state.added].filter(el => el.isConnected && !inside(el, state.added));
+    const changed = [...state.changed].filter(el => el.isConnected && !state.added.has(el)
+                                                  && !inside(el, state.added) && !inside(el, state.changed));
+    const added = roots.slice(0, opts.maxNodes).map(el => Object.assign(describe(el), {
+        items: S.walk(el, Object.assign({}, opts, {maxItems: opts.maxItemsPerNode})).items
+    }));
+    const result = {
+        seq: ++state.seq,
+        url: location.href,
+        fingerprint: document.getElementsByTagName("*").length + ":" + (document.body ? document.body.textContent.length : 0),
+        added,
+        changed: changed.slice(0, opts.maxNodes).map(el => Object.assign(describe(el), {item: S.itemOf(el, opts, {links: {total: 0, internal: 0, external: 0, domains: {}}, forms: []})})),
+        removed: state.removed.slice(0, opts.maxNodes),
+        omitted: Math.max(0, roots.length - opts.maxNodes) + Math.max(0, changed.length - opts.maxNodes)
+                 + Math.max(0, state.removed.length - opts.maxNodes),
+        overflow: state.overflow,
+    };
+    state.added.clear(); state.changed.clear(); state.removed = []; state.overflow = false;
+    return result;
+}"""
+
+
+def _chunk_lines(lines: List[str], cursor: int, max_chars: int) -> Dict[str, Any]:
+    """Lines from cursor on, up to max_chars (at least one line)."""
+    chunk, size, end = [], 0, cursor
+    while end < len(lines):
+        line = lines[end]
+        if chunk and size + len(line) + 1 > max_chars:
+            break
+        chunk.append(line)
+        size += len(line) + 1
+        end += 1
+    return {
+        "cursor": cursor,
+        "next_cursor": end if end < len(lines) else None,
+        "total": len(lines),
+        "lines": chunk,
+    }
+
+
+def format_item(item: Dict[str, Any]) -> str:
+    """One compact line per outline item."""
+    kind = item["kind"]
+    if kind == "heading":
+        return f"{'#' * min(item['level'], 6)} {item['text']}"
+    if kind == "landmark":
+        label = f" \"{item['label']}\"" if item.get("label") else ""
+        return f"<{item['role']}>{label}"
+    ref = f"[{item['ref']}] "
+    if kind == "link":
+        return f"{ref}link \"{item['text']}\" -> {item['href']}"
+    if kind == "form":
+        return f"{ref}form \"{item['label']}\" ({item['fields']} fields)"
+    if kind == "input":
+        line = f"{ref}input({item['type']}) \"{item['label']}\""
+        if "checked" in item:
+            line += " [x]" if item["checked"] else " [ ]"
+        elif "value" in item:
+            line += f" = \"{item['value']}\""
+        return line
+    if kind in ("textarea", "select", "editable"):
+        line = f"{ref}{kind} \"{item['label']}\""
+        if kind == "select":
+            line += f" ({item['options']} options)"
+        value = item.get("value") or item.get("text")
+        return line + (f" = \"{value}\"" if value else "")
+    line = f"{ref}{kind} \"{item.get('text', '')}\""
+    return line + (" (disabled)" if item.get("disabled") else "")
+
+
+class PageSnapshot:
+    """A page outline that can be read in chunks bounded by size."""
+
+    def __init__(self, data: Dict[str, Any]):
+        self.url: str = data["url"]
+        self.title: str = data["title"]
+        self.items: List[Dict[str, Any]] = data["items"]
+        self.links: Dict[str, Any] = data["links"]
+        self.forms: List[Dict[str, Any]] = data["forms"]
+        self.truncated: bool = data["truncated"]
+        self.lines = [format_item(item) for item in self.items]
+        digest = hashlib.sha1("\n".join(self.lines).encode("utf-8")).hexdigest()
+        self.id = digest[:12]
+
+    def summary(self) -> Dict[str, Any]:
+        host = urlsplit(self.url).hostname or ""
+        return {
+            "url": self.url,
+            "title": self.title,
+            "items": len(self.items),
+            "interactive": sum(1 for item in self.items if "ref" in item),
+            "links": dict(self.links, host=host),
+            "forms": self.forms,
+            "truncated": self.truncated,
+        }
+
+    def chunk(self, cursor: int = 0, max_chars: int = 4000) -> Dict[str, Any]:
+        """
+        Lines from cursor on, up to max_chars (at least one line).
+        next_cursor is None once the outline is exhausted.
+        """
+        return dict(_chunk_lines(self.lines, cursor, max_chars), snapshot_id=self.id)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self.summary(), snapshot_id=self.id, outline=self.items)
+
+
+class DomChanges:
+    """
+    Nodes added, changed and removed since the previous snapshot/take.
+
+    Lines:
+      + [e45] div "new text"        added subtree, followed by its outline
+          [e46] link "More" -> /more
+      ~ [e12] span "updated text"   changed element
+      - [e9] li "old text"          removed element
+    """
+
+    def __init__(self, data: Dict[str, Any]):
+        self.seq: int = data["seq"]
+        self.url: str = data["url"]
+        self.fingerprint: str = data["fingerprint"]
+        self.added: List[Dict[str, Any]] = data["added"]
+        self.changed: List[Dict[str, Any]] = data["changed"]
+        self.removed: List[Dict[str, Any]] = data["removed"]
+        self.omitted: int = data["omitted"]
+        self.overflow: bool = data["overflow"]
+        self.lines: List[str] = []
+        for node in self.added:
+            self.lines.append(f"+ [{node['ref']}] {node['tag']} \"{node['text']}\"")
+            self.lines.extend("    " + format_item(item) for item in node["items"])
+        for node in self.changed:
+            line = format_item(node["item"]) if node["item"] else f"[{node['ref']}] {node['tag']} \"{node['text']}\""
+            self.lines.append("~ " + line)
+        for node in self.removed:
+            ref = f"[{node['ref']}] " if node["ref"] else ""
+            self.lines.append(f"- {ref}{node['tag']} \"{node['text']}\"")
+
+    @property
+    def empty(self) -> bool:
+        return not (self.added or self.changed or self.removed or self.omitted)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "seq": self.seq,
+            "url": self.url,
+            "fingerprint": self.fingerprint,
+            "added": len(self.added),
+            "changed": len(self.changed),
+            "removed": len(self.removed),
+            "omitted": self.omitted,
+            "overflow": self.overflow,
+        }
+
+    def chunk(self, cursor: int = 0, max_chars: int = 4000) -> Dict[str, Any]:
+        return dict(_chunk_lines(self.lines, cursor, max_chars), seq=self.seq)
+
+
+def _options(max_items: int, text_limit: int, links: bool) -> Dict[str, Any]:
+    return {"maxItems": max_items, "textLimit": text_limit, "links": links}
+
+
+def take_snapshot(page: Any, max_items: int = 5000, text_limit: int = 80, links: bool = True) -> PageSnapshot:
+    """
+    Outline of a sync page.
+
+    Args:
+        max_items: Stop walking after this many items (reported as truncated)
+        text_limit: Max characters of each item's text/label
+        links: Include every link in the outline (always counted in the summary)
+    """
+    return PageSnapshot(page.evaluate(_SNAPSHOT_JS, _options(max_items, text_limit, links)))
+
+
+async def take_snapshot_async(page: Any, max_items: int = 5000, text_limit: int = 80, links: bool = True) -> PageSnapshot:
+    """Async version of take_snapshot()."""
+    return PageSnapshot(await page.evaluate(_SNAPSHOT_JS, _options(max_items, text_limit, links)))
+
+
+def _watch_options(text_limit: int, max_tracked: int) -> Dict[str, Any]:
+    return {"textLimit": text_limit, "maxTracked": max_tracked}
+
+
+def _take_options(text_limit: int, max_nodes: int, max_items_per_node: int, links: bool) -> Dict[str, Any]:
+    return {"textLimit": text_limit, "maxNodes": max_nodes, "maxItemsPerNode": max_items_per_node,
+            "links": links, "maxItems": max_items_per_node}
+
+
+def watch_changes(page: Any, text_limit: int = 80, max_tracked: int = 5000) -> bool:
+    """
+    Start (or reset) the change log of the current document. Returns True
+    when the observer was installed, False when an existing log was reset.
+    Call it before the snapshot the changes are relative to, so mutations
+    in between are not lost.
+    """
+    return page.evaluate(_WATCH_JS, _watch_options(text_limit, max_tracked))
+
+
+async def watch_changes_async(page: Any, text_limit: int = 80, max_tracked: int = 5000) -> bool:
+    """Async version of watch_changes()."""
+    return await page.evaluate(_WATCH_JS, _watch_options(text_limit, max_tracked))
+
+
+def take_changes(
+    page: Any,
+    text_limit: int = 200,
+    max_nodes: int = 200,
+    max_items_per_node: int = 50,
+    links: bool = True,
+) -> Optional[DomChanges]:
+    """
+    Changes since the last watch_changes()/take_changes(), resetting the log.
+    Returns None when the page has no change log (e.g. after navigating):
+    take a full snapshot and call watch_changes() again.
+    """
+    data = page.evaluate(_TAKE_CHANGES_JS, _take_options(text_limit, max_nodes, max_items_per_node, links))
+    return DomChanges(data) if data else None
+
+
+async def take_changes_async(
+    page: Any,
+    text_limit: int = 200,
+    max_nodes: int = 200,
+    max_items_per_node: int = 50,
+    links: bool = True,
+) -> Optional[DomChanges]:
+    """Async version of take_changes()."""
+    data = await page.evaluate(_TAKE_CHANGES_JS, _take_options(text_limit, max_nodes, max_items_per_node, links))
+    return DomChanges(data) if data else None
+
+
+def element_for_ref(page: Any, ref: str) -> Any:
+    """ElementHandle for a snapshot ref; ValueError if it no longer exists."""
+    handle = page.evaluate_handle(_RESOLVE_JS, ref).as_element()
+    if handle is None:
+        raise ValueError(f"Ref {ref} not found (take a new snapshot)")
+    return handle
+
+
+async def element_for_ref_async(page: Any, ref: str) -> Any:
+    """Async version of element_for_ref()."""
+    handle = (await page.evaluate_handle(_RESOLVE_JS, ref)).as_element()
+    if handle is None:
+        raise ValueError(f"Ref {ref} not found (take a new snapshot)")
+    return handle
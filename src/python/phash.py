@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Perceptual Screenshot Hashing
+=============================
+64-bit DCT perceptual hashes (pHash) of screenshots, computed in batches
+with NumPy, plus an index of prior hashes per series (a page, a step of a
+flow) to answer "has this page visually changed since the last run?"
+without comparing pixels.
+
+Distances are Hamming distances divided by 64: 0.0 is visually identical,
+values under ~0.05 are typically caret blinks, ads rotating or
+anti-aliasing, and values over ~0.2 are a different page.
+
+Needs Pillow (to decode PNG/JPEG) and NumPy.
+
+Usage:
+  from phash import perceptual_hash, PerceptualIndex
+
+  index = PerceptualIndex("~/.cache/camoufox-browser/phash.db")
+  h = perceptual_hash(page.screenshot())
+  changed, distance = index.check("tienda/home", h, threshold=0.05)
+  index.add("tienda/home", h, key="tienda/home.png")
+  print(index.nearest(h, k=3))     # closest prior captures of any series
+
+  # In the screenshot pipeline: near-identical frames are not stored
+  shots = ScreenshotPipeline("/tmp/shots", perceptual=index, phash_threshold=0.05)
+"""
+
+import io
+import os
+import sqlite3
+import threading
+import time
+from typing import Iterable, List, Optional, Tuple
+
+try:
+    import numpy as np
+    from PIL import Image
+    PHASH_AVAILABLE = True
+except ImportError:
+    PHASH_AVAILABLE = False
+
+_SIZE = 32    # image is reduced to 32x32 grayscale
+_BITS = 8     # the 8x8 lowest frequencies make the 64-bit hash
+_dct_matrix = None
+
+
+def _require():
+    if not PHASH_AVAILABLE:
+        raise RuntimeError("Perceptual hashing needs NumPy and Pillow: pip install numpy Pillow")
+
+
+def _dct() -> "np.ndarray":
+    """Orthonormal DCT-II matrix; D @ X @ D.T is the 2-D DCT of X."""
+    global _dct_matrix
+    if _dct_matrix is None:
+        n = np.arange(_SIZE)
+        matrix = np.cos(np.pi * (2 * n[None, :] + 1) * n[:, None] / (2 * _SIZE)) * np.sqrt(2 / _SIZE)
+        matrix[0] /= np.sqrt(2)
+        _dct_matrix = matrix.astype(np.float32)
+    return _dct_matrix
+
+
+def _pixels(image: bytes) -> "np.ndarray":
+    img = Image.open(io.BytesIO(image))
+    img.draft("L", (_SIZE * 2, _SIZE * 2))  # JPEG: decode at reduced scale
+    return np.asarray(img.convert("L").resize((_SIZE, _SIZE), Image.BILINEAR), dtype=np.float32)
+
+
+def perceptual_hashes(images: Iterable[bytes]) -> List[int]:
+    """64-bit perceptual hashes of encoded images (PNG/JPEG/WebP), vectorized."""
+    _require()
+    images = list(images)
+    if not images:
+        return []
+    stack = np.stack([_pixels(image) for image in images])
+    d = _dct()
+    low = (d @ stack @ d.T)[:, :_BITS, :_BITS].reshape(len(stack), -1)
+    # Median of the AC coefficients (the DC term would dominate)
+    bits = low > np.median(low[:, 1:], axis=1)[:, None]
+    return [int.from_bytes(row.tobytes(), "big") for row in np.packbits(bits, axis=1)]
+
+
+def perceptual_hash(image: bytes) -> int:
+    """64-bit perceptual hash of one encoded image."""
+    return perceptual_hashes([image])[0]
+
+
+def distance(a: int, b: int) -> float:
+    """Fraction of differing bits between two hashes (0.0 - 1.0)."""
+    return bin(a ^ b).count("1") / (_BITS * _BITS)
+
+
+def _signed(value: int) -> int:
+    # SQLite integers are signed 64-bit
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+class PerceptualIndex:
+    """
+    Prior perceptual hashes per series, in SQLite (in memory when path is None).
+
+    Args:
+        path: Database file shared across runs; None keeps it per process
+        history: Hashes kept per series (oldest are pruned)
+    """
+
+    def __init__(self, path: Optional[str] = None, history: int = 50):
+        if path:
+            path = os.path.expanduser(path)
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        self.history = history
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path or ":memory:", check_same_thread=False, timeout=30)
+        if path:
+            self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS phashes (id INTEGER PRIMARY KEY AUTOINCREMENT, series TEXT NOT NULL,"
+            " hash INTEGER NOT NULL, key TEXT, created REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS phashes_series ON phashes(series, id)")
+        self._db.commit()
+        self._matrix = None   # cached (ids, hashes) for nearest()
+
+    def last(self, series: str) -> Optional[Tuple[int, Optional[str]]]:
+        """(hash, key) of the latest capture of a series, or None."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT hash, key FROM phashes WHERE series = ? ORDER BY id DESC LIMIT 1", (series,)
+            ).fetchone()
+        return (row[0] & ((1 << 64) - 1), row[1]) if row else None
+
+    def check(self, series: str, value: int, threshold: float = 0.05) -> Tuple[bool, Optional[float]]:
+        """
+        Has the series visually changed? Returns (changed, distance to the
+        last capture); a series never seen counts as changed with distance None.
+        """
+        last = self.last(series)
+        if last is None:
+            return True, None
+        score = distance(value, last[0])
+        return score > threshold, score
+
+    def add(self, series: str, value: int, key: Optional[str] = None):
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO phashes (series, hash, key, created) VALUES (?, ?, ?, ?)",
+                (series, _signed(value), key, time.time()),
+            )
+            self._db.execute(
+                "DELETE FROM phashes WHERE series = ? AND id NOT IN"
+                " (SELECT id FROM phashes WHERE series = ? ORDER BY id DESC LIMIT ?)",
+                (series, series, self.history),
+            )
+            self._db.commit()
+            self._matrix = None
+
+    def nearest(self, value: int, k: int = 5) -> List[Tuple[float, str, Optional[str]]]:
+        """The k closest stored captures of any series: [(distance, series, key)]."""
+        _require()
+        with self._lock:
+            if self._matrix is None:
+                rows = self._db.execute("SELECT series, key, hash FROM phashes").fetchall()
+                hashes = np.array([row[2] for row in rows], dtype=np.int64).view(np.uint64)
+                self._matrix = ([row[:2] for row in rows], hashes)
+            labels, hashes = self._matrix
+        if not len(hashes):
+            return []
+        xor = (hashes ^ np.uint64(value)).view(np.uint8).reshape(-1, 8)
+        scores = np.unpackbits(xor, axis=1).sum(axis=1) / (_BITS * _BITS)
+        order = np.argsort(scores, kind="stable")[:k]
+        return [(float(scores[i]), labels[i][0], labels[i][1]) for i in order]
+
+    def series(self) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self._db.execute("SELECT DISTINCT series FROM phashes")]
+
+    def close(self):
+        self._db.close()
+
@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+"""
+Profile Store
+=============
+Pre-generated Camoufox identities (fingerprint plus launch config) kept in
+SQLite, so launches skip fingerprint generation and the geoip lookup and
+an identity can be reused consistently across sessions.
+
+A profile is the output of camoufox's launch_options() with the launch
+environment reduced to what Camoufox added (its CAMOU_CONFIG chunks), so
+no secrets from os.environ are written to disk. At launch the stored
+options go to Camoufox(from_options=...) with the current environment,
+the leased DISPLAY, the proxy and the humanize setting patched in.
+Profiles are keyed by proxy server, locale and target OS; proxied
+profiles are generated with geoip through that proxy, so timezone and
+locale match its exit IP. Profiles made by another camoufox version, or
+whose browser binary is gone, are skipped and regenerated.
+
+Usage:
+  from profile_store import ProfileStore
+
+  profiles = ProfileStore("~/.cache/camoufox/profiles.db", size=4)
+  profiles.generate(4)                                        # generic identities
+  profiles.generate(2, proxy="http://u:p@host:8080", locale="es-CO")
+
+  result = browse(url, profiles=profiles)                     # draws from the store
+  with BrowserPool(max_size=2, profiles=profiles) as pool:    # every launch too
+      ...
+
+  # Direct launches
+  with Camoufox(**profiles.launch_kwargs(display=":99", humanize=2.0)) as browser:
+      ...
+  profile = profiles.pick(locale="es-CO")                     # least recently used match
+  with Camoufox(**profiles.launch_kwargs(profile_id=profile.id)) as browser:   # same identity again
+      ...
+  print(profiles.stats())
+
+Environment (default_profile_store):
+  CAMOUFOX_PROFILES: Database file; unset disables the default store
+  CAMOUFOX_PROFILES_SIZE: Identities kept per (proxy, locale, os) key
+"""
+
+import copy
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Union
+
+from camoufox.utils import launch_options as camoufox_launch_options
+
+from proxy_pool import Proxy, proxy_settings
+
+# Camoufox passes its config as JSON split over CAMOU_CONFIG_1..N
+_CONFIG_PREFIX = "CAMOU_CONFIG_"
+_CONFIG_CHUNK = 2047
+
+
+def camoufox_version() -> Optional[str]:
+    try:
+        from importlib.metadata import version
+        return version("camoufox")
+    except Exception:
+        return None
+
+
+def _proxy_key(proxy: Union[None, str, Dict[str, Any], Proxy]) -> str:
+    """Proxy server without credentials ("" for direct connections)."""
+    settings = proxy_settings(proxy)
+    return settings["server"] if settings else ""
+
+
+def _read_config(env: Dict[str, Any]) -> Dict[str, Any]:
+    chunks, i = [], 1
+    while f"{_CONFIG_PREFIX}{i}" in env:
+        chunks.append(env[f"{_CONFIG_PREFIX}{i}"])
+        i += 1
+    return json.loads("".join(chunks)) if chunks else {}
+
+
+def _write_config(env: Dict[str, Any], config: Dict[str, Any]):
+    for name in [k for k in env if k.startswith(_CONFIG_PREFIX)]:
+        del env[name]
+    data = json.dumps(config)
+    for i in range(0, len(data), _CONFIG_CHUNK):
+        env[f"{_CONFIG_PREFIX}{i // _CONFIG_CHUNK + 1}"] = data[i:i + _CONFIG_CHUNK]
+
+
+class Profile:
+    """One stored identity: Playwright launch options without env secrets."""
+
+    def __init__(self, id: str, options: Dict[str, Any], proxy: str = "", locale: str = "",
+                 os_name: str = "", version: Optional[str] = None, uses: int = 0,
+                 created: Optional[float] = None, last_used: Optional[float] = None):
+        self.id = id
+        self.options = options
+        self.proxy = proxy
+        self.locale = locale
+        self.os_name = os_name
+        self.version = version
+        self.uses = uses
+        self.created = created or time.time()
+        self.last_used = last_used
+
+    @property
+    def config(self) -> Dict[str, Any]:
+        """Camoufox fingerprint config (navigator.*, screen.*, timezone, ...)."""
+        return _read_config(self.options.get("env", {}))
+
+    def usable(self) -> bool:
+        """Made by this camoufox version and its browser binary still exists."""
+        if self.version and self.version != camoufox_version():
+            return False
+        path = self.options.get("executable_path")
+        return not path or os.path.exists(path)
+
+    def launch_options(
+        self,
+        display: Optional[str] = None,
+        humanize: Union[None, bool, float] = None,
+        proxy: Union[None, str, Dict[str, Any], Proxy] = None,
+    ) -> Dict[str, Any]:
+        """
+        Options for Camoufox(from_options=...).
+
+        Args:
+            display: Xvfb DISPLAY to run on (None keeps the current one)
+            humanize: Override the stored cursor humanization (seconds or False)
+            proxy: Launch-level proxy (credentials are never stored)
+        """
+        options = copy.deepcopy(self.options)
+        env = options.setdefault("env", {})
+        if humanize is not None:
+            config = _read_config(env)
+            config.pop("humanize:maxTime", None)
+            if humanize:
+                config["humanize"] = True
+                if not isinstance(humanize, bool):
+                    config["humanize:maxTime"] = humanize
+            else:
+                config.pop("humanize", None)
+            _write_config(env, config)
+        options["env"] = {**os.environ, **env}
+        if display:
+            # As camoufox does for virtual_display: keep GTK on Xvfb even
+            # when the desktop session is Wayland
+            options["env"].update(DISPLAY=display, GDK_BACKEND="x11", MOZ_ENABLE_WAYLAND="0")
+            options["env"].pop("WAYLAND_DISPLAY", None)
+        options["headless"] = False
+        options["proxy"] = proxy_settings(proxy)
+        return options
+
+    def summary(self) -> Dict[str, Any]:
+        config = self.config
+        return {
+            "id": self.id,
+            "proxy": self.proxy or None,
+            "locale": self.locale or None,
+            "os": self.os_name or None,
+            "user_agent": config.get("navigator.userAgent"),
+            "screen": f"{config.get('screen.width')}x{config.get('screen.height')}",
+            "timezone": config.get("timezone"),
+            "uses": self.uses,
+        }
+
+    def __repr__(self) -> str:
+        return f"Profile({self.id})"
+
+
+class ProfileStore:
+    """
+    Persistent set of Camoufox identities (in memory when path is None).
+
+    Args:
+        path: SQLite file shared across runs and processes
+        size: Identities kept per (proxy, locale, os) key; pick() generates
+              new ones until the key has this many, then rotates through them
+    """
+
+    _COLUMNS = "id, proxy, locale, os, version, options, uses, created, last_used"
+
+    def __init__(self, path: Optional[str] = None, size: int = 4):
+        if path:
+            path = os.path.expanduser(path)
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.size = size
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path or ":memory:", check_same_thread=False, timeout=30)
+        if path:
+            self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS profiles (id TEXT PRIMARY KEY, proxy TEXT NOT NULL,"
+            " locale TEXT NOT NULL, os TEXT NOT NULL, version TEXT, options TEXT NOT NULL,"
+            " uses INTEGER NOT NULL DEFAULT 0, created REAL NOT NULL, last_used REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS profiles_key ON profiles(proxy, locale, os, last_used)")
+        self._db.commit()
+        self._stats = {"generated": 0, "reused": 0, "generate_s": 0.0}
+
+    # -- generation ----------------------------------------------------------
+
+    def generate(
+        self,
+        n: int = 1,
+        proxy: Union[None, str, Dict[str, Any], Proxy] = None,
+        locale: Optional[str] = None,
+        os_name: Optional[str] = None,
+        geoip: Optional[bool] = None,
+        **camoufox_options: Any,
+    ) -> List[Profile]:
+        """
+        Generate and store n identities.
+
+        Args:
+            proxy: Proxy the identities are tied to (geoip runs through it)
+            locale: Browser locale, e.g. "es-CO"
+            os_name: Target OS of the fingerprint ("windows", "macos", "linux")
+            geoip: Derive timezone/locale/geolocation from the exit IP
+                   (default: only for proxied profiles)
+            **camoufox_options: Other launch_options() arguments (block_webrtc, ...)
+        """
+        os_name = os_name or camoufox_options.pop("os", None)
+        for key in ("headless", "i_know_what_im_doing", "virtual_display", "humanize"):
+            camoufox_options.pop(key, None)   # set per launch, not per identity
+        created = []
+        for _ in range(n):
+            started = time.monotonic()
+            options = camoufox_launch_options(
+                headless=False,
+                i_know_what_im_doing=True,
+                proxy=proxy_settings(proxy),
+                geoip=bool(proxy) if geoip is None else geoip,
+                locale=locale,
+                os=os_name,
+                **camoufox_options,
+            )
+            elapsed = time.monotonic() - started
+            # Keep only what Camoufox added to the environment
+            options["env"] = {k: v for k, v in (options.get("env") or {}).items() if os.environ.get(k) != v}
+            for key in ("proxy", "headless"):
+                options.pop(key, None)
+            data = json.dumps(options, sort_keys=True)
+            profile = Profile(
+                hashlib.sha1(data.encode()).hexdigest()[:12], options,
+                proxy=_proxy_key(proxy), locale=locale or "", os_name=os_name or "",
+                version=camoufox_version(),
+            )
+            with self._lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO profiles (id, proxy, locale, os, version, options, created)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (profile.id, profile.proxy, profile.locale, profile.os_name, profile.version,
+                     data, profile.created),
+                )
+                self._db.commit()
+                self._stats["generated"] += 1
+                self._stats["generate_s"] += elapsed
+            created.append(profile)
+        return created
+
+    # -- lookup --------------------------------------------------------------
+
+    @staticmethod
+    def _profile(row: Any) -> Profile:
+        id, proxy, locale, os_name, version, options, uses, created, last_used = row
+        return Profile(id, json.loads(options), proxy, locale, os_name, version, uses, created, last_used)
+
+    def get(self, profile_id: str) -> Optional[Profile]:
+        with self._lock:
+            row = self._db.execute(f"SELECT {self._COLUMNS} FROM profiles WHERE id = ?", (profile_id,)).fetchone()
+        return self._profile(row) if row else None
+
+    def profiles(self) -> List[Profile]:
+        with self._lock:
+            rows = self._db.execute(f"SELECT {self._COLUMNS} FROM profiles ORDER BY created").fetchall()
+        return [self._profile(row) for row in rows]
+
+    def remove(self, profile_id: str):
+        with self._lock:
+            self._db.execute("DELETE FROM profiles WHERE id = ?", (profile_id,))
+            self._db.commit()
+
+    def _mark_used(self, profile: Profile):
+        """Record a launch (lock held)."""
+        profile.uses += 1
+        profile.last_used = time.time()
+        self._db.execute(
+            "UPDATE profiles SET uses = uses + 1, last_used = ? WHERE id = ?", (profile.last_used, profile.id)
+        )
+        self._db.commit()
+        self._stats["reused"] += profile.uses > 1
+
+    def pick(
+        self,
+        proxy: Union[None, str, Dict[str, Any], Proxy] = None,
+        locale: Optional[str] = None,
+        os_name: Optional[str] = None,
+        **camoufox_options: Any,
+    ) -> Profile:
+        """
+        Least recently used usable profile for the key, generating one while
+        the key has fewer than `size` (camoufox_options apply to generation).
+        """
+        os_name = os_name or camoufox_options.pop("os", None)
+        key = (_proxy_key(proxy), locale or "", os_name or "")
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {self._COLUMNS} FROM profiles WHERE proxy = ? AND locale = ? AND os = ?"
+                " ORDER BY last_used IS NOT NULL, last_used",
+                key,
+            ).fetchall()
+            candidates = []
+            for row in rows:
+                profile = self._profile(row)
+                if profile.usable():
+                    candidates.append(profile)
+                else:
+                    self._db.execute("DELETE FROM profiles WHERE id = ?", (profile.id,))
+            if len(candidates) >= self.size:
+                # Marked under the lock so concurrent launches rotate
+                self._mark_used(candidates[0])
+                return candidates[0]
+        profile = self.generate(1, proxy=proxy, locale=locale, os_name=os_name, **camoufox_options)[0]
+        with self._lock:
+            self._mark_used(profile)
+        return profile
+
+    def launch_kwargs(
+        self,
+        display: Optional[str] = None,
+        humanize: Union[None, bool, float] = None,
+        proxy: Union[None, str, Dict[str, Any], Proxy] = None,
+        locale: Optional[str] = None,
+        profile_id: Optional[str] = None,
+        **camoufox_options: Any,
+    ) -> Dict[str, Any]:
+        """
+        Keyword arguments for Camoufox()/AsyncCamoufox(): a pinned profile
+        (profile_id) or pick(proxy, locale), launched on display.
+        """
+        profile = self.get(profile_id) if profile_id else None
+        if profile_id and profile is None:
+            raise KeyError(f"Unknown profile {profile_id!r}")
+        if profile is None:
+            profile = self.pick(proxy=proxy, locale=locale, **camoufox_options)
+        else:
+            with self._lock:
+                self._mark_used(profile)
+        return {"from_options": profile.launch_options(display, humanize=humanize, proxy=proxy)}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            count = self._db.execute("SELECT COUNT(*) FROM profiles").fetchone()[0]
+            stats = dict(self._stats, profiles=count)
+        stats["generate_s"] = round(stats["generate_s"], 2)
+        return stats
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+_default: Optional[ProfileStore] = None
+_default_lock = threading.Lock()
+
+
+def default_profile_store() -> Optional[ProfileStore]:
+    """Process-wide ProfileStore at CAMOUFOX_PROFILES, or None if unset."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            path = os.environ.get("CAMOUFOX_PROFILES")
+            if not path:
+                return None
+            _default = ProfileStore(path, size=int(os.environ.get("CAMOUFOX_PROFILES_SIZE", "4")))
+        return _default
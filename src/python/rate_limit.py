@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+"""
+Per-Domain Rate Limiting
+========================
+Token bucket per host so concurrent page fetches (batch jobs, paginated
+searches) stay under a polite request rate for each site.
+
+AdaptiveRateLimiter tunes each domain on its own, AIMD style: block signals
+(HTTP 403/429, captcha pages) halve the domain's rate and its concurrent
+page window, while a streak of successful requests that were actually held
+back by the limit adds a step to both. Every browse path shares the
+process-wide default_rate_limiter(), so parallel jobs against one site
+converge on the fastest rate it tolerates without manual tuning.
+
+Usage:
+  from rate_limit import DomainRateLimiter, AdaptiveRateLimiter, default_rate_limiter
+
+  limiter = DomainRateLimiter(rate=1.0, burst=2, overrides={"mercadolibre.com.co": (0.5, 1)})
+  limiter.acquire(url)                  # sleeps until a slot is free
+  await limiter.acquire_async(url)
+
+  # Through browse()/browse_async()/browse_many() (default: default_rate_limiter())
+  result = browse(url, rate_limiter=limiter)
+  print(limiter.stats())
+
+  # Adaptive: acquire() also takes one of the domain's concurrent slots,
+  # report() frees it and feeds the outcome back
+  limiter = AdaptiveRateLimiter(rate=1.0, max_rate=8.0, state_path="~/.cache/camoufox/rates.json")
+  limiter.acquire(url)
+  limiter.report(url, ok=True, status=200, title=page.title())
+  print(limiter.rates())                # {"mercadolibre.com.co": 2.5, ...}
+
+Environment (default_rate_limiter):
+  CAMOUFOX_RATE: Starting requests per second per domain (0 disables pacing)
+  CAMOUFOX_RATE_BURST: Burst per domain
+  CAMOUFOX_RATE_MAX: Upper bound the adaptive rate may reach
+  CAMOUFOX_RATE_STATE: JSON file where learned rates are kept across runs
+"""
+
+import asyncio
+import atexit
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+from proxy_pool import detect_ban
+
+
+def domain_of(url: str) -> str:
+    host = (urlsplit(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+class TokenBucket:
+    """Reservation-based token bucket: callers wait for the returned delay."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def reserve(self) -> float:
+        """Take a token (possibly in the future); seconds to wait for it."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class DomainRateLimiter:
+    """
+    One token bucket per domain ("www." ignored).
+
+    Args:
+        rate: Requests per second allowed per domain
+        burst: Requests allowed back to back before pacing starts
+        overrides: {domain: (rate, burst)}; also applies to subdomains
+    """
+
+    def __init__(
+        self,
+        rate: float = 1.0,
+        burst: float = 2,
+        overrides: Optional[Dict[str, Tuple[float, float]]] = None,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.overrides = dict(overrides or {})
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Condition()
+        self._waits: Dict[str, Tuple[int, int, float]] = {}
+
+    def _limits(self, domain: str) -> Tuple[float, float]:
+        for name, limits in self.overrides.items():
+            if domain == name or domain.endswith("." + name):
+                return limits
+        return self.rate, self.burst
+
+    def _bucket(self, domain: str) -> TokenBucket:
+        bucket = self._buckets.get(domain)
+        if bucket is None:
+            bucket = self._buckets[domain] = TokenBucket(*self._limits(domain))
+        return bucket
+
+    def _reserve(self, url: str) -> float:
+        domain = domain_of(url)
+        with self._lock:
+            delay = self._take(domain)
+        return delay
+
+    def _take(self, domain: str) -> float:
+        """Reserve a token of domain (lock held); seconds to wait for it."""
+        delay = self._bucket(domain).reserve()
+        requests, delayed, waited = self._waits.get(domain, (0, 0, 0.0))
+        self._waits[domain] = (requests + 1, delayed + (delay > 0), waited + delay)
+        return delay
+
+    def _refund(self, domain: str):
+        """Give back the token of an acquire() interrupted while waiting for it."""
+        with self._lock:
+            bucket = self._bucket(domain)
+            bucket.tokens = min(bucket.burst, bucket.tokens + 1)
+            self._lock.notify_all()
+
+    def _sleep(self, domain: str, delay: float):
+        try:
+            time.sleep(delay)
+        except BaseException:
+            self._refund(domain)
+            raise
+
+    async def _sleep_async(self, domain: str, delay: float):
+        try:
+            await asyncio.sleep(delay)
+        except BaseException:
+            # Cancelled (e.g. by asyncio.wait_for): no report() will follow
+            self._refund(domain)
+            raise
+
+    def acquire(self, url: str) -> float:
+        """Block until url's domain has a free slot. Returns seconds waited."""
+        delay = self._reserve(url)
+        if delay:
+            self._sleep(domain_of(url), delay)
+        return delay
+
+    async def acquire_async(self, url: str) -> float:
+        """Async version of acquire()."""
+        delay = self._reserve(url)
+        if delay:
+            await self._sleep_async(domain_of(url), delay)
+        return delay
+
+    def report(self, url: str, ok: Optional[bool] = None, status: Optional[int] = None,
+               title: Optional[str] = None) -> bool:
+        """
+        Outcome of a navigation paced by acquire(); call it exactly once per
+        acquire(), with ok=None when the attempt failed for other reasons.
+        Returns whether the page looked like a block. Fixed limiters only
+        classify; AdaptiveRateLimiter also adjusts and frees the slot.
+        """
+        return bool(ok) and detect_ban({"status": status, "title": title})
+
+    def rates(self) -> Dict[str, float]:
+        """Current requests per second of every domain seen."""
+        with self._lock:
+            return {domain: bucket.rate for domain, bucket in self._buckets.items()}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                domain: {
+                    "requests": requests, "delayed": delayed, "waited_s": round(waited, 2),
+                    "rate": self._buckets[domain].rate,
+                }
+                for domain, (requests, delayed, waited) in self._waits.items()
+            }
+
+
+class _DomainState:
+    """AIMD state of one domain in an AdaptiveRateLimiter."""
+
+    def __init__(self, window: int):
+        self.window = window
+        self.inflight = 0
+        self.streak = 0
+        self.paced = 0
+        self.successes = 0
+        self.bans = 0
+
+
+class AdaptiveRateLimiter(DomainRateLimiter):
+    """
+    DomainRateLimiter that adapts rate and concurrency per domain (AIMD).
+
+    acquire() waits for one of the domain's concurrent slots and then for a
+    token; report() must follow each acquire() to free the slot. A ban
+    signal multiplies rate and window by `decrease` (and drains the bucket);
+    `success_streak` consecutive successes, at least one of which had to
+    wait for the limit, add `increase` req/s and one slot. Requests that are
+    never held back do not raise the rate, so idle sites keep their limit.
+
+    Args:
+        rate, burst, overrides: Starting limits (see DomainRateLimiter)
+        min_rate, max_rate: Bounds of the adapted rate (req/s)
+        increase: Rate added per successful streak (req/s)
+        decrease: Factor applied to rate and window on a ban (0-1)
+        success_streak: Consecutive successes before each increase
+        concurrency: Starting pages in flight per domain (None: unlimited)
+        max_concurrency: Upper bound of the adapted window
+        state_path: JSON file to load learned rates from and save() them to
+    """
+
+    def __init__(
+        self,
+        rate: float = 1.0,
+        burst: float = 2,
+        overrides: Optional[Dict[str, Tuple[float, float]]] = None,
+        min_rate: float = 0.05,
+        max_rate: float = 10.0,
+        increase: float = 0.25,
+        decrease: float = 0.5,
+        success_streak: int = 5,
+        concurrency: Optional[int] = 4,
+        max_concurrency: int = 16,
+        state_path: Optional[str] = None,
+    ):
+        super().__init__(rate, burst, overrides)
+        self.min_rate = min_rate
+        self.max_rate = max(max_rate, rate)
+        self.increase = increase
+        self.decrease = decrease
+        self.success_streak = success_streak
+        self.concurrency = concurrency
+        self.max_concurrency = max_concurrency
+        self.state_path = os.path.expanduser(state_path) if state_path else None
+        self._states: Dict[str, _DomainState] = {}
+        self._learned: Dict[str, Dict[str, float]] = {}
+        self._dirty = False
+        self._saved_at = time.monotonic()
+        if self.state_path and os.path.exists(self.state_path):
+            with open(self.state_path, encoding="utf-8") as f:
+                self._learned = json.load(f)
+
+    def _bucket(self, domain: str) -> TokenBucket:
+        bucket = self._buckets.get(domain)
+        if bucket is None:
+            bucket = super()._bucket(domain)
+            learned = self._learned.get(domain)
+            if learned:
+                bucket.rate = min(self.max_rate, max(self.min_rate, learned["rate"]))
+        return bucket
+
+    def _state(self, domain: str) -> _DomainState:
+        state = self._states.get(domain)
+        if state is None:
+            window = self.concurrency or 0
+            learned = self._learned.get(domain)
+            if window and learned and learned.get("concurrency"):
+                window = int(learned["concurrency"])
+            state = self._states[domain] = _DomainState(window)
+        return state
+
+    def _try_take(self, domain: str) -> Optional[float]:
+        """Slot and token for domain (lock held): token delay, or None if no slot."""
+        state = self._state(domain)
+        if state.window and state.inflight >= state.window:
+            return None
+        state.inflight += 1
+        delay = self._take(domain)
+        state.paced += delay > 0
+        return delay
+
+    def _refund(self, domain: str):
+        """Free the slot and token of an acquire() interrupted before report()."""
+        with self._lock:
+            state = self._state(domain)
+            state.inflight = max(0, state.inflight - 1)
+            state.paced = max(0, state.paced - 1)
+            super()._refund(domain)
+
+    def acquire(self, url: str) -> float:
+        """Block until url's domain has a free slot and token. Returns seconds waited."""
+        domain = domain_of(url)
+        started = time.monotonic()
+        with self._lock:
+            delay = self._try_take(domain)
+            while delay is None:
+                self._lock.wait(1.0)
+                delay = self._try_take(domain)
+        if delay:
+            self._sleep(domain, delay)
+        return time.monotonic() - started
+
+    async def acquire_async(self, url: str) -> float:
+        """Async version of acquire()."""
+        domain = domain_of(url)
+        started = time.monotonic()
+        while True:
+            with self._lock:
+                delay = self._try_take(domain)
+            if delay is not None:
+                break
+            await asyncio.sleep(0.05)
+        if delay:
+            await self._sleep_async(domain, delay)
+        return time.monotonic() - started
+
+    def report(self, url: str, ok: Optional[bool] = None, status: Optional[int] = None,
+               title: Optional[str] = None) -> bool:
+        banned = super().report(url, ok, status, title)
+        domain = domain_of(url)
+        with self._lock:
+            state = self._state(domain)
+            bucket = self._bucket(domain)
+            state.inflight = max(0, state.inflight - 1)
+            if banned:
+                state.bans += 1
+                state.streak = state.paced = 0
+                bucket.rate = max(self.min_rate, bucket.rate * self.decrease)
+                bucket.tokens = min(bucket.tokens, 0.0)
+                if state.window:
+                    state.window = max(1, int(state.window * self.decrease))
+                self._dirty = True
+            elif ok:
+                state.successes += 1
+                state.streak += 1
+                if state.streak >= self.success_streak:
+                    if state.paced:
+                        bucket.rate = min(self.max_rate, bucket.rate + self.increase)
+                        if state.window:
+                            state.window = min(self.max_concurrency, state.window + 1)
+                        self._dirty = True
+                    state.streak = state.paced = 0
+            self._lock.notify_all()
+            save = self._dirty and self.state_path and time.monotonic() - self._saved_at > 30
+        if save:
+            self.save()
+        return banned
+
+    def save(self, path: Optional[str] = None):
+        """Write learned rates and windows as JSON (merged with the loaded ones)."""
+        path = os.path.expanduser(path) if path else self.state_path
+        if not path:
+            raise ValueError("AdaptiveRateLimiter.save() needs a path (or state_path)")
+        with self._lock:
+            learned = dict(self._learned)
+            for domain, bucket in self._buckets.items():
+                state = self._states.get(domain)
+                learned[domain] = {"rate": round(bucket.rate, 3),
+                                   "concurrency": state.window if state else None}
+            self._dirty = False
+            self._saved_at = time.monotonic()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(learned, f, indent=2, sort_keys=True)
+        os.replace(tmp, path)
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        with self._lock:
+            for domain, entry in stats.items():
+                state = self._state(domain)
+                entry.update(
+                    rate=round(entry["rate"], 3),
+                    concurrency=state.window or None,
+                    inflight=state.inflight,
+                    successes=state.successes,
+                    bans=state.bans,
+                )
+        return stats
+
+
+_default: Optional[DomainRateLimiter] = None
+_default_lock = threading.Lock()
+
+
+def default_rate_limiter() -> Optional[DomainRateLimiter]:
+    """
+    Process-wide AdaptiveRateLimiter shared by every browse path, configured
+    from the environment on first use; None when CAMOUFOX_RATE is 0.
+    """
+    global _default
+    with _default_lock:
+        if _default is None:
+            rate = float(os.environ.get("CAMOUFOX_RATE", "1.0"))
+            if rate <= 0:
+                return None
+            _default = AdaptiveRateLimiter(
+                rate=rate,
+                burst=float(os.environ.get("CAMOUFOX_RATE_BURST", "2")),
+                max_rate=float(os.environ.get("CAMOUFOX_RATE_MAX", "10")),
+                state_path=os.environ.get("CAMOUFOX_RATE_STATE"),
+            )
+            if _default.state_path:
+                atexit.register(_default.save)
+        return _default
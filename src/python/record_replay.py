@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+"""
+Record / Replay
+===============
+Captures every response a page receives into a compact archive, and serves
+an archive back through request interception with no network at all, so
+extractors and benchmarks can run against a real site's pages repeatably
+and at local-disk speed.
+
+Archive format (one zip file, HAR-like index):
+  index.json       {"version", "pages": [top-level URLs], "entries": [...]};
+                   an entry holds method, url, post data hash, status,
+                   headers, resource type, elapsed ms and the body's sha256
+  bodies/<sha256>  response bodies, stored once however many URLs serve them
+                   (deflated, except already compressed media)
+
+Replay matches requests by method + URL (+ POST body hash). Repeated
+requests for the same URL get the recorded responses in order. Without an
+exact match, a GET is matched on the URL minus its query string
+(cache-busting parameters); anything else is aborted, or sent to the
+network with on_miss="network".
+
+Usage:
+  from record_replay import Recorder, Replayer
+
+  # Record: a path string records one call (and adds to an existing archive)
+  browse("https://listado.mercadolibre.com.co/laptop", record="laptop.zip")
+
+  # Several pages into one archive (share one Recorder across threads/tasks)
+  with Recorder("ml.zip") as recorder:
+      for r in browse_many(urls, record=recorder):
+          ...
+  search_mercadolibre("laptop", max_results=150, record="ml_laptop.zip")
+
+  # Replay: same calls, no network, no rate limiting
+  r = browse("https://listado.mercadolibre.com.co/laptop", replay="laptop.zip", schema=schema)
+  print(r["replay"])            # {"served": 87, "missed": 2, "bytes": 2301822, ...}
+  productos = search_mercadolibre("laptop", max_results=150, replay="ml_laptop.zip")
+
+  replayer = Replayer.shared("ml.zip")     # opened once per process
+  session = replayer.attach(page)          # or: await replayer.attach_async(page)
+  Replayer.shared("ml.zip").archive.to_har("ml.har")   # inspect in browser devtools
+"""
+
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+import zipfile
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urldefrag, urlsplit
+
+ARCHIVE_VERSION = 1
+
+# Bodies are stored decoded, so encoding and framing headers do not apply on replay
+_DROP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection", "keep-alive"}
+
+# Already compressed: deflating them again only costs time
+_STORED_TYPES = ("image/", "video/", "audio/", "font/woff", "application/zip", "application/gzip",
+                 "application/x-protobuf")
+
+
+def request_key(method: str, url: str, post_data: Optional[bytes] = None) -> str:
+    key = f"{method} {urldefrag(url)[0]}"
+    if post_data:
+        key += " " + hashlib.sha1(post_data).hexdigest()[:16]
+    return key
+
+
+def _loose_key(method: str, url: str) -> str:
+    parts = urlsplit(url)
+    return f"{method} {parts.scheme}://{parts.netloc}{parts.path}"
+
+
+def _is_page(request: Any) -> bool:
+    try:
+        return request.is_navigation_request() and request.frame.parent_frame is None
+    except Exception:
+        return False
+
+
+class Archive:
+    """Read-only view of a recorded archive."""
+
+    def __init__(self, path: str):
+        self.path = os.path.expanduser(path)
+        self._zip = zipfile.ZipFile(self.path)
+        index = json.loads(self._zip.read("index.json"))
+        if index.get("version") != ARCHIVE_VERSION:
+            raise ValueError(f"Unsupported archive version {index.get('version')} in {self.path}")
+        self.pages: List[str] = index["pages"]
+        self.entries: List[Dict[str, Any]] = index["entries"]
+        self.created = index.get("created")
+        self._lock = threading.Lock()
+
+    def body(self, sha256: Optional[str]) -> bytes:
+        if not sha256:
+            return b""
+        with self._lock:
+            return self._zip.read(f"bodies/{sha256}")
+
+    def stats(self) -> Dict[str, Any]:
+        bodies = {e["body"]: e["size"] for e in self.entries if e.get("body")}
+        return {
+            "pages": len(self.pages),
+            "entries": len(self.entries),
+            "bodies": len(bodies),
+            "bytes": sum(bodies.values()),
+            "archive_bytes": os.path.getsize(self.path),
+        }
+
+    def to_har(self, path: str):
+        """Write the archive as a HAR 1.2 file (bodies base64 encoded)."""
+        entries = []
+        for entry in self.entries:
+            body = self.body(entry.get("body"))
+            entries.append({
+                "startedDateTime": entry.get("recorded", self.created),
+                "time": entry.get("ms", 0),
+                "request": {
+                    "method": entry["method"], "url": entry["url"], "httpVersion": "HTTP/1.1",
+                    "headers": [], "queryString": [], "cookies": [], "headersSize": -1, "bodySize": -1,
+                },
+                "response": {
+                    "status": entry.get("status", 0), "statusText": entry.get("error", ""),
+                    "httpVersion": "HTTP/1.1", "cookies": [],
+                    "redirectURL": entry.get("headers", {}).get("location", ""),
+                    "headers": [{"name": k, "value": v} for k, v in entry.get("headers", {}).items()],
+                    "content": {
+                        "size": len(body), "mimeType": entry.get("headers", {}).get("content-type", ""),
+                        "text": base64.b64encode(body).decode("ascii"), "encoding": "base64",
+                    },
+                    "headersSize": -1, "bodySize": len(body),
+                },
+                "cache": {}, "timings": {"send": 0, "wait": entry.get("ms", 0), "receive": 0},
+                "_resourceType": entry.get("type"),
+            })
+        har = {"log": {"version": "1.2", "creator": {"name": "camoufox_browser", "version": "1"},
+                       "pages": [], "entries": entries}}
+        with open(os.path.expanduser(path), "w", encoding="utf-8") as f:
+            json.dump(har, f)
+
+    def close(self):
+        self._zip.close()
+
+
+class Recorder:
+    """
+    Collects responses from attached pages and writes them to an archive.
+
+    Recording into an existing archive keeps its entries, except those for
+    requests recorded again (the newer responses replace them).
+
+    Args:
+        path: Archive file (.zip)
+    """
+
+    def __init__(self, path: str):
+        self.path = os.path.expanduser(path)
+        self.pages: List[str] = []
+        self.entries: List[Dict[str, Any]] = []
+        self._bodies: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def add(self, request: Any, status: int, headers: Dict[str, str], body: bytes,
+            elapsed_ms: float, error: Optional[str] = None) -> int:
+        """Store one exchange; returns the body size."""
+        entry = {
+            "method": request.method,
+            "url": urldefrag(request.url)[0],
+            "key": request_key(request.method, request.url, request.post_data_buffer),
+            "type": request.resource_type,
+            "status": status,
+            "headers": {k: v for k, v in headers.items() if k.lower() not in _DROP_HEADERS},
+            "size": len(body),
+            "ms": round(elapsed_ms, 1),
+            "recorded": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        }
+        if error:
+            entry["error"] = error
+        if body:
+            entry["body"] = hashlib.sha256(body).hexdigest()
+        with self._lock:
+            if entry.get("body"):
+                self._bodies.setdefault(entry["body"], body)
+            self.entries.append(entry)
+            if _is_page(request) and entry["url"] not in self.pages:
+                self.pages.append(entry["url"])
+        return len(body)
+
+    def save(self, path: Optional[str] = None) -> str:
+        """Write the archive (merged with the existing file) atomically."""
+        path = os.path.expanduser(path) if path else self.path
+        with self._lock:
+            entries, bodies, pages = list(self.entries), dict(self._bodies), list(self.pages)
+        recorded = {entry["key"] for entry in entries}
+
+        old: Optional[Archive] = Archive(path) if os.path.exists(path) else None
+        try:
+            if old is not None:
+                kept = [e for e in old.entries if e["key"] not in recorded]
+                pages = [p for p in old.pages if p not in pages] + pages
+                entries = kept + entries
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with zipfile.ZipFile(tmp, "w") as archive:
+                index = {"version": ARCHIVE_VERSION,
+                         "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                         "pages": pages, "entries": entries}
+                archive.writestr("index.json", json.dumps(index, ensure_ascii=False), zipfile.ZIP_DEFLATED)
+                written = set()
+                for entry in entries:
+                    sha = entry.get("body")
+                    if not sha or sha in written:
+                        continue
+                    body = bodies[sha] if sha in bodies else old.body(sha)
+                    content_type = entry["headers"].get("content-type", "")
+                    compress = zipfile.ZIP_STORED if content_type.startswith(_STORED_TYPES) else zipfile.ZIP_DEFLATED
+                    archive.writestr(f"bodies/{sha}", body, compress)
+                    written.add(sha)
+        finally:
+            if old is not None:
+                old.close()
+        os.replace(tmp, path)
+        Replayer.forget(path)
+        return path
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "pages": len(self.pages),
+                "entries": len(self.entries),
+                "bodies": len(self._bodies),
+                "bytes": sum(len(body) for body in self._bodies.values()),
+            }
+
+    def attach(self, target: Any) -> "RecordSession":
+        """Record a sync Page/BrowserContext (requests go to the network)."""
+        session = RecordSession(self)
+        target.route("**/*", session._handle)
+        return session
+
+    async def attach_async(self, target: Any) -> "RecordSession":
+        session = RecordSession(self)
+        await target.route("**/*", session._handle_async)
+        return session
+
+    def __enter__(self) -> "Recorder":
+        return self
+
+    def __exit__(self, *exc: Any):
+        self.save()
+
+
+class RecordSession:
+    """Route handlers plus counters for one recorded page or context."""
+
+    def __init__(self, recorder: Recorder):
+        self.recorder = recorder
+        self.requests = 0
+        self.failed = 0
+        self.bytes = 0
+
+    @staticmethod
+    def _recordable(request: Any) -> bool:
+        return request.url.startswith(("http://", "https://"))
+
+    def _failed(self, request: Any, started: float, error: Exception):
+        self.failed += 1
+        self.recorder.add(request, 0, {}, b"", (time.perf_counter() - started) * 1000, error=str(error))
+
+    def _handle(self, route: Any):
+        request = route.request
+        if not self._recordable(request):
+            route.fallback()
+            return
+        started = time.perf_counter()
+        try:
+            # Redirects are recorded hop by hop; the browser follows the 3xx itself
+            response = route.fetch(max_redirects=0)
+            body = response.body()
+        except Exception as e:
+            self._failed(request, started, e)
+            route.abort("failed")
+            return
+        self.requests += 1
+        self.bytes += self.recorder.add(request, response.status, response.headers, body,
+                                        (time.perf_counter() - started) * 1000)
+        route.fulfill(response=response, body=body)
+
+    async def _handle_async(self, route: Any):
+        request = route.request
+        if not self._recordable(request):
+            await route.fallback()
+            return
+        started = time.perf_counter()
+        try:
+            response = await route.fetch(max_redirects=0)
+            body = await response.body()
+        except Exception as e:
+            self._failed(request, started, e)
+            await route.abort("failed")
+            return
+        self.requests += 1
+        self.bytes += self.recorder.add(request, response.status, response.headers, body,
+                                        (time.perf_counter() - started) * 1000)
+        await route.fulfill(response=response, body=body)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"requests": self.requests, "failed": self.failed, "bytes": self.bytes}
+
+
+class Replayer:
+    """
+    Serves recorded responses to attached pages.
+
+    Args:
+        archive: Archive path (or an open Archive)
+        on_miss: "abort" (no network, default) or "network" for requests not
+                 in the archive
+        loose: Fall back to matching GETs on the URL without its query string
+    """
+
+    _shared: Dict[str, Tuple[float, "Replayer"]] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, archive: Any, on_miss: str = "abort", loose: bool = True):
+        if on_miss not in ("abort", "network"):
+            raise ValueError(f"on_miss must be 'abort' or 'network', not {on_miss!r}")
+        self.archive = archive if isinstance(archive, Archive) else Archive(archive)
+        self.on_miss = on_miss
+        self._exact: Dict[str, List[Dict[str, Any]]] = {}
+        self._loose: Dict[str, Dict[str, Any]] = {}
+        for entry in self.archive.entries:
+            self._exact.setdefault(entry["key"], []).append(entry)
+            if loose and entry["method"] == "GET":
+                self._loose.setdefault(_loose_key(entry["method"], entry["url"]), entry)
+
+    @classmethod
+    def shared(cls, path: str) -> "Replayer":
+        """Process-wide Replayer for a path, reopened when the file changes."""
+        path = os.path.realpath(os.path.expanduser(path))
+        mtime = os.path.getmtime(path)
+        with cls._shared_lock:
+            cached = cls._shared.get(path)
+            if cached is None or cached[0] != mtime:
+                cls._shared[path] = (mtime, cls(path))
+            return cls._shared[path][1]
+
+    @classmethod
+    def forget(cls, path: str):
+        with cls._shared_lock:
+            cls._shared.pop(os.path.realpath(path), None)
+
+    def match(self, request: Any, seen: Dict[str, int]) -> Optional[Dict[str, Any]]:
+        """Recorded entry for a request; `seen` counts repeats per key (one per page)."""
+        key = request_key(request.method, request.url, request.post_data_buffer)
+        candidates = self._exact.get(key)
+        if candidates:
+            n = seen.get(key, 0)
+            seen[key] = n + 1
+            return candidates[min(n, len(candidates) - 1)]
+        if request.method != "GET":
+            return None
+        return self._loose.get(_loose_key(request.method, request.url))
+
+    def attach(self, target: Any) -> "ReplaySession":
+        """Serve a sync Page/BrowserContext from the archive."""
+        session = ReplaySession(self)
+        target.route("**/*", session._handle)
+        return session
+
+    async def attach_async(self, target: Any) -> "ReplaySession":
+        session = ReplaySession(self)
+        await target.route("**/*", session._handle_async)
+        return session
+
+
+class ReplaySession:
+    """Route handlers plus counters for one replayed page or context."""
+
+    def __init__(self, replayer: Replayer):
+        self.replayer = replayer
+        self.served = 0
+        self.missed = 0
+        self.bytes = 0
+        self.misses: List[str] = []
+        self._seen: Dict[str, int] = {}
+
+    def _plan(self, request: Any) -> Tuple[str, Any]:
+        """("fulfill", kwargs) | ("abort", error code) | ("network", None)."""
+        if not request.url.startswith(("http://", "https://")):
+            return "network", None
+        entry = self.replayer.match(request, self._seen)
+        if entry is None:
+            self.missed += 1
+            if len(self.misses) < 20:
+                self.misses.append(request.url)
+            if self.replayer.on_miss == "network":
+                return "network", None
+            return "abort", "internetdisconnected"
+        if entry.get("error"):
+            return "abort", "failed"
+        body = self.replayer.archive.body(entry.get("body"))
+        self.served += 1
+        self.bytes += len(body)
+        return "fulfill", {"status": entry["status"], "headers": entry["headers"], "body": body}
+
+    def _handle(self, route: Any):
+        action, value = self._plan(route.request)
+        if action == "fulfill":
+            route.fulfill(**value)
+        elif action == "abort":
+            route.abort(value)
+        else:
+            route.fallback()
+
+    async def _handle_async(self, route: Any):
+        action, value = self._plan(route.request)
+        if action == "fulfill":
+            await route.fulfill(**value)
+        elif action == "abort":
+            await route.abort(value)
+        else:
+            await route.fallback()
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {"served": self.served, "missed": self.missed, "bytes": self.bytes}
+        if self.misses:
+            stats["misses"] = list(self.misses)
+        return stats
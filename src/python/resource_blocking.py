@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Resource Blocking Router
+========================
+Request-routing layer for pages/contexts that aborts resource types and
+domains a scrape does not need (images, fonts, media, trackers...), cutting
+bandwidth through proxies and page-load time.
+
+Usage:
+  from resource_blocking import ResourceBlocker
+
+  blocker = ResourceBlocker.from_spec("no-media,no-trackers")
+  blocker.attach(page)                  # sync page or context
+  await blocker.attach_async(page)      # async page or context
+  page.goto(url)
+  print(blocker.stats())
+
+  # Through browse()
+  result = browse(url, block="text-only")
+  print(result["blocked"])
+
+Presets:
+  no-media:    images, media and fonts
+  no-trackers: well-known analytics/ads domains
+  text-only:   no-media + stylesheets + no-trackers
+  lean:        no-media + no-trackers
+"""
+
+from typing import Any, Dict, Iterable, Optional, Union
+from urllib.parse import urlsplit
+
+TRACKER_DOMAINS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googlesyndication.com",
+    "googleadservices.com",
+    "doubleclick.net",
+    "adservice.google.com",
+    "facebook.net",
+    "connect.facebook.net",
+    "hotjar.com",
+    "clarity.ms",
+    "segment.io",
+    "mixpanel.com",
+    "newrelic.com",
+    "nr-data.net",
+    "criteo.com",
+    "criteo.net",
+    "taboola.com",
+    "outbrain.com",
+    "scorecardresearch.com",
+    "bing.com/bat",
+)
+
+PRESETS: Dict[str, Dict[str, Any]] = {
+    "no-media": {"block_types": ["image", "media", "font"]},
+    "no-trackers": {"block_domains": list(TRACKER_DOMAINS)},
+    "text-only": {
+        "block_types": ["image", "media", "font", "stylesheet"],
+        "block_domains": list(TRACKER_DOMAINS),
+    },
+    "lean": {
+        "block_types": ["image", "media", "font"],
+        "block_domains": list(TRACKER_DOMAINS),
+    },
+}
+
+
+def _domain_matches(host: str, path: str, domains: Iterable[str]) -> Optional[str]:
+    """First entry of domains matching host (or host+path prefix for "host/path")."""
+    for domain in domains:
+        name, _, prefix = domain.partition("/")
+        if host == name or host.endswith("." + name):
+            if not prefix or path.lstrip("/").startswith(prefix):
+                return domain
+    return None
+
+
+class ResourceBlocker:
+    """
+    Decide per request whether to abort it, and count what was blocked.
+
+    Allow lists win over block lists. The top-level document request is
+    never blocked.
+
+    Args:
+        block_types: Playwright resource types to abort (image, font, media,
+                     stylesheet, script, xhr, fetch, websocket, ...)
+        allow_types: If given, abort every resource type not listed
+        block_domains: Domains (and subdomains) to abort; "host/path" entries
+                       match a path prefix
+        allow_domains: Domains never blocked
+    """
+
+    def __init__(
+        self,
+        block_types: Iterable[str] = (),
+        allow_types: Optional[Iterable[str]] = None,
+        block_domains: Iterable[str] = (),
+        allow_domains: Iterable[str] = (),
+    ):
+        self.block_types = frozenset(block_types)
+        self.allow_types = frozenset(allow_types) if allow_types is not None else None
+        self.block_domains = tuple(block_domains)
+        self.allow_domains = tuple(allow_domains)
+        self.reset()
+
+    @classmethod
+    def from_spec(cls, spec: Union[None, str, Dict[str, Any], "ResourceBlocker"]) -> Optional["ResourceBlocker"]:
+        """
+        Build a blocker with fresh counters from a preset name, a comma
+        separated list of presets, a dict of constructor arguments or
+        another ResourceBlocker. Returns None for an empty spec.
+        """
+        if not spec:
+            return None
+        if isinstance(spec, ResourceBlocker):
+            return spec.copy()
+        if isinstance(spec, dict):
+            return cls(**spec)
+
+        options: Dict[str, set] = {"block_types": set(), "block_domains": set()}
+        for name in (part.strip() for part in spec.split(",")):
+            if not name:
+                continue
+            if name not in PRESETS:
+                raise ValueError(f"Unknown block preset {name!r} (available: {', '.join(PRESETS)})")
+            for key, values in PRESETS[name].items():
+                options[key].update(values)
+        return cls(**options)
+
+    def copy(self) -> "ResourceBlocker":
+        return ResourceBlocker(
+            self.block_types, self.allow_types, self.block_domains, self.allow_domains
+        )
+
+    def reset(self):
+        self.blocked_requests = 0
+        self.blocked_by_type: Dict[str, int] = {}
+        self.blocked_by_domain: Dict[str, int] = {}
+        self.allowed_requests = 0
+
+    def should_block(self, resource_type: str, url: str) -> bool:
+        if resource_type == "document":
+            return False
+        parts = urlsplit(url)
+        host = (parts.hostname or "").lower()
+        if self.allow_domains and _domain_matches(host, parts.path, self.allow_domains):
+            return False
+        if self.block_domains and _domain_matches(host, parts.path, self.block_domains):
+            return True
+        if self.allow_types is not None and resource_type not in self.allow_types:
+            return True
+        return resource_type in self.block_types
+
+    def _record(self, request: Any) -> bool:
+        """Count the request; True if it must be aborted."""
+        resource_type = request.resource_type
+        if not self.should_block(resource_type, request.url):
+            self.allowed_requests += 1
+            return False
+        self.blocked_requests += 1
+        self.blocked_by_type[resource_type] = self.blocked_by_type.get(resource_type, 0) + 1
+        host = urlsplit(request.url).hostname or ""
+        self.blocked_by_domain[host] = self.blocked_by_domain.get(host, 0) + 1
+        return True
+
+    # Other route handlers may be registered on the same target, so allowed
+    # requests use route.fallback() to pass them on instead of continue_().
+
+    def _handle(self, route: Any):
+        if self._record(route.request):
+            route.abort("blockedbyclient")
+        else:
+            route.fallback()
+
+    async def _handle_async(self, route: Any):
+        if self._record(route.request):
+            await route.abort("blockedbyclient")
+        else:
+            await route.fallback()
+
+    def attach(self, target: Any):
+        """Route a sync Page or BrowserContext through this blocker."""
+        target.route("**/*", self._handle)
+
+    async def attach_async(self, target: Any):
+        """Route an async Page or BrowserContext through this blocker."""
+        await target.route("**/*", self._handle_async)
+
+    def detach(self, target: Any):
+        target.unroute("**/*", self._handle)
+
+    async def detach_async(self, target: Any):
+        await target.unroute("**/*", self._handle_async)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Request counters since creation/reset(). Aborted requests are never
+        downloaded, so their size is unknown; bytes that were transferred are
+        in browse()'s result["network"].
+        """
+        top_domains = sorted(self.blocked_by_domain.items(), key=lambda kv: -kv[1])[:10]
+        return {
+            "blocked_requests": self.blocked_requests,
+            "blocked_by_type": dict(self.blocked_by_type),
+            "blocked_top_domains": dict(top_domains),
+            "allowed_requests": self.allowed_requests,
+        }
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Result Cache
+============
+TTL memoization of whole browse()/search_mercadolibre() results, keyed on
+normalized arguments. Concurrent identical calls are collapsed into one
+in-flight navigation (single-flight); the others wait and share its result.
+
+Backends:
+  MemoryBackend(max_entries)   in-process LRU (default)
+  SQLiteBackend(path)          on disk, shared by processes on the same host
+
+Policies (cache= argument):
+  use      return a fresh cached result, otherwise navigate and store
+  refresh  always navigate, then store the new result
+  bypass   neither read nor write the cache (default)
+
+Usage:
+  from result_cache import ResultCache, SQLiteBackend
+
+  products = search_mercadolibre("laptop", cache="use")
+  result = browse(url, extract_text=True, cache="use",
+                  result_cache=ResultCache(ttl=300, backend=SQLiteBackend("/tmp/results.db")))
+  print(result["cache"])               # "hit", "miss", "shared" or "refresh"
+  print(default_result_cache().stats())
+
+Environment:
+  CAMOUFOX_RESULT_CACHE: SQLite path for the default cache (memory if unset)
+  CAMOUFOX_RESULT_TTL: default TTL in seconds (600)
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+POLICIES = ("use", "refresh", "bypass")
+
+
+def normalize_url(url: str) -> str:
+    """Lowercase scheme/host, drop default ports and fragments, sort the query."""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    port = parts.port
+    if port and not ((scheme == "http" and port == 80) or (scheme == "https" and port == 443)):
+        host = f"{host}:{port}"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, parts.path or "/", query, ""))
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+class MemoryBackend:
+    """In-process LRU of serialized results."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, Tuple[str, float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Tuple[str, float, float]]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                self._data.move_to_end(key)
+            return entry
+
+    def set(self, key: str, value: str, expires_at: float, cost: float):
+        with self._lock:
+            self._data[key] = (value, expires_at, cost)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteBackend:
+    """On-disk store; WAL mode lets several processes share it."""
+
+    def __init__(self, path: str, max_entries: int = 100000):
+        self.path = os.path.expanduser(path)
+        self.max_entries = max_entries
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+            " expires_at REAL NOT NULL, cost REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS results_access ON results(last_access)")
+        self._db.commit()
+
+    def get(self, key: str) -> Optional[Tuple[str, float, float]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value, expires_at, cost FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                self._db.execute(
+                    "UPDATE results SET last_access = ? WHERE key = ?", (time.time(), key)
+                )
+                self._db.commit()
+            return row
+
+    def set(self, key: str, value: str, expires_at: float, cost: float):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+                (key, value, expires_at, cost, time.time()),
+            )
+            self._db.execute(
+                "DELETE FROM results WHERE key IN (SELECT key FROM results"
+                " ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._db.commit()
+
+    def delete(self, key: str):
+        with self._lock:
+            self._db.execute("DELETE FROM results WHERE key = ?", (key,))
+            self._db.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+
+class _Flight:
+    """A navigation in progress that identical callers wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.snapshot: Optional[str] = None  # JSON of the value, taken before done is set
+        self.error: Optional[BaseException] = None
+
+
+class ResultCache:
+    """
+    TTL result cache with single-flight deduplication.
+
+    Args:
+        ttl: Seconds a stored result stays fresh
+        backend: MemoryBackend (default) or SQLiteBackend
+    """
+
+    def __init__(self, ttl: float = 600.0, backend: Any = None):
+        self.ttl = ttl
+        self.backend = backend if backend is not None else MemoryBackend()
+        self._lock = threading.Lock()
+        self._flights: Dict[str, _Flight] = {}
+        self._async_flights: Dict[str, "asyncio.Future[Any]"] = {}
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.bypasses = 0
+        self.shared = 0
+        self.latency_saved = 0.0
+
+    @staticmethod
+    def key(namespace: str, **args: Any) -> str:
+        raw = json.dumps([namespace, args], sort_keys=True, default=repr)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _lookup(self, key: str) -> Optional[Any]:
+        entry = self.backend.get(key)
+        if entry is None:
+            return None
+        value, expires_at, cost = entry
+        if time.time() >= expires_at:
+            return None
+        with self._lock:
+            self.hits += 1
+            self.latency_saved += cost
+        return json.loads(value)
+
+    def _store(self, key: str, value: Any, cost: float, ttl: Optional[float]):
+        try:
+            serialized = json.dumps(value, ensure_ascii=False)
+        except (TypeError, ValueError):
+            return
+        self.backend.set(key, serialized, time.time() + (self.ttl if ttl is None else ttl), cost)
+
+    def _count(self, policy: str):
+        with self._lock:
+            if policy == "refresh":
+                self.refreshes += 1
+            else:
+                self.misses += 1
+
+    def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Any],
+        policy: str = "use",
+        ttl: Optional[float] = None,
+        cacheable: Callable[[Any], bool] = bool,
+    ) -> Tuple[Any, str]:
+        """
+        Returns (value, status) with status "hit", "miss", "shared",
+        "refresh" or "bypass". Thread-safe.
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown cache policy {policy!r} (use, refresh, bypass)")
+        if policy == "bypass":
+            with self._lock:
+                self.bypasses += 1
+            return compute(), "bypass"
+        if policy == "use":
+            cached = self._lookup(key)
+            if cached is not None:
+                return cached, "hit"
+
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.shared += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return json.loads(flight.snapshot), "shared"
+
+        self._count(policy)
+        started = time.monotonic()
+        try:
+            value = compute()
+            # Followers copy a snapshot, so the caller may mutate value once done is set
+            flight.snapshot = json.dumps(value, default=repr)
+            if cacheable(value):
+                self._store(key, value, time.monotonic() - started, ttl)
+            return value, "refresh" if policy == "refresh" else "miss"
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    async def get_or_compute_async(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        policy: str = "use",
+        ttl: Optional[float] = None,
+        cacheable: Callable[[Any], bool] = bool,
+    ) -> Tuple[Any, str]:
+        """Async version of get_or_compute(); single-flight within one event loop."""
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown cache policy {policy!r} (use, refresh, bypass)")
+        if policy == "bypass":
+            self.bypasses += 1
+            return await compute(), "bypass"
+        if policy == "use":
+            cached = self._lookup(key)
+            if cached is not None:
+                return cached, "hit"
+
+        flight = self._async_flights.get(key)
+        if flight is not None:
+            with self._lock:
+                self.shared += 1
+            try:
+                snapshot = await asyncio.shield(flight)
+            except asyncio.CancelledError:
+                if not flight.cancelled():
+                    raise
+                # The leading call was cancelled: take over the navigation
+                return await self.get_or_compute_async(key, compute, policy, ttl, cacheable)
+            return json.loads(snapshot), "shared"
+
+        flight = self._async_flights[key] = asyncio.get_running_loop().create_future()
+        self._count(policy)
+        started = time.monotonic()
+        try:
+            value = await compute()
+            if cacheable(value):
+                self._store(key, value, time.monotonic() - started, ttl)
+            flight.set_result(json.dumps(value, default=repr))
+            return value, "refresh" if policy == "refresh" else "miss"
+        except asyncio.CancelledError:
+            flight.cancel()
+            raise
+        except BaseException as e:
+            flight.set_exception(e)
+            flight.exception()  # mark retrieved when nobody else is waiting
+            raise
+        finally:
+            self._async_flights.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "bypasses": self.bypasses,
+            "shared": self.shared,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "latency_saved_s": round(self.latency_saved, 2),
+            "entries": len(self.backend),
+        }
+
+
+_default: Optional[ResultCache] = None
+_default_lock = threading.Lock()
+
+
+def default_result_cache() -> ResultCache:
+    """Process-wide ResultCache, configured from the environment on first use."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            path = os.environ.get("CAMOUFOX_RESULT_CACHE")
+            _default = ResultCache(
+                ttl=float(os.environ.get("CAMOUFOX_RESULT_TTL", "600")),
+                backend=SQLiteBackend(path) if path else MemoryBackend(),
+            )
+        return _default
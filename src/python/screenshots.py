@@ -0,0 +1,446 @@
+#!/usr/bin/env python3
+"""
+Screenshot Pipeline
+===================
+Captures screenshots to memory and hands encoding and storage to a worker
+pool, so a full-page PNG encode or a slow disk never blocks the next
+navigation step. Identical captures (same content hash) are stored once,
+and writes reach the sink in batches.
+
+Capture modes:
+  viewport   what is on screen (default)
+  full       the whole scrollable page as one image
+  tiles      the whole page as viewport-sized tiles (smaller encodes; repeated
+             tiles such as blank areas are deduplicated)
+  clip       a region ({"x", "y", "width", "height"}) or an element (selector)
+
+Formats: png, jpeg (encoded by the browser, no Pillow needed) and webp
+(transcoded in the pool; needs Pillow).
+
+Sinks:
+  DirectorySink(path)            one file per image
+  TarSink(path, shard_mb=256)    images appended to rolling .tar shards
+  SQLiteSink(path)               blobs in one SQLite file
+
+Usage:
+  from screenshots import ScreenshotPipeline, DirectorySink
+
+  shots = ScreenshotPipeline(DirectorySink("/tmp/shots"), format="jpeg", quality=80)
+  key = await shots.capture_async(page, "google/01_inicio")      # returns at once
+  keys = shots.capture(page, "wiki/articulo", mode="tiles")      # sync API
+  shots.close()                  # waits for pending encodes and writes
+  print(shots.stats())
+
+  # Through browse(): the screenshot goes to the pipeline instead of a PNG file
+  browse(url, screenshot_path="ejemplo/home", screenshots=shots)
+"""
+
+import asyncio
+import hashlib
+import io
+import os
+import sqlite3
+import tarfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from phash import PHASH_AVAILABLE, PerceptualIndex, perceptual_hashes
+
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+FORMATS = ("png", "jpeg", "webp")
+MODES = ("viewport", "full", "tiles", "clip")
+_EXTENSIONS = {"png": ".png", "jpeg": ".jpg", "webp": ".webp"}
+
+_PAGE_SIZE_JS = """() => {
+    const d = document.documentElement;
+    return {width: Math.max(d.scrollWidth, window.innerWidth), height: Math.max(d.scrollHeight, window.innerHeight),
+            viewportWidth: window.innerWidth, viewportHeight: window.innerHeight};
+}"""
+
+
+class DirectorySink:
+    """One file per image under a directory (keys may contain '/')."""
+
+    def __init__(self, path: str):
+        self.path = os.path.expanduser(path)
+        os.makedirs(self.path, exist_ok=True)
+
+    def write_batch(self, items: List[Tuple[str, bytes]]):
+        for key, data in items:
+            target = os.path.join(self.path, key)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, "wb") as f:
+                f.write(data)
+
+    def close(self):
+        pass
+
+
+class TarSink:
+    """
+    Images appended to tar shards (path-00000.tar, path-00001.tar...),
+    rolled over after shard_mb megabytes.
+    """
+
+    def __init__(self, path: str, shard_mb: float = 256):
+        self.path = os.path.expanduser(path[:-4] if path.endswith(".tar") else path)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.shard_bytes = int(shard_mb * 1024 * 1024)
+        self.shards: List[str] = []
+        self._tar: Optional[tarfile.TarFile] = None
+        self._size = 0
+
+    def _roll(self):
+        if self._tar is not None:
+            self._tar.close()
+        name = f"{self.path}-{len(self.shards):05d}.tar"
+        self.shards.append(name)
+        self._tar = tarfile.open(name, "w")
+        self._size = 0
+
+    def write_batch(self, items: List[Tuple[str, bytes]]):
+        for key, data in items:
+            if self._tar is None or self._size >= self.shard_bytes:
+                self._roll()
+            info = tarfile.TarInfo(key)
+            info.size = len(data)
+            info.mtime = int(time.time())
+            self._tar.addfile(info, io.BytesIO(data))
+            self._size += len(data) + 512
+        self._tar.fileobj.flush()
+
+    def close(self):
+        if self._tar is not None:
+            self._tar.close()
+            self._tar = None
+
+
+class SQLiteSink:
+    """Images as blobs in a SQLite file: images(key, data, created)."""
+
+    def __init__(self, path: str):
+        self.path = os.path.expanduser(path)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS images (key TEXT PRIMARY KEY, data BLOB NOT NULL, created REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    def write_batch(self, items: List[Tuple[str, bytes]]):
+        now = time.time()
+        self._db.executemany(
+            "INSERT OR REPLACE INTO images VALUES (?, ?, ?)",
+            [(key, data, now) for key, data in items],
+        )
+        self._db.commit()
+
+    def close(self):
+        self._db.close()
+
+
+def _transcode(raw: bytes, fmt: str, quality: int) -> bytes:
+    image = Image.open(io.BytesIO(raw))
+    if fmt == "jpeg" and image.mode != "RGB":
+        image = image.convert("RGB")
+    out = io.BytesIO()
+    options = {} if fmt == "png" else {"quality": quality}
+    image.save(out, format=fmt.upper(), **options)
+    return out.getvalue()
+
+
+class ScreenshotPipeline:
+    """
+    In-memory capture, pooled encoding and batched, deduplicated storage.
+
+    Args:
+        sink: DirectorySink, TarSink or SQLiteSink (or a directory path)
+        format: "png", "jpeg" or "webp"
+        quality: JPEG/WebP quality (1-100)
+        workers: Encoding/writing threads
+        batch_size: Images per sink write
+        dedupe: Store identical captures once (by sha256 of the capture)
+        max_tiles: Upper bound of tiles per capture in "tiles" mode
+        perceptual: PerceptualIndex (or True for an in-memory one): frames
+                    within phash_threshold of the series' last stored frame
+                    are not stored (needs NumPy and Pillow)
+        phash_threshold: Max perceptual distance (0-1) still considered unchanged
+    """
+
+    def __init__(
+        self,
+        sink: Union[str, Any],
+        format: str = "png",
+        quality: int = 80,
+        workers: int = 2,
+        batch_size: int = 8,
+        dedupe: bool = True,
+        max_tiles: int = 30,
+        perceptual: Union[None, bool, PerceptualIndex] = None,
+        phash_threshold: float = 0.05,
+    ):
+        if format not in FORMATS:
+            raise ValueError(f"Unknown format {format!r} (expected {', '.join(FORMATS)})")
+        if format == "webp" and not PIL_AVAILABLE:
+            raise RuntimeError("WebP screenshots need Pillow: pip install Pillow")
+        if perceptual and not PHASH_AVAILABLE:
+            raise RuntimeError("Perceptual dedupe needs NumPy and Pillow: pip install numpy Pillow")
+        self.perceptual = PerceptualIndex() if perceptual is True else (perceptual or None)
+        self.phash_threshold = phash_threshold
+        self.sink = DirectorySink(sink) if isinstance(sink, str) else sink
+        self.format = format
+        self.quality = quality
+        self.batch_size = batch_size
+        self.dedupe = dedupe
+        self.max_tiles = max_tiles
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="screenshots")
+        self._lock = threading.Lock()
+        self._sink_lock = threading.Lock()
+        self._futures: List[Future] = []
+        self._pending: List[Tuple[str, bytes]] = []
+        self._hashes: Dict[str, str] = {}
+        self._stats = {"captured": 0, "duplicates": 0, "similar": 0, "written": 0, "bytes_raw": 0,
+                       "bytes_written": 0, "capture_s": 0.0, "encode_s": 0.0, "errors": 0}
+        self.last_error: Optional[BaseException] = None
+
+    # -- capture -------------------------------------------------------------
+
+    def _capture_options(self) -> Dict[str, Any]:
+        # The browser encodes PNG/JPEG itself; WebP is transcoded from PNG
+        if self.format == "jpeg":
+            return {"type": "jpeg", "quality": self.quality}
+        return {"type": "png"}
+
+    def _tile_clips(self, size: Dict[str, int]) -> List[Dict[str, int]]:
+        height = size["viewportHeight"] or size["height"]
+        count = min(self.max_tiles, -(-size["height"] // height))
+        return [
+            {"x": 0, "y": i * height, "width": size["width"], "height": min(height, size["height"] - i * height)}
+            for i in range(count)
+        ]
+
+    def _key(self, name: str, tile: Optional[int] = None) -> str:
+        base, ext = os.path.splitext(name)
+        if ext.lower() in (".png", ".jpg", ".jpeg", ".webp"):
+            name = base
+        suffix = "" if tile is None else f"_t{tile:02d}"
+        return f"{name}{suffix}{_EXTENSIONS[self.format]}"
+
+    def capture(
+        self,
+        page: Any,
+        name: str,
+        mode: str = "viewport",
+        clip: Optional[Dict[str, float]] = None,
+        selector: Optional[str] = None,
+        series: Optional[str] = None,
+        details: bool = False,
+    ) -> Any:
+        """
+        Capture a sync page and queue it for encoding/storage.
+
+        Args:
+            series: What the perceptual hash is compared against (default:
+                    name, so the same name across runs is one series)
+            details: Return dicts (key, sha256, stored, duplicate_of,
+                     phash, distance, changed, similar_to) instead of keys
+
+        Returns:
+            The storage key (an earlier key for duplicates and near-identical
+            frames); a list of them in "tiles" mode. With a perceptual index
+            the hash runs in the pool and this waits for it, so keys and
+            details are final when returned; the encode never blocks
+        """
+        options = self._capture_options()
+        shots = []
+        if mode == "tiles":
+            size = page.evaluate(_PAGE_SIZE_JS)
+            for i, tile in enumerate(self._tile_clips(size)):
+                started = time.monotonic()
+                raw = page.screenshot(full_page=True, clip=tile, **options)
+                shots.append((i, raw, time.monotonic() - started))
+        else:
+            call, kwargs = self._shot_call(page, mode, clip, selector, options)
+            started = time.monotonic()
+            raw = call(**kwargs)
+            shots.append((None, raw, time.monotonic() - started))
+        infos, fresh = self._register(name, shots)
+        hashes = None
+        if self.perceptual and fresh:
+            hashes = self._executor.submit(perceptual_hashes, [raw for _, raw, _ in fresh]).result()
+        return self._finish(infos, fresh, hashes, series or name, mode, details)
+
+    async def capture_async(
+        self,
+        page: Any,
+        name: str,
+        mode: str = "viewport",
+        clip: Optional[Dict[str, float]] = None,
+        selector: Optional[str] = None,
+        series: Optional[str] = None,
+        details: bool = False,
+    ) -> Any:
+        """Async version of capture(); hashing and encoding run in the pool."""
+        options = self._capture_options()
+        shots = []
+        if mode == "tiles":
+            size = await page.evaluate(_PAGE_SIZE_JS)
+            for i, tile in enumerate(self._tile_clips(size)):
+                started = time.monotonic()
+                raw = await page.screenshot(full_page=True, clip=tile, **options)
+                shots.append((i, raw, time.monotonic() - started))
+        else:
+            call, kwargs = self._shot_call(page, mode, clip, selector, options)
+            started = time.monotonic()
+            raw = await call(**kwargs)
+            shots.append((None, raw, time.monotonic() - started))
+        infos, fresh = self._register(name, shots)
+        hashes = None
+        if self.perceptual and fresh:
+            hashes = await asyncio.get_running_loop().run_in_executor(
+                self._executor, perceptual_hashes, [raw for _, raw, _ in fresh]
+            )
+        return self._finish(infos, fresh, hashes, series or name, mode, details)
+
+    @staticmethod
+    def _shot_call(page: Any, mode: str, clip: Optional[Dict[str, float]], selector: Optional[str],
+                   options: Dict[str, Any]) -> Tuple[Any, Dict[str, Any]]:
+        if mode not in MODES:
+            raise ValueError(f"Unknown screenshot mode {mode!r} (expected {', '.join(MODES)})")
+        if mode == "clip":
+            if selector:
+                return page.locator(selector).first.screenshot, options
+            if not clip:
+                raise ValueError("mode='clip' needs clip or selector")
+            return page.screenshot, dict(options, clip=clip)
+        return page.screenshot, dict(options, full_page=mode == "full")
+
+    # -- dedupe, encode and store --------------------------------------------
+
+    def _register(self, name: str, shots: List[Tuple[Optional[int], bytes, float]]):
+        """Exact (sha256) dedupe; returns all infos and the shots with new content."""
+        infos, fresh = [], []
+        with self._lock:
+            for tile, raw, elapsed in shots:
+                key = self._key(name, tile)
+                digest = hashlib.sha256(raw).hexdigest()
+                info = {"key": key, "sha256": digest, "stored": False, "tile": tile}
+                self._stats["captured"] += 1
+                self._stats["bytes_raw"] += len(raw)
+                self._stats["capture_s"] += elapsed
+                existing = self._hashes.get(digest) if self.dedupe else None
+                if existing is not None:
+                    self._stats["duplicates"] += 1
+                    info.update(key=existing, duplicate_of=existing)
+                else:
+                    if self.dedupe:
+                        self._hashes[digest] = key
+                    fresh.append((info, raw, tile))
+                infos.append(info)
+        return infos, fresh
+
+    def _finish(self, infos: List[Dict[str, Any]], fresh: List[Tuple[Dict[str, Any], bytes, Optional[int]]],
+                hashes: Optional[List[int]], series: str, mode: str, details: bool) -> Any:
+        """Perceptual filter on new content, then queue what is kept."""
+        for n, (info, raw, tile) in enumerate(fresh):
+            if hashes is None or self._check(info, tile, hashes[n], series):
+                info["stored"] = True
+                self._submit(self._encode_and_queue, info["key"], raw)
+        return self._result(infos, mode, details)
+
+    @staticmethod
+    def _result(infos: List[Dict[str, Any]], mode: str, details: bool) -> Any:
+        for info in infos:
+            info.pop("tile", None)
+        items = infos if details else [info["key"] for info in infos]
+        return items if mode == "tiles" else items[0]
+
+    def _check(self, info: Dict[str, Any], tile: Optional[int], phash: int, series: str) -> bool:
+        """Compare a new frame with its series; False when it is near-identical (not stored)."""
+        tile_series = series if tile is None else f"{series}#t{tile:02d}"
+        changed, score = self.perceptual.check(tile_series, phash, self.phash_threshold)
+        info.update(phash=f"{phash:016x}", distance=score, changed=changed)
+        if not changed:
+            similar = self.perceptual.last(tile_series)[1]
+            with self._lock:
+                self._stats["similar"] += 1
+                if self.dedupe:
+                    self._hashes[info["sha256"]] = similar
+            info.update(key=similar, similar_to=similar)
+            return False
+        self.perceptual.add(tile_series, phash, info["key"])
+        return True
+
+    def _submit(self, fn: Any, *args: Any):
+        with self._lock:
+            # Finished jobs report errors through stats, so only pending ones are kept
+            self._futures = [future for future in self._futures if not future.done()]
+            self._futures.append(self._executor.submit(fn, *args))
+
+    def _encode_and_queue(self, key: str, raw: bytes):
+        try:
+            started = time.monotonic()
+            data = _transcode(raw, self.format, self.quality) if self.format == "webp" else raw
+            with self._lock:
+                self._stats["encode_s"] += time.monotonic() - started
+                self._pending.append((key, data))
+                batch = None
+                if len(self._pending) >= self.batch_size:
+                    batch, self._pending = self._pending, []
+            if batch:
+                self._write(batch)
+        except Exception as e:
+            with self._lock:
+                self._stats["errors"] += 1
+                self.last_error = e
+
+    def _write(self, batch: List[Tuple[str, bytes]]):
+        with self._sink_lock:
+            self.sink.write_batch(batch)
+        with self._lock:
+            self._stats["written"] += len(batch)
+            self._stats["bytes_written"] += sum(len(data) for _, data in batch)
+
+    def flush(self):
+        """Wait for queued encodes and write whatever is still batched."""
+        while True:
+            with self._lock:
+                futures, self._futures = self._futures, []
+            if not futures:
+                break
+            for future in futures:
+                future.result()
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if batch:
+            self._write(batch)
+
+    def close(self):
+        self.flush()
+        self._executor.shutdown(wait=True)
+        self.sink.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats, pending=sum(not f.done() for f in self._futures) + len(self._pending))
+        stats["capture_s"] = round(stats["capture_s"], 3)
+        stats["encode_s"] = round(stats["encode_s"], 3)
+        return stats
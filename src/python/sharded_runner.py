@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Sharded Runner
+==============
+Spreads a browse job list over worker processes, so throughput scales with
+CPU cores instead of stopping at one event loop and one Playwright driver.
+
+Each worker process owns its event loop, its Xvfb display manager and an
+AsyncBrowserPool, and runs `concurrency` lanes that pull jobs from the
+worker's inbox only when free. The parent hands out jobs on credit (at most
+concurrency + prefetch outstanding per worker, least loaded first) and
+pulls the next job from the input only as results come back, so a slow
+consumer or a long input never piles up in memory. Idle workers steal
+unstarted jobs still queued at busy ones. A crashed worker is respawned and
+its outstanding jobs are requeued (once; a second crash of the same job
+reports it as failed). Results stream back to the parent in completion order.
+
+The per-domain rate limit is split between workers: each one starts at
+CAMOUFOX_RATE / workers, so the total pace per site stays the same.
+Instrumentation exporters are per worker too: worker N writes
+CAMOUFOX_METRICS_FILE with a ".shardN" suffix and serves metrics on
+CAMOUFOX_METRICS_PORT + 1 + N.
+
+Usage:
+  from sharded_runner import ShardedRunner
+
+  runner = ShardedRunner(workers=4, concurrency=4, extract_text=True)
+  for result in runner.run(urls):           # URLs or dicts of browse_async() options
+      print(result["url"], result["worker"], result["success"])
+  print(runner.stats())
+
+  # CLI
+  python camoufox_browser.py shard --urls-file urls.txt -w 4 -c 4 -f parquet -o out.parquet
+
+Job actions must be importable async functions (jobs are pickled to workers).
+"""
+
+import asyncio
+import multiprocessing
+import os
+import queue
+import signal
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Deque, Dict, Iterable, Iterator, Optional
+
+
+def _worker_main(wid: int, inbox: Any, outbox: Any, concurrency: int, browsers: int,
+                 visible: bool, workers: int, run_options: Dict[str, Any],
+                 browse_options: Dict[str, Any]):
+    """Worker process entry point: serve jobs from inbox until a None per lane."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)   # the parent handles Ctrl-C
+    rate = float(os.environ.get("CAMOUFOX_RATE", "1.0"))
+    os.environ["CAMOUFOX_RATE"] = str(rate / workers)
+    os.environ["CAMOUFOX_RATE_MAX"] = str(float(os.environ.get("CAMOUFOX_RATE_MAX", "10")) / workers)
+    os.environ.pop("CAMOUFOX_RATE_STATE", None)    # per-worker shares must not overwrite learned rates
+    # One Prometheus textfile / port per worker; the collector sums them
+    if os.environ.get("CAMOUFOX_METRICS_FILE"):
+        stem, ext = os.path.splitext(os.environ["CAMOUFOX_METRICS_FILE"])
+        os.environ["CAMOUFOX_METRICS_FILE"] = f"{stem}.shard{wid}{ext}"
+    if int(os.environ.get("CAMOUFOX_METRICS_PORT", "0")):
+        os.environ["CAMOUFOX_METRICS_PORT"] = str(int(os.environ["CAMOUFOX_METRICS_PORT"]) + 1 + wid)
+    asyncio.run(_worker_loop(wid, inbox, outbox, concurrency, browsers, visible,
+                             run_options, browse_options))
+
+
+async def _worker_loop(wid: int, inbox: Any, outbox: Any, concurrency: int, browsers: int,
+                       visible: bool, run_options: Dict[str, Any], browse_options: Dict[str, Any]):
+    from browser_pool import AsyncBrowserPool
+    from camoufox_browser import browse_many_async
+
+    loop = asyncio.get_running_loop()
+    # One blocking inbox.get per lane; a lane only takes a job when it is free
+    getters = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix=f"shard{wid}")
+    pool = AsyncBrowserPool(
+        min_size=0, max_size=browsers, contexts_per_browser=-(-concurrency // browsers), visible=visible,
+    )
+
+    async def lane():
+        while True:
+            item = await loop.run_in_executor(getters, inbox.get)
+            if item is None:
+                return
+            seq, job = item
+            async for result in browse_many_async([job], concurrency=1, pool=pool,
+                                                  **run_options, **browse_options):
+                outbox.put(("result", wid, seq, result))
+
+    try:
+        async with pool:
+            await asyncio.gather(*(lane() for _ in range(concurrency)))
+    finally:
+        getters.shutdown(wait=False)
+
+
+class _Worker:
+    """Parent-side handle of one worker process."""
+
+    def __init__(self, wid: int, process: Any, inbox: Any):
+        self.wid = wid
+        self.process = process
+        self.inbox = inbox
+        self.outstanding: Dict[int, Any] = {}
+        self.completed = 0
+
+
+class ShardedRunner:
+    """
+    Process pool running browse jobs, one browser pool per worker.
+
+    Args:
+        workers: Worker processes (default: CPU count)
+        concurrency: Pages in flight per worker
+        browsers: Browsers per worker (default: one per 4 concurrent pages)
+        prefetch: Extra jobs queued per worker beyond concurrency (stealable)
+        max_respawns: Worker restarts allowed over a run before giving up on
+                      the crashed slot (default: 2 per worker)
+        crash_retries: Times a job is requeued after its worker crashed
+        visible: Show worker browsers
+        job_timeout, retries, retry_backoff: Per-job settings (see browse_many_async)
+        **browse_options: Defaults for every job (extract_text, schema, block, ...)
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        concurrency: int = 4,
+        browsers: Optional[int] = None,
+        prefetch: Optional[int] = None,
+        max_respawns: Optional[int] = None,
+        crash_retries: int = 1,
+        visible: bool = False,
+        job_timeout: Optional[float] = None,
+        retries: int = 0,
+        retry_backoff: float = 1.0,
+        **browse_options: Any,
+    ):
+        self.workers = workers or os.cpu_count() or 1
+        self.concurrency = concurrency
+        self.browsers = browsers or max(1, -(-concurrency // 4))
+        self.prefetch = concurrency if prefetch is None else prefetch
+        self.max_respawns = 2 * self.workers if max_respawns is None else max_respawns
+        self.crash_retries = crash_retries
+        self.visible = visible
+        self.run_options = dict(job_timeout=job_timeout, retries=retries, retry_backoff=retry_backoff)
+        self.browse_options = browse_options
+        self._ctx = multiprocessing.get_context("spawn")
+        self._workers: Dict[int, _Worker] = {}
+        self._next_wid = 0
+        self._stats = {"jobs": 0, "completed": 0, "failed": 0, "steals": 0, "crashes": 0,
+                       "respawns": 0, "requeued": 0}
+
+    # -- worker lifecycle ----------------------------------------------------
+
+    def _spawn(self, outbox: Any) -> _Worker:
+        wid = self._next_wid
+        self._next_wid += 1
+        inbox = self._ctx.Queue()
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(wid, inbox, outbox, self.concurrency, self.browsers, self.visible, self.workers,
+                  self.run_options, self.browse_options),
+            name=f"camoufox-shard-{wid}",
+            daemon=True,
+        )
+        process.start()
+        worker = self._workers[wid] = _Worker(wid, process, inbox)
+        return worker
+
+    def _stop(self):
+        for worker in self._workers.values():
+            # Unstarted jobs are dropped so lanes stop after their current page
+            while True:
+                try:
+                    worker.inbox.get_nowait()
+                except (queue.Empty, OSError, ValueError):
+                    break
+            for _ in range(self.concurrency):
+                try:
+                    worker.inbox.put(None)
+                except Exception:
+                    pass
+        deadline = time.monotonic() + 30
+        for worker in self._workers.values():
+            worker.process.join(max(0.1, deadline - time.monotonic()))
+            if worker.process.is_alive():
+                worker.process.terminate()
+                worker.process.join(5)
+        self._workers.clear()
+
+    # -- scheduling ----------------------------------------------------------
+
+    def run(self, jobs: Iterable[Any]) -> Iterator[Dict[str, Any]]:
+        """
+        Yield a result per job as workers finish them (completion order).
+
+        Results are browse_async() dicts plus "index" (input position),
+        "attempts" and "worker"; a job's own "id" is echoed back.
+        """
+        outbox = self._ctx.Queue()
+        source = iter(jobs)
+        exhausted = False
+        requeue: Deque[int] = deque()
+        pending: Dict[int, Any] = {}     # seq -> job, until its result is yielded
+        owner: Dict[int, int] = {}       # seq -> wid currently holding it
+        crashes: Dict[int, int] = {}
+        capacity = self.concurrency + self.prefetch
+        respawns = 0
+        seq = 0
+
+        for _ in range(self.workers):
+            self._spawn(outbox)
+        try:
+            while True:
+                # Hand out requeued, then new jobs, least loaded worker first
+                for worker in sorted(self._workers.values(), key=lambda w: len(w.outstanding)):
+                    while len(worker.outstanding) < capacity:
+                        if requeue:
+                            job_seq = requeue.popleft()
+                        elif not exhausted:
+                            try:
+                                job = next(source)
+                            except StopIteration:
+                                exhausted = True
+                                break
+                            job_seq, seq = seq, seq + 1
+                            pending[job_seq] = job if isinstance(job, dict) else {"url": job}
+                            self._stats["jobs"] += 1
+                        else:
+                            break
+                        worker.outstanding[job_seq] = pending[job_seq]
+                        owner[job_seq] = worker.wid
+                        worker.inbox.put((job_seq, pending[job_seq]))
+
+                if exhausted and not pending:
+                    return
+                if exhausted and not requeue:
+                    self._steal(owner)
+
+                try:
+                    message = outbox.get(timeout=0.5)
+                except queue.Empty:
+                    message = None
+                if message is not None:
+                    _, wid, job_seq, result = message
+                    if job_seq not in pending:
+                        continue   # a requeued duplicate already reported
+                    holder = self._workers.get(owner.pop(job_seq, -1))
+                    if holder is not None:
+                        holder.outstanding.pop(job_seq, None)
+                    if job_seq in requeue:
+                        requeue.remove(job_seq)
+                    job = pending.pop(job_seq)
+                    if wid in self._workers:
+                        self._workers[wid].completed += 1
+                    result["index"] = job_seq
+                    result["worker"] = wid
+                    if "id" in job:
+                        result["id"] = job["id"]
+                    else:
+                        result.pop("id", None)
+                    self._stats["completed"] += 1
+                    self._stats["failed"] += not result["success"]
+                    yield result
+
+                # Crash isolation: respawn dead workers, requeue what they held
+                for worker in [w for w in self._workers.values() if not w.process.is_alive()]:
+                    del self._workers[worker.wid]
+                    self._stats["crashes"] += 1
+                    for job_seq in worker.outstanding:
+                        owner.pop(job_seq, None)
+                        crashes[job_seq] = crashes.get(job_seq, 0) + 1
+                        if crashes[job_seq] > self.crash_retries:
+                            job = pending.pop(job_seq)
+                            self._stats["completed"] += 1
+                            self._stats["failed"] += 1
+                            yield {
+                                "url": job.get("url"), "title": None, "success": False,
+                                "error": f"Worker process crashed (exit code {worker.process.exitcode})",
+                                "index": job_seq, "attempts": crashes[job_seq], "worker": worker.wid,
+                                **({"id": job["id"]} if "id" in job else {}),
+                            }
+                        else:
+                            requeue.append(job_seq)
+                            self._stats["requeued"] += 1
+                    if respawns < self.max_respawns:
+                        respawns += 1
+                        self._stats["respawns"] += 1
+                        self._spawn(outbox)
+                if not self._workers:
+                    raise RuntimeError("All shard workers crashed and the respawn budget is spent")
+        finally:
+            self._stop()
+
+    def _steal(self, owner: Dict[int, int]):
+        """Move unstarted jobs from backlogged workers to idle ones."""
+        idle = [w for w in self._workers.values() if len(w.outstanding) < self.concurrency]
+        for thief in idle:
+            victim = max(self._workers.values(), key=lambda w: len(w.outstanding))
+            while (len(victim.outstanding) > self.concurrency
+                   and len(thief.outstanding) < self.concurrency):
+                try:
+                    item = victim.inbox.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    continue
+                job_seq, job = item
+                victim.outstanding.pop(job_seq, None)
+                thief.outstanding[job_seq] = job
+                owner[job_seq] = thief.wid
+                thief.inbox.put(item)
+                self._stats["steals"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(
+            self._stats,
+            workers=[
+                {"worker": w.wid, "pid": w.process.pid, "outstanding": len(w.outstanding),
+                 "completed": w.completed}
+                for w in self._workers.values()
+            ],
+        )
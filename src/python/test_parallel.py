@@ -6,8 +6,24 @@ Test: 3 instancias paralelas en modo background (v2 con mejor error handling)
 import asyncio
 import os
 import traceback
+from contextlib import asynccontextmanager
 from datetime import datetime
 from camoufox.async_api import AsyncCamoufox
+from display_manager import get_display_manager
+from profile_store import ProfileStore
+from wait_strategies import track_requests, wait_until_ready_async
+from screenshots import ScreenshotPipeline, DirectorySink
+from phash import PHASH_AVAILABLE
+
+# Esperas por condición en lugar de sleeps fijos (ver wait_strategies.py)
+TRAS_NAVEGAR = "load:domcontentloaded,network_quiet:500/2,dom_quiet:300"
+TRAS_ACCION = "dom_quiet:200"
+TRAS_SCROLL = "dom_quiet:300"
+
+
+async def listo(page, condiciones: str, timeout: int = 8000):
+    """Espera a que la página esté lista (tope: timeout ms)"""
+    return await wait_until_ready_async(page, condiciones, timeout=timeout)
 
 SCREENSHOTS_DIR = "/tmp/browser_parallel_test"
 os.makedirs(SCREENSHOTS_DIR, exist_ok=True)
@@ -21,14 +37,38 @@ for item in os.listdir(SCREENSHOTS_DIR):
         os.rmdir(path)
 
 
+# Captura en memoria; la codificacion y escritura a disco van en hilos aparte
+# para no frenar el siguiente paso de navegacion. Con NumPy y Pillow, los pasos
+# que no cambian la pantalla (hash perceptual) no se guardan de nuevo
+capturas = ScreenshotPipeline(
+    DirectorySink(SCREENSHOTS_DIR), format="jpeg", quality=85,
+    perceptual=PHASH_AVAILABLE, phash_threshold=0.03,
+)
+
+
+# Identidades pregeneradas (fingerprint + configuracion de lanzamiento) que se
+# reutilizan entre corridas: el arranque se salta la generacion del fingerprint
+perfiles = ProfileStore("~/.cache/camoufox/profiles.db", size=3)
+
+
+@asynccontextmanager
+async def navegador():
+    """Camoufox en background con una identidad del almacen de perfiles"""
+    with get_display_manager().lease() as display:
+        async with AsyncCamoufox(**perfiles.launch_kwargs(display, humanize=True)) as browser:
+            yield browser
+
+
 async def screenshot(page, instance_name: str, step: int, description: str):
     """Toma screenshot con nombre descriptivo"""
-    filename = f"{instance_name}/{step:02d}_{description}.png"
-    filepath = os.path.join(SCREENSHOTS_DIR, filename)
-    os.makedirs(os.path.dirname(filepath), exist_ok=True)
-    await page.screenshot(path=filepath)
-    print(f"    [{instance_name}] Captura: {step:02d}_{description}.png")
-    return filepath
+    info = await capturas.capture_async(
+        page, f"{instance_name}/{step:02d}_{description}", series=instance_name, details=True
+    )
+    if info["stored"]:
+        print(f"    [{instance_name}] Captura: {info['key']}")
+    else:
+        print(f"    [{instance_name}] Sin cambios visibles, igual a {info['key']}")
+    return os.path.join(SCREENSHOTS_DIR, info["key"])
 
 
 async def tarea_google_search():
@@ -37,38 +77,39 @@ async def tarea_google_search():
     print(f"\n[{name}] Iniciando...")
 
     try:
-        async with AsyncCamoufox(headless="virtual", humanize=True, i_know_what_im_doing=True) as browser:
+        async with navegador() as browser:
             page = await browser.new_page()
+            track_requests(page)
             page.set_default_timeout(30000)
 
             # Paso 1: Ir a Google
             print(f"  [{name}] Navegando a Google...")
             await page.goto("https://www.google.com", wait_until="domcontentloaded")
-            await asyncio.sleep(2)
+            await listo(page, TRAS_NAVEGAR)
             await screenshot(page, name, 1, "google_inicio")
 
             # Paso 2: Click en buscador
             print(f"  [{name}] Haciendo click en buscador...")
             await page.click('textarea[name="q"], input[name="q"]')
-            await asyncio.sleep(0.5)
+            await listo(page, TRAS_ACCION)
             await screenshot(page, name, 2, "click_buscador")
 
             # Paso 3: Escribir busqueda
             print(f"  [{name}] Escribiendo busqueda...")
             await page.fill('textarea[name="q"], input[name="q"]', "Claude AI Anthropic")
-            await asyncio.sleep(1)
+            await listo(page, TRAS_ACCION)
             await screenshot(page, name, 3, "texto_escrito")
 
             # Paso 4: Enter y resultados
             print(f"  [{name}] Presionando Enter...")
             await page.press('textarea[name="q"], input[name="q"]', "Enter")
-            await asyncio.sleep(3)
+            await listo(page, TRAS_NAVEGAR)
             await screenshot(page, name, 4, "resultados")
 
             # Paso 5: Scroll
             print(f"  [{name}] Haciendo scroll...")
             await page.evaluate("window.scrollTo(0, 500)")
-            await asyncio.sleep(1)
+            await listo(page, TRAS_SCROLL)
             await screenshot(page, name, 5, "scroll_resultados")
 
             print(f"[{name}] COMPLETADO!")
@@ -86,45 +127,46 @@ async def tarea_wikipedia_navegacion():
     print(f"\n[{name}] Iniciando...")
 
     try:
-        async with AsyncCamoufox(headless="virtual", humanize=True, i_know_what_im_doing=True) as browser:
+        async with navegador() as browser:
             page = await browser.new_page()
+            track_requests(page)
             page.set_default_timeout(30000)
 
             # Paso 1: Wikipedia
             print(f"  [{name}] Navegando a Wikipedia...")
             await page.goto("https://es.wikipedia.org", wait_until="domcontentloaded")
-            await asyncio.sleep(2)
+            await listo(page, TRAS_NAVEGAR)
             await screenshot(page, name, 1, "wikipedia_inicio")
 
             # Paso 2: Click buscador
             print(f"  [{name}] Click en buscador...")
             await page.click('#searchInput')
-            await asyncio.sleep(0.5)
+            await listo(page, TRAS_ACCION)
             await screenshot(page, name, 2, "click_buscador")
 
             # Paso 3: Escribir
             print(f"  [{name}] Escribiendo busqueda...")
             await page.fill('#searchInput', "Inteligencia artificial")
-            await asyncio.sleep(1)
+            await listo(page, TRAS_ACCION)
             await screenshot(page, name, 3, "texto_busqueda")
 
             # Paso 4: Buscar
             print(f"  [{name}] Presionando Enter...")
             await page.press('#searchInput', "Enter")
-            await asyncio.sleep(3)
+            await listo(page, TRAS_NAVEGAR)
             await screenshot(page, name, 4, "articulo_ia")
 
             # Paso 5: Scroll
             print(f"  [{name}] Haciendo scroll...")
             await page.evaluate("window.scrollTo(0, 600)")
-            await asyncio.sleep(1)
+            await listo(page, TRAS_SCROLL)
             await screenshot(page, name, 5, "scroll_contenido")
 
             # Paso 6: Click en enlace
             print(f"  [{name}] Buscando enlace relacionado...")
             try:
                 await page.click('a[href*="/wiki/Aprendizaje_autom"]', timeout=5000)
-                await asyncio.sleep(3)
+                await listo(page, TRAS_NAVEGAR)
                 await screenshot(page, name, 6, "articulo_ml")
             except:
                 await screenshot(page, name, 6, "sin_enlace_ml")
@@ -144,39 +186,40 @@ async def tarea_github_exploracion():
     print(f"\n[{name}] Iniciando...")
 
     try:
-        async with AsyncCamoufox(headless="virtual", humanize=True, i_know_what_im_doing=True) as browser:
+        async with navegador() as browser:
             page = await browser.new_page()
+            track_requests(page)
             page.set_default_timeout(30000)
 
             # Paso 1: GitHub Explore
             print(f"  [{name}] Navegando a GitHub Explore...")
             await page.goto("https://github.com/explore", wait_until="domcontentloaded")
-            await asyncio.sleep(3)
+            await listo(page, TRAS_NAVEGAR)
             await screenshot(page, name, 1, "github_explore")
 
             # Paso 2: Scroll
             print(f"  [{name}] Haciendo scroll...")
             await page.evaluate("window.scrollTo(0, 400)")
-            await asyncio.sleep(1)
+            await listo(page, TRAS_SCROLL)
             await screenshot(page, name, 2, "scroll_explore")
 
             # Paso 3: Ir a Trending
             print(f"  [{name}] Navegando a Trending...")
             await page.goto("https://github.com/trending", wait_until="domcontentloaded")
-            await asyncio.sleep(3)
+            await listo(page, TRAS_NAVEGAR)
             await screenshot(page, name, 3, "github_trending")
 
             # Paso 4: Scroll en trending
             print(f"  [{name}] Scroll en trending...")
             await page.evaluate("window.scrollTo(0, 500)")
-            await asyncio.sleep(1)
+            await listo(page, TRAS_SCROLL)
             await screenshot(page, name, 4, "trending_scroll")
 
             # Paso 5: Click en repo
             print(f"  [{name}] Intentando click en repositorio...")
             try:
                 await page.click('article h2 a', timeout=5000)
-                await asyncio.sleep(3)
+                await listo(page, TRAS_NAVEGAR)
                 await screenshot(page, name, 5, "repo_detalle")
             except:
                 await screenshot(page, name, 5, "lista_repos")
@@ -211,6 +254,10 @@ async def main():
 
     elapsed = (datetime.now() - start_time).total_seconds()
 
+    # Esperar las escrituras pendientes antes de listar la carpeta
+    capturas.close()
+    estadisticas = capturas.stats()
+
     # Mostrar resultados
     print(f"\n{'='*70}")
     print("CAPTURAS TOMADAS:")
@@ -220,7 +267,7 @@ async def main():
     for task_dir in sorted(os.listdir(SCREENSHOTS_DIR)):
         task_path = os.path.join(SCREENSHOTS_DIR, task_dir)
         if os.path.isdir(task_path):
-            files = sorted([f for f in os.listdir(task_path) if f.endswith('.png')])
+            files = sorted([f for f in os.listdir(task_path) if f.endswith('.jpg')])
             total_screenshots += len(files)
             print(f"\n{task_dir}/ ({len(files)} capturas)")
             for f in files:
@@ -232,6 +279,7 @@ async def main():
     print(f"Tiempo total: {elapsed:.1f} segundos")
     print(f"Instancias paralelas: 3")
     print(f"Total screenshots: {total_screenshots}")
+    print(f"Capturas sin cambios (no guardadas): {estadisticas['duplicates'] + estadisticas['similar']}")
     print(f"Carpeta: {SCREENSHOTS_DIR}")
     print(f"\n*** NINGUNA VENTANA FUE VISIBLE ***")
     print("="*70)
@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+Page Readiness Conditions
+=========================
+Pluggable wait engine that replaces fixed sleeps and blanket
+wait_until="networkidle". Conditions are checked in order under one
+shared upper-bound timeout, so each step waits only as long as the page
+actually needs.
+
+Conditions:
+  SelectorReady(".poly-card")        element attached/visible
+  DomQuiet(300)                      no DOM mutation for 300 ms
+  NetworkQuiet(500, max_inflight=2)  <= 2 requests in flight for 500 ms
+  JsPredicate("() => window.ready")  custom JS predicate is truthy
+  LoadState("load")                  Playwright load state reached
+  Delay(500)                         fixed wait (explicit opt-in only)
+
+Usage:
+  from wait_strategies import wait_until_ready, DomQuiet, SelectorReady
+
+  page.goto(url, wait_until="domcontentloaded")
+  wait_until_ready(page, [SelectorReady(".poly-card"), DomQuiet(300)], timeout=5000)
+
+  # Same conditions from strings/dicts (MCP tools, job specs)
+  await wait_until_ready_async(page, "selector:#results,dom_quiet:300")
+"""
+
+import asyncio
+import time
+import weakref
+from typing import Any, Dict, List, Optional, Union
+
+from playwright.sync_api import Error as PlaywrightError, TimeoutError as PlaywrightTimeoutError
+
+# Evaluated in Camoufox's isolated world, so page scripts never see it.
+_DOM_QUIET_INSTALL = """() => {
+    if (window.__cfQuiet) return;
+    const state = window.__cfQuiet = {last: performance.now()};
+    new MutationObserver(() => { state.last = performance.now(); }).observe(
+        document.documentElement || document,
+        {subtree: true, childList: true, attributes: true, characterData: true}
+    );
+}"""
+
+_DOM_QUIET_CHECK = """(ms) => !!window.__cfQuiet && performance.now() - window.__cfQuiet.last >= ms"""
+
+
+class RequestTracker:
+    """Counts in-flight requests of a page from Playwright events."""
+
+    def __init__(self):
+        self.inflight = 0
+        self.total = 0
+        self.created = time.monotonic()
+        # level -> last time the in-flight count dropped below it
+        self._left_level: Dict[int, float] = {}
+
+    def _started(self, request: Any):
+        self.inflight += 1
+        self.total += 1
+
+    def _finished(self, request: Any):
+        if self.inflight:
+            self._left_level[self.inflight] = time.monotonic()
+            self.inflight -= 1
+
+    def quiet_since(self, max_inflight: int) -> Optional[float]:
+        """
+        Monotonic time since which at most max_inflight requests have been
+        in flight, or None while more are.
+        """
+        if self.inflight > max_inflight:
+            return None
+        # Dropping from any higher level passes through max_inflight + 1 last
+        return self._left_level.get(max_inflight + 1, self.created)
+
+
+_trackers: "weakref.WeakKeyDictionary[Any, RequestTracker]" = weakref.WeakKeyDictionary()
+
+
+def track_requests(page: Any) -> RequestTracker:
+    """
+    Attach (once) a RequestTracker to a page. Call before navigating so
+    NetworkQuiet sees requests that start during the load.
+    """
+    tracker = _trackers.get(page)
+    if tracker is None:
+        tracker = _trackers[page] = RequestTracker()
+        page.on("request", tracker._started)
+        page.on("requestfinished", tracker._finished)
+        page.on("requestfailed", tracker._finished)
+    return tracker
+
+
+class Condition:
+    """A readiness condition; timeouts are in milliseconds."""
+
+    name = "condition"
+
+    def wait(self, page: Any, timeout: float):
+        raise NotImplementedError
+
+    async def wait_async(self, page: Any, timeout: float):
+        raise NotImplementedError
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.describe()})"
+
+    def describe(self) -> str:
+        return ""
+
+
+class SelectorReady(Condition):
+    name = "selector"
+
+    def __init__(self, selector: str, state: str = "visible"):
+        self.selector = selector
+        self.state = state
+
+    def wait(self, page: Any, timeout: float):
+        page.wait_for_selector(self.selector, state=self.state, timeout=timeout)
+
+    async def wait_async(self, page: Any, timeout: float):
+        await page.wait_for_selector(self.selector, state=self.state, timeout=timeout)
+
+    def describe(self) -> str:
+        return f"{self.selector!r}, state={self.state!r}"
+
+
+class DomQuiet(Condition):
+    """
+    No DOM mutations (MutationObserver) for quiet_ms. When the document is
+    replaced mid-wait (client-side redirect), the observer is installed
+    again on the new one; the condition fails only when timeout runs out.
+    """
+
+    name = "dom_quiet"
+
+    def __init__(self, quiet_ms: int = 300, polling: int = 50):
+        self.quiet_ms = quiet_ms
+        self.polling = polling
+
+    def _remaining(self, page: Any, deadline: float, error: PlaywrightError) -> float:
+        """Milliseconds left to retry after error; raises when there is no retrying."""
+        if isinstance(error, PlaywrightTimeoutError) or page.is_closed():
+            raise error
+        remaining = (deadline - time.monotonic()) * 1000
+        if remaining <= self.polling:
+            raise PlaywrightTimeoutError(f"DomQuiet: {str(error).splitlines()[0]}")
+        return remaining
+
+    def wait(self, page: Any, timeout: float):
+        deadline = time.monotonic() + timeout / 1000
+        while True:
+            try:
+                page.evaluate(_DOM_QUIET_INSTALL)
+                page.wait_for_function(
+                    _DOM_QUIET_CHECK, arg=self.quiet_ms, polling=self.polling, timeout=timeout
+                )
+                return
+            except PlaywrightError as e:
+                # e.g. "Execution context was destroyed": wait for the next document
+                timeout = self._remaining(page, deadline, e) - self.polling
+                page.wait_for_timeout(self.polling)
+
+    async def wait_async(self, page: Any, timeout: float):
+        deadline = time.monotonic() + timeout / 1000
+        while True:
+            try:
+                await page.evaluate(_DOM_QUIET_INSTALL)
+                await page.wait_for_function(
+                    _DOM_QUIET_CHECK, arg=self.quiet_ms, polling=self.polling, timeout=timeout
+                )
+                return
+            except PlaywrightError as e:
+                timeout = self._remaining(page, deadline, e) - self.polling
+                await asyncio.sleep(self.polling / 1000)
+
+    def describe(self) -> str:
+        return str(self.quiet_ms)
+
+
+class NetworkQuiet(Condition):
+    """At most max_inflight requests pending for quiet_ms."""
+
+    name = "network_quiet"
+
+    def __init__(self, quiet_ms: int = 500, max_inflight: int = 0, polling: int = 50):
+        self.quiet_ms = quiet_ms
+        self.max_inflight = max_inflight
+        self.polling = polling
+
+    def _poll(self, page: Any, timeout: float):
+        """Generator of poll intervals; returns when quiet, raises on timeout."""
+        tracker = track_requests(page)
+        deadline = time.monotonic() + timeout / 1000
+        while True:
+            now = time.monotonic()
+            since = tracker.quiet_since(self.max_inflight)
+            if since is not None and (now - since) * 1000 >= self.quiet_ms:
+                return
+            if now >= deadline:
+                raise PlaywrightTimeoutError(
+                    f"NetworkQuiet: {tracker.inflight} requests still in flight after {timeout:.0f}ms"
+                )
+            yield self.polling
+
+    def wait(self, page: Any, timeout: float):
+        for interval in self._poll(page, timeout):
+            page.wait_for_timeout(interval)  # pumps Playwright events
+
+    async def wait_async(self, page: Any, timeout: float):
+        for interval in self._poll(page, timeout):
+            await asyncio.sleep(interval / 1000)
+
+    def describe(self) -> str:
+        return f"{self.quiet_ms}, max_inflight={self.max_inflight}"
+
+
+class JsPredicate(Condition):
+    """JS expression or function (optionally taking arg) that must become truthy."""
+
+    name = "js"
+
+    def __init__(self, expression: str, arg: Any = None, polling: Union[int, str] = "raf"):
+        self.expression = expression
+        self.arg = arg
+        self.polling = polling
+
+    def wait(self, page: Any, timeout: float):
+        page.wait_for_function(self.expression, arg=self.arg, polling=self.polling, timeout=timeout)
+
+    async def wait_async(self, page: Any, timeout: float):
+        await page.wait_for_function(self.expression, arg=self.arg, polling=self.polling, timeout=timeout)
+
+    def describe(self) -> str:
+        return repr(self.expression[:40])
+
+
+class LoadState(Condition):
+    name = "load"
+
+    def __init__(self, state: str = "load"):
+        self.state = state
+
+    def wait(self, page: Any, timeout: float):
+        page.wait_for_load_state(self.state, timeout=timeout)
+
+    async def wait_async(self, page: Any, timeout: float):
+        await page.wait_for_load_state(self.state, timeout=timeout)
+
+    def describe(self) -> str:
+        return repr(self.state)
+
+
+class Delay(Condition):
+    """Fixed wait, capped by the remaining timeout."""
+
+    name = "sleep"
+
+    def __init__(self, ms: int):
+        self.ms = ms
+
+    def wait(self, page: Any, timeout: float):
+        page.wait_for_timeout(min(self.ms, timeout))
+
+    async def wait_async(self, page: Any, timeout: float):
+        await asyncio.sleep(min(self.ms, timeout) / 1000)
+
+    def describe(self) -> str:
+        return str(self.ms)
+
+
+DEFAULT_READY = (NetworkQuiet(500, max_inflight=2), DomQuiet(300))
+
+
+def _parse_one(spec: Any) -> Condition:
+    if isinstance(spec, Condition):
+        return spec
+    if isinstance(spec, str):
+        name, _, value = spec.partition(":")
+        name, value = name.strip(), value.strip()
+        if name == "selector":
+            return SelectorReady(value)
+        if name == "dom_quiet":
+            return DomQuiet(int(value or 300))
+        if name == "network_quiet":
+            quiet, _, inflight = value.partition("/")
+            return NetworkQuiet(int(quiet or 500), max_inflight=int(inflight or 0))
+        if name == "js":
+            return JsPredicate(value)
+        if name == "load":
+            return LoadState(value or "load")
+        if name == "sleep":
+            return Delay(int(value))
+    elif isinstance(spec, dict):
+        if "selector" in spec:
+            return SelectorReady(spec["selector"], spec.get("state", "visible"))
+        if "dom_quiet" in spec:
+            return DomQuiet(int(spec["dom_quiet"]))
+        if "network_quiet" in spec:
+            return NetworkQuiet(int(spec["network_quiet"]), max_inflight=int(spec.get("max_inflight", 0)))
+        if "js" in spec:
+            return JsPredicate(spec["js"], spec.get("arg"))
+        if "load" in spec:
+            return LoadState(spec["load"])
+        if "sleep" in spec:
+            return Delay(int(spec["sleep"]))
+    raise ValueError(f"Unknown wait condition: {spec!r}")
+
+
+def parse_conditions(spec: Any) -> List[Condition]:
+    """
+    Normalize a Condition, a dict, a "name:value" string, a comma separated
+    string of them or an iterable of any of these into a list of Conditions.
+    In a comma separated string, "js:" must come last: everything after it
+    is taken as the expression.
+    """
+    if not spec:
+        return []
+    if isinstance(spec, str):
+        head, js = spec, None
+        if spec.startswith("js:"):
+            head, js = "", spec
+        elif ",js:" in spec:
+            head, _, js = spec.partition(",js:")
+            js = "js:" + js
+        conditions = [_parse_one(part) for part in head.split(",") if part.strip()]
+        return conditions + ([_parse_one(js)] if js else [])
+    if isinstance(spec, (Condition, dict)):
+        return [_parse_one(spec)]
+    return [c for part in spec for c in parse_conditions(part)]
+
+
+def _report(started: float, failed: Optional[Condition], error: Optional[str]) -> Dict[str, Any]:
+    return {
+        "ready": failed is None,
+        "elapsed_ms": round((time.monotonic() - started) * 1000),
+        "timed_out": failed.name if failed else None,
+        "error": error,
+    }
+
+
+def wait_until_ready(
+    page: Any,
+    conditions: Any = DEFAULT_READY,
+    timeout: float = 10000,
+    raise_on_timeout: bool = False,
+) -> Dict[str, Any]:
+    """
+    Wait until every condition holds (checked in order) or timeout ms pass.
+
+    Returns:
+        Dict with: ready, elapsed_ms, timed_out (condition name), error
+    """
+    started = time.monotonic()
+    for condition in parse_conditions(conditions):
+        remaining = timeout - (time.monotonic() - started) * 1000
+        try:
+            if remaining <= 0:
+                raise PlaywrightTimeoutError(f"{condition!r}: no time left")
+            condition.wait(page, remaining)
+        except PlaywrightTimeoutError as e:
+            if raise_on_timeout:
+                raise
+            return _report(started, condition, str(e).splitlines()[0])
+    return _report(started, None, None)
+
+
+async def wait_until_ready_async(
+    page: Any,
+    conditions: Any = DEFAULT_READY,
+    timeout: float = 10000,
+    raise_on_timeout: bool = False,
+) -> Dict[str, Any]:
+    """Async version of wait_until_ready()."""
+    started = time.monotonic()
+    for condition in parse_conditions(conditions):
+        remaining = timeout - (time.monotonic() - started) * 1000
+        try:
+            if remaining <= 0:
+                raise PlaywrightTimeoutError(f"{condition!r}: no time left")
+            await condition.wait_async(page, remaining)
+        except PlaywrightTimeoutError as e:
+            if raise_on_timeout:
+                raise
+            return _report(started, condition, str(e).splitlines()[0])
+    return _report(started, None, None)
@@ -0,0 +1,8 @@
+"""Tests unitarios: importan los módulos planos de src/python y benchmarks."""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src", "python"))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
@@ -0,0 +1,54 @@
+"""Tests de benchmarks/bench.py: percentiles, resúmenes y comparación de reportes."""
+
+import os
+
+import pytest
+
+_rate = os.environ.get("CAMOUFOX_RATE")
+import bench  # noqa: E402  (fija CAMOUFOX_RATE=0 al importarse)
+
+if _rate is None:
+    os.environ.pop("CAMOUFOX_RATE", None)
+else:
+    os.environ["CAMOUFOX_RATE"] = _rate
+
+
+def test_percentile_interpolates():
+    values = [10.0, 20.0, 30.0, 40.0]
+    assert bench.percentile(values, 0) == 10.0
+    assert bench.percentile(values, 50) == 25.0
+    assert bench.percentile(values, 100) == 40.0
+    assert bench.percentile([7.0], 99) == 7.0
+    assert bench.percentile(list(range(101)), 95) == pytest.approx(95.0)
+
+
+def test_summarize_skips_missing_samples():
+    summary = bench.summarize([None, 1.0, 2.0, 3.0])
+    assert summary == {"p50": 2.0, "p95": 2.9, "p99": 3.0, "mean": 2.0, "max": 3.0, "n": 3}
+    assert bench.summarize([None]) is None
+
+
+def _report(p95, pages_per_s, rss=500.0):
+    return {"results": {"browse_async": {"c4": {
+        "latency_ms": {"p50": 100.0, "p95": p95, "n": 48},
+        "pages_per_s": pages_per_s, "wall_s": 10.0, "rss_mb_per_browser": rss,
+    }}}}
+
+
+def test_compare_flags_regressions_and_improvements():
+    changes = bench.compare(_report(200.0, 10.0), _report(260.0, 12.0, rss=505.0), threshold=0.10)
+    assert [(c["metric"], c["regression"]) for c in changes] == [
+        ("browse_async.c4.latency_ms.p95", True),
+        ("browse_async.c4.pages_per_s", False),
+    ]
+    assert changes[0]["change"] == 0.3
+
+
+def test_compare_ignores_non_comparable_and_new_metrics():
+    before = _report(200.0, 10.0)
+    after = _report(200.0, 5.0)
+    after["results"]["browse_async"]["c4"]["wall_s"] = 99.0
+    after["results"]["launch"] = {"launch_ms": {"p50": 1.0}}
+    changes = bench.compare(before, after)
+    assert [c["metric"] for c in changes] == ["browse_async.c4.pages_per_s"]
+    assert changes[0]["regression"] is True
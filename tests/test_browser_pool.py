@@ -0,0 +1,71 @@
+"""Tests de browser_pool.py: el arranque de Xvfb no bloquea el event loop."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("camoufox")
+import browser_pool  # noqa: E402
+from browser_pool import AsyncBrowserPool  # noqa: E402
+
+
+class SlowDisplays:
+    """Gestor de displays cuyo acquire() tarda como un Xvfb que arranca."""
+
+    def __init__(self):
+        self.threads = []
+        self.released = []
+
+    def acquire(self):
+        self.threads.append(threading.current_thread())
+        time.sleep(0.2)
+        return ":99"
+
+    def release(self, display):
+        self.released.append(display)
+
+
+@pytest.fixture
+def displays(monkeypatch):
+    manager = SlowDisplays()
+    monkeypatch.setattr(browser_pool, "get_display_manager", lambda: manager)
+    return manager
+
+
+def test_display_lease_runs_off_the_event_loop(displays):
+    pool = AsyncBrowserPool(min_size=0, profiles=object())
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.ensure_future(ticker())
+        display = await pool._lease_display_async()
+        task.cancel()
+        return display, ticks
+
+    display, ticks = asyncio.run(run())
+    assert display == ":99" and ticks >= 5
+    assert displays.threads[0] is not threading.main_thread()
+
+
+def test_cancelled_lease_is_given_back(displays):
+    pool = AsyncBrowserPool(min_size=0, profiles=object())
+
+    async def run():
+        lease = asyncio.ensure_future(pool._lease_display_async())
+        await asyncio.sleep(0.05)
+        lease.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await lease
+        await asyncio.sleep(0.3)
+
+    asyncio.run(run())
+    assert displays.released == [":99"]
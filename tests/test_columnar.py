@@ -0,0 +1,118 @@
+"""Tests de columnar.py y de la escritura de resultados del CLI."""
+
+import json
+
+import pytest
+
+from columnar import ARROW_AVAILABLE, ColumnBatch, JsonLinesWriter, open_writer
+
+
+def test_batch_from_rows_fills_missing_fields():
+    batch = ColumnBatch.from_rows([{"a": 1}, {"b": 2, "a": 3}])
+    assert batch.names == ["a", "b"]
+    assert batch.columns == {"a": [1, 3], "b": [None, 2]}
+    assert list(batch.rows()) == [{"a": 1, "b": None}, {"a": 3, "b": 2}]
+
+
+def test_batch_rejects_ragged_columns():
+    with pytest.raises(ValueError):
+        ColumnBatch({"a": [1, 2], "b": [1]})
+    assert len(ColumnBatch({})) == 0
+
+
+def test_with_constant_and_from_extracted():
+    columns = {"title": ["x", "y"]}
+    batch = ColumnBatch.from_extracted({"columns": columns})
+    assert batch.columns is columns
+    assert batch.with_constant("url", "u").columns == {"title": ["x", "y"], "url": ["u", "u"]}
+
+
+def test_jsonl_writer_streams_in_batches(tmp_path):
+    path = tmp_path / "out.jsonl"
+    with JsonLinesWriter(str(path)) as writer:
+        assert writer.write_rows(({"n": i, "s": "ñ"} for i in range(5)), batch_size=2) == 5
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["n"] for line in lines] == list(range(5))
+    assert lines[0] == '{"n":0,"s":"ñ"}'
+
+
+def test_open_writer_validates_format(tmp_path):
+    with pytest.raises(ValueError):
+        open_writer("csv", str(tmp_path / "x"))
+    with pytest.raises(ValueError):
+        open_writer("parquet", "-")
+
+
+@pytest.mark.skipif(not ARROW_AVAILABLE, reason="pyarrow no instalado")
+def test_parquet_schema_fixed_by_first_batch(tmp_path):
+    import pyarrow.parquet as pq
+
+    path = str(tmp_path / "out.parquet")
+    with open_writer("parquet", path) as writer:
+        writer.write_batch(ColumnBatch({"a": [1], "b": [None]}))
+        writer.write_batch(ColumnBatch({"a": [2], "b": ["x"]}))
+        # Columnas nuevas o tipos que no encajan fallan en vez de perderse
+        with pytest.raises(ValueError, match="c"):
+            writer.write_batch(ColumnBatch({"a": [3], "c": ["y"]}))
+        with pytest.raises(ValueError, match="'a'"):
+            writer.write_batch(ColumnBatch({"a": ["tres"]}))
+    assert pq.read_table(path).to_pydict() == {"a": [1, 2], "b": [None, "x"]}
+
+
+@pytest.mark.skipif(not ARROW_AVAILABLE, reason="pyarrow no instalado")
+def test_arrow_declared_schema(tmp_path):
+    import pyarrow.ipc as ipc
+
+    path = str(tmp_path / "out.arrow")
+    with open_writer("arrow", path, schema={"title": "string", "status": "int64", "tags": "list<string>"}) as writer:
+        writer.write_batch(ColumnBatch({"title": ["a"], "status": [None]}))
+        writer.write_batch(ColumnBatch({"title": ["b"], "status": [200], "tags": [["x", "y"]]}))
+    table = ipc.open_stream(path).read_all()
+    assert table.to_pydict() == {"title": ["a", "b"], "status": [None, 200], "tags": [None, ["x", "y"]]}
+
+
+def test_schema_column_types():
+    from extraction import Schema
+
+    schema = Schema({"fields": {
+        "name": "h2", "price": {"selector": ".p", "transform": ["digits", "int"]},
+        "rating": {"selector": ".r", "transform": "float"}, "imgs": {"selector": "img", "attr": "src", "all": True},
+        "stock": {"selector": ".s", "js": "(v, el) => el.dataset.n > 0", "type": "bool"},
+    }})
+    assert schema.column_types() == {
+        "name": "string", "price": "int64", "rating": "double", "imgs": "list<string>", "stock": "bool",
+    }
+
+
+@pytest.mark.skipif(not ARROW_AVAILABLE, reason="pyarrow no instalado")
+def test_flat_results_fit_declared_columns(tmp_path):
+    pytest.importorskip("camoufox")
+    import pyarrow.parquet as pq
+    from camoufox_browser import _output_schema, _write_results
+
+    results = [
+        {"url": "https://a.test/", "success": False, "error": "timeout", "title": None},
+        {"url": "https://b.test/", "success": True, "status": 200, "title": "B", "id": 7,
+         "network": {"requests": 3}, "action_result": 42},
+    ]
+    path = str(tmp_path / "out.parquet")
+    with open_writer("parquet", path, _output_schema(None)) as writer:
+        assert _write_results(writer, iter(results), None, flat=True) == 1
+    table = pq.read_table(path).to_pydict()
+    assert table["status"] == [None, 200] and table["id"] == [None, "7"]
+    assert table["network"] == [None, '{"requests": 3}'] and table["action_result"] == [None, "42"]
+
+
+def test_write_results_counts_failures_without_schema(tmp_path):
+    pytest.importorskip("camoufox")
+    from camoufox_browser import _write_results
+
+    results = [
+        {"url": "https://a.test/", "success": True, "title": "A"},
+        {"url": "https://b.test/", "success": False, "error": "timeout"},
+        {"url": "https://c.test/", "success": False, "error": "403"},
+    ]
+    path = tmp_path / "out.jsonl"
+    with JsonLinesWriter(str(path)) as writer:
+        assert _write_results(writer, iter(results), None, flat=False) == 2
+    assert len(path.read_text().splitlines()) == 3
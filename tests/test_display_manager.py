@@ -0,0 +1,77 @@
+"""Tests de display_manager.py con un Xvfb falso: conteo de referencias y shards."""
+
+import sys
+import types
+
+import pytest
+
+from display_manager import DisplayManager
+
+
+class FakeDisplay:
+    started = []
+
+    def __init__(self, visible, size, manage_global_env):
+        self.new_display_var = f":{100 + len(FakeDisplay.started)}"
+        self.alive = False
+        self.pid = 4242
+
+    def start(self):
+        self.alive = True
+        FakeDisplay.started.append(self)
+
+    def stop(self):
+        self.alive = False
+
+    def is_alive(self):
+        return self.alive
+
+
+@pytest.fixture(autouse=True)
+def fake_xvfb(monkeypatch):
+    FakeDisplay.started = []
+    monkeypatch.setitem(sys.modules, "pyvirtualdisplay", types.SimpleNamespace(Display=FakeDisplay))
+
+
+def test_displays_are_shared_and_stop_with_last_user():
+    manager = DisplayManager(shards=1)
+    a, b = manager.acquire(), manager.acquire()
+    assert a == b == ":100"
+    assert manager.health()["displays"][0]["users"] == 2
+    manager.release(a)
+    assert FakeDisplay.started[0].alive
+    manager.release(b)
+    assert not FakeDisplay.started[0].alive
+    assert manager.health()["displays"] == []
+    manager.release(None)
+
+
+def test_new_shard_after_users_per_display():
+    manager = DisplayManager(shards=2, users_per_display=2)
+    leases = [manager.acquire() for _ in range(5)]
+    assert leases[:2] == [":100", ":100"]
+    assert leases[2] == ":101"
+    # Con todos los shards en marcha se reparte al menos cargado
+    assert sorted(d["users"] for d in manager.health()["displays"]) == [2, 3]
+    assert manager.health()["started"] == 2
+
+
+def test_dead_display_is_replaced():
+    manager = DisplayManager()
+    with manager.lease() as display:
+        FakeDisplay.started[0].alive = False
+        assert manager.acquire() != display
+        assert manager.health()["restarted"] == 1
+
+
+def test_lease_releases_on_error_and_stop_all():
+    manager = DisplayManager()
+    with pytest.raises(RuntimeError):
+        with manager.lease():
+            raise RuntimeError("boom")
+    assert manager.health()["displays"] == []
+    manager.acquire()
+    manager.stop_all()
+    assert not FakeDisplay.started[-1].alive
+    with pytest.raises(ValueError):
+        DisplayManager(shards=0)
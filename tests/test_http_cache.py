@@ -0,0 +1,100 @@
+"""Tests de http_cache.py: redirecciones, fallos de red y el manejador async."""
+
+import asyncio
+
+from http_cache import HttpCache
+
+
+class Request:
+    method = "GET"
+    resource_type = "document"
+
+    def __init__(self, url):
+        self.url = url
+        self.headers = {}
+
+
+class Response:
+    def __init__(self, status, headers, body=b""):
+        self.status, self.headers, self._body = status, headers, body
+
+    def body(self):
+        return self._body
+
+
+class Route:
+    def __init__(self, url, response=None, error=None):
+        self.request = Request(url)
+        self.response, self.error = response, error
+        self.fetched = self.fulfilled = self.aborted = None
+
+    def fetch(self, **kwargs):
+        self.fetched = kwargs
+        if self.error:
+            raise self.error
+        return self.response
+
+    def fulfill(self, **kwargs):
+        self.fulfilled = kwargs
+
+    def abort(self, code):
+        self.aborted = code
+
+
+class AsyncResponse(Response):
+    async def body(self):
+        return self._body
+
+
+class AsyncRoute(Route):
+    async def fetch(self, **kwargs):
+        return Route.fetch(self, **kwargs)
+
+    async def fulfill(self, **kwargs):
+        Route.fulfill(self, **kwargs)
+
+    async def abort(self, code):
+        Route.abort(self, code)
+
+
+FRESH = {"cache-control": "max-age=600", "content-type": "text/html"}
+
+
+def test_redirect_passed_on_and_not_cached(tmp_path):
+    cache = HttpCache(str(tmp_path))
+    session = cache.session()
+    route = Route("https://s.test/old", Response(301, dict(FRESH, location="https://s.test/new")))
+    session._handle(route)
+    assert route.fetched["max_redirects"] == 0
+    assert route.fulfilled["response"].status == 301
+    assert cache.lookup("https://s.test/old", {}) is None
+    assert session.stats()["misses"] == 1
+
+
+def test_fetch_failure_aborts_route(tmp_path):
+    session = HttpCache(str(tmp_path)).session()
+    route = Route("https://s.test/", error=RuntimeError("net::ERR_PROXY"))
+    session._handle(route)
+    assert route.aborted == "failed" and route.fulfilled is None
+    assert session.stats()["failed"] == 1
+
+
+def test_async_handler_stores_then_hits(tmp_path):
+    cache = HttpCache(str(tmp_path))
+    session = cache.session()
+
+    async def run():
+        first = AsyncRoute("https://s.test/a.css", AsyncResponse(200, FRESH, b"body{}"))
+        await session._handle_async(first)
+        second = AsyncRoute("https://s.test/a.css")
+        await session._handle_async(second)
+        failing = AsyncRoute("https://s.test/b.css", error=RuntimeError("boom"))
+        await session._handle_async(failing)
+        return second, failing
+
+    second, failing = asyncio.run(run())
+    assert second.fetched is None and second.fulfilled["body"] == b"body{}"
+    assert failing.aborted == "failed"
+    stats = session.stats()
+    assert (stats["hits"], stats["misses"], stats["stored"], stats["failed"]) == (1, 1, 1, 1)
+    cache.close()
@@ -0,0 +1,113 @@
+"""Tests de job_queue.py: estados, reintentos con backoff, idempotencia y recuperación."""
+
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+from job_queue import JobQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    q = JobQueue(str(tmp_path / "crawl.db"), max_attempts=2, backoff_s=0.0)
+    yield q
+    q.close()
+
+
+def _dead_pid() -> int:
+    proc = subprocess.Popen([sys.executable, "-c", "pass"])
+    proc.wait()
+    return proc.pid
+
+
+def _crash(queue: JobQueue, job_id: int):
+    """Simula un claim de un proceso local que murió a mitad del job."""
+    owner = f"{socket.gethostname()}:{_dead_pid()}"
+    queue._transaction(lambda db: db.execute("UPDATE jobs SET owner = ? WHERE id = ?", (owner, job_id)))
+
+
+def test_enqueue_is_idempotent_per_key(queue):
+    assert queue.enqueue(["https://a.test/", "https://b.test/"]) == 2
+    assert queue.enqueue(["https://a.test/", {"url": "https://c.test/", "id": "c"}]) == 1
+    assert queue.enqueue([{"url": "https://other.test/", "id": "c"}]) == 0
+    assert queue.counts()["pending"] == 3
+
+
+def test_claim_complete_keeps_first_result(queue):
+    queue.enqueue(["https://a.test/"])
+    (job,) = queue.claim(5)
+    assert job.attempts == 1 and job.payload == {"url": "https://a.test/"}
+    assert queue.claim(5) == []
+    assert queue.complete(job.id, {"n": 1}, job.token) is True
+    assert queue.complete(job.id, {"n": 2}, job.token) is False
+    assert list(queue.results()) == [{"n": 1}]
+    assert queue.counts()["done"] == 1
+
+
+def test_fail_backs_off_then_fails_after_max_attempts(tmp_path):
+    queue = JobQueue(str(tmp_path / "q.db"), max_attempts=2, backoff_s=60.0)
+    queue.enqueue(["https://a.test/"])
+    (job,) = queue.claim()
+    assert queue.fail(job.id, "boom", job.token) == "pending"
+    assert queue.claim() == []                    # esperando el backoff
+    assert 59 < queue.next_ready_in() <= 60
+    queue._transaction(lambda db: db.execute("UPDATE jobs SET not_before = 0"))
+    (job,) = queue.claim()
+    assert job.attempts == 2
+    assert queue.fail(job.id, "boom", job.token, {"success": False}) == "failed"
+    assert queue.next_ready_in() is None
+    assert list(queue.results("failed")) == [{"success": False}]
+    assert queue.retry_failed() == 1
+    assert queue.claim()[0].attempts == 1
+
+
+def test_stale_token_changes_nothing(queue):
+    queue.enqueue(["https://a.test/"])
+    (job,) = queue.claim(lease_s=0)
+    time.sleep(0.01)
+    (again,) = queue.claim()                      # lease vencido: otro claim
+    assert queue.fail(job.id, "late", job.token) == "leased"
+    assert queue.fail(again.id, "boom", again.token) == "failed"
+
+
+def test_release_refunds_attempt(queue):
+    queue.enqueue(["https://a.test/"])
+    (job,) = queue.claim()
+    queue.release(job.id, job.token)
+    assert queue.claim()[0].attempts == 1
+
+
+def test_recover_counts_crashed_attempts(queue):
+    queue.enqueue(["https://crash.test/"])
+    states = []
+    for _ in range(4):
+        taken = queue.claim()
+        if not taken:
+            break
+        _crash(queue, taken[0].id)
+        assert queue.recover() == 1
+        states.append(queue.counts())
+    assert states[0]["pending"] == 1
+    assert states[-1]["failed"] == 1
+    assert len(states) == 2                       # max_attempts=2: no se vuelve a reclamar
+    assert queue.claim() == []
+
+
+def test_expired_lease_on_last_attempt_fails(queue):
+    queue.enqueue(["https://crash.test/"])
+    queue.claim(lease_s=0)
+    time.sleep(0.01)
+    (job,) = queue.claim(lease_s=0)
+    assert job.attempts == 2
+    time.sleep(0.01)
+    assert queue.claim() == []
+    assert queue.counts()["failed"] == 1
+
+
+def test_meta_roundtrip(queue):
+    queue.set_meta("settings", {"concurrency": 8})
+    assert queue.get_meta("settings") == {"concurrency": 8}
+    assert queue.get_meta("missing", 0) == 0
@@ -0,0 +1,39 @@
+"""Tests de search_mercadolibre_iter(): páginas fallidas y corte por páginas sin productos nuevos."""
+
+import pytest
+
+pytest.importorskip("camoufox")
+import camoufox_browser  # noqa: E402
+
+
+def _page(url, titles=None, error=None):
+    if error:
+        return {"url": url, "success": False, "error": error}
+    return {"url": url, "success": True, "action_result": [{"title": t, "price": "1"} for t in titles]}
+
+
+def _search(monkeypatch, pages, **options):
+    def fake_browse_many(urls, **kwargs):
+        yield from pages
+
+    monkeypatch.setattr(camoufox_browser, "browse_many", fake_browse_many)
+    return camoufox_browser.search_mercadolibre_iter("laptop", max_results=200, **options)
+
+
+def test_failed_page_skipped_and_reported(monkeypatch):
+    errors = []
+    pages = [_page("p1", ["a", "b"]), _page("p2", error="Timeout 45000ms"), _page("p3", ["c"])]
+    products = list(_search(monkeypatch, pages, errors=errors))
+    assert [p["title"] for p in products] == ["a", "b", "c"]
+    assert errors == [{"url": "p2", "error": "Timeout 45000ms"}]
+
+
+def test_stops_at_loaded_page_without_new_products(monkeypatch):
+    pages = [_page("p1", ["a"]), _page("p2", ["a"]), _page("p3", ["z"])]
+    assert [p["title"] for p in _search(monkeypatch, pages)] == ["a"]
+
+
+def test_raises_when_no_page_loads(monkeypatch):
+    pages = [_page("p1", error="Blocked (status 403)"), _page("p2", error="Timeout")]
+    with pytest.raises(RuntimeError, match="403"):
+        list(_search(monkeypatch, pages))
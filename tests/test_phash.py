@@ -0,0 +1,51 @@
+"""Tests de phash.py: distancias entre hashes e índice por serie."""
+
+import io
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("PIL")
+
+from PIL import Image  # noqa: E402
+
+from phash import PerceptualIndex, distance, perceptual_hash, perceptual_hashes  # noqa: E402
+
+
+def _png(shade: int, stripe: int = 0) -> bytes:
+    img = Image.new("RGB", (64, 64), (shade, shade, shade))
+    for x in range(stripe, stripe + 16):
+        for y in range(64):
+            img.putpixel((x % 64, y), (255 - shade, 0, 0))
+    out = io.BytesIO()
+    img.save(out, format="PNG")
+    return out.getvalue()
+
+
+def test_phash_distance():
+    a, b, c = perceptual_hash(_png(10)), perceptual_hash(_png(12)), perceptual_hash(_png(200, stripe=30))
+    assert distance(a, a) == 0.0
+    assert distance(a, b) < 0.1 < distance(a, c)
+    index = PerceptualIndex(history=2)
+    assert index.check("s", a) == (True, None)
+    for key in ("k1", "k2", "k3"):
+        index.add("s", c, key)
+    assert index.last("s") == (c, "k3")
+    assert index.nearest(c, k=1)[0][:2] == (0.0, "s")
+    assert len(index._db.execute("SELECT * FROM phashes").fetchall()) == 2
+
+
+def test_batch_matches_single_hashes():
+    images = [_png(10), _png(200, stripe=30)]
+    assert perceptual_hashes(images) == [perceptual_hash(image) for image in images]
+    assert perceptual_hashes([]) == []
+
+
+def test_index_persists_across_instances(tmp_path):
+    path = str(tmp_path / "phash.db")
+    value = perceptual_hash(_png(200, stripe=30))
+    index = PerceptualIndex(path)
+    index.add("tienda/home", value, "home.png")
+    index.close()
+    changed, score = PerceptualIndex(path).check("tienda/home", value)
+    assert changed is False and score == 0.0
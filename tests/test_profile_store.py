@@ -0,0 +1,47 @@
+"""Tests de profile_store.py: opciones de lanzamiento de un perfil guardado."""
+
+import pytest
+
+pytest.importorskip("camoufox")
+
+from profile_store import Profile, _read_config, _write_config  # noqa: E402
+
+
+def _profile(config=None) -> Profile:
+    env = {}
+    _write_config(env, config or {"navigator.userAgent": "UA", "humanize": True})
+    return Profile("abc", {"env": env, "executable_path": None})
+
+
+def test_config_roundtrip_over_chunks():
+    config = {"navigator.userAgent": "x" * 5000, "screen.width": 1920}
+    env = {}
+    _write_config(env, config)
+    assert len([k for k in env if k.startswith("CAMOU_CONFIG_")]) == 3
+    assert _read_config(env) == config
+
+
+def test_display_forces_x11_on_wayland_sessions(monkeypatch):
+    monkeypatch.setenv("WAYLAND_DISPLAY", "wayland-0")
+    monkeypatch.setenv("GDK_BACKEND", "wayland")
+    monkeypatch.setenv("MOZ_ENABLE_WAYLAND", "1")
+    env = _profile().launch_options(display=":99")["env"]
+    assert env["DISPLAY"] == ":99"
+    assert env["GDK_BACKEND"] == "x11"
+    assert env["MOZ_ENABLE_WAYLAND"] == "0"
+    assert "WAYLAND_DISPLAY" not in env
+
+
+def test_without_display_keeps_session_env(monkeypatch):
+    monkeypatch.setenv("WAYLAND_DISPLAY", "wayland-0")
+    env = _profile().launch_options()["env"]
+    assert env["WAYLAND_DISPLAY"] == "wayland-0"
+
+
+def test_humanize_override_does_not_touch_stored_options():
+    profile = _profile()
+    options = profile.launch_options(humanize=2.0)
+    assert _read_config(options["env"])["humanize:maxTime"] == 2.0
+    assert _read_config(profile.launch_options(humanize=False)["env"]).get("humanize") is None
+    assert profile.config["humanize"] is True
+    assert options["headless"] is False
@@ -0,0 +1,102 @@
+"""Tests de rate_limit.py: token bucket, AIMD y liberación de turnos."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from rate_limit import AdaptiveRateLimiter, DomainRateLimiter, TokenBucket, domain_of
+
+URL = "https://www.example.com/page"
+
+
+def test_domain_of_ignores_www_and_case():
+    assert domain_of("https://WWW.Example.com/a?b=1") == "example.com"
+    assert domain_of("https://listado.mercadolibre.com.co/x") == "listado.mercadolibre.com.co"
+
+
+def test_token_bucket_burst_then_paced():
+    bucket = TokenBucket(rate=2.0, burst=2)
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == pytest.approx(0.5, abs=0.01)
+    assert bucket.reserve() == pytest.approx(1.0, abs=0.01)
+
+
+def test_overrides_apply_to_subdomains():
+    limiter = DomainRateLimiter(rate=1.0, burst=2, overrides={"mercadolibre.com.co": (0.5, 1)})
+    assert limiter._limits("listado.mercadolibre.com.co") == (0.5, 1)
+    assert limiter._limits("example.com") == (1.0, 2)
+
+
+def test_ban_halves_rate_and_window():
+    limiter = AdaptiveRateLimiter(rate=4.0, burst=10, concurrency=4)
+    limiter.acquire(URL)
+    assert limiter.report(URL, ok=True, status=429) is True
+    stats = limiter.stats()["example.com"]
+    assert stats["rate"] == 2.0
+    assert stats["concurrency"] == 2
+    assert stats["inflight"] == 0
+    assert stats["bans"] == 1
+
+
+def test_success_streak_raises_rate_only_when_paced():
+    limiter = AdaptiveRateLimiter(rate=1.0, burst=100, max_rate=200, increase=0.5, success_streak=3)
+    for _ in range(3):
+        limiter.acquire(URL)
+        limiter.report(URL, ok=True, status=200)
+    # Nunca esperó por el límite: el ritmo no sube
+    assert limiter.rates()["example.com"] == 1.0
+
+    limiter._bucket("example.com").tokens = 0.0
+    limiter._bucket("example.com").rate = 100.0
+    for _ in range(3):
+        limiter.acquire(URL)
+        limiter.report(URL, ok=True, status=200)
+    assert limiter.rates()["example.com"] == 100.5
+
+
+def test_window_blocks_until_report():
+    limiter = AdaptiveRateLimiter(rate=100.0, burst=100, concurrency=1)
+    limiter.acquire(URL)
+    acquired = threading.Event()
+    thread = threading.Thread(target=lambda: (limiter.acquire(URL), acquired.set()))
+    thread.start()
+    assert not acquired.wait(0.2)
+    limiter.report(URL, ok=True, status=200)
+    assert acquired.wait(2)
+    thread.join()
+
+
+def test_cancelled_pacing_sleep_frees_slot_and_token():
+    limiter = AdaptiveRateLimiter(rate=1.0, burst=1, concurrency=2)
+
+    async def scenario():
+        await limiter.acquire_async(URL)
+        limiter.report(URL, ok=True, status=200)
+        # Cada job espera ~1s por el token y se cancela antes (como browse_many_async con job_timeout)
+        for _ in range(3):
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(limiter.acquire_async(URL), 0.05)
+        assert limiter.stats()["example.com"]["inflight"] == 0
+        started = time.monotonic()
+        await asyncio.wait_for(limiter.acquire_async(URL), 3)
+        return time.monotonic() - started
+
+    waited = asyncio.run(scenario())
+    # Los tokens devueltos no se acumulan como deuda: una sola espera de ~1s como máximo
+    assert waited < 1.5
+    assert limiter.stats()["example.com"]["inflight"] == 1
+
+
+def test_save_and_reload_learned_rates(tmp_path):
+    path = tmp_path / "rates.json"
+    limiter = AdaptiveRateLimiter(rate=4.0, burst=10, state_path=str(path))
+    limiter.acquire(URL)
+    limiter.report(URL, ok=True, status=403)
+    limiter.save()
+    reloaded = AdaptiveRateLimiter(rate=4.0, burst=10, state_path=str(path))
+    reloaded.acquire(URL)
+    assert reloaded.rates()["example.com"] == 2.0
+    assert reloaded.stats()["example.com"]["concurrency"] == 2
@@ -0,0 +1,154 @@
+"""Tests de record_replay.py: archivo, fusión al grabar y orden de coincidencias al reproducir."""
+
+import json
+import zipfile
+
+import pytest
+
+from record_replay import Archive, Recorder, RecordSession, Replayer, ReplaySession, request_key
+
+
+class Frame:
+    parent_frame = None
+
+
+class Request:
+    def __init__(self, url, method="GET", post=None, resource_type="document", page=False):
+        self.url = url
+        self.method = method
+        self.post_data_buffer = post
+        self.resource_type = resource_type
+        self.frame = Frame()
+        self._page = page
+
+    def is_navigation_request(self):
+        return self._page
+
+
+def _record(path, exchanges):
+    recorder = Recorder(str(path))
+    for request, status, body in exchanges:
+        recorder.add(request, status, {"content-type": "text/html", "Content-Length": "9"}, body, 12.3)
+    return recorder.save()
+
+
+def test_bodies_stored_once_and_framing_headers_dropped(tmp_path):
+    path = _record(tmp_path / "a.zip", [
+        (Request("https://s.test/", page=True), 200, b"<html>1</html>"),
+        (Request("https://s.test/copy", resource_type="xhr"), 200, b"<html>1</html>"),
+        (Request("https://s.test/#frag", page=True), 200, b"<html>2</html>"),
+    ])
+    archive = Archive(path)
+    assert archive.pages == ["https://s.test/"]
+    assert archive.stats()["bodies"] == 2
+    assert "Content-Length" not in archive.entries[0]["headers"]
+    assert archive.body(archive.entries[1]["body"]) == b"<html>1</html>"
+    names = zipfile.ZipFile(path).namelist()
+    assert len([n for n in names if n.startswith("bodies/")]) == 2
+
+
+def test_save_merges_and_replaces_rerecorded_requests(tmp_path):
+    path = tmp_path / "m.zip"
+    _record(path, [(Request("https://s.test/a", page=True), 200, b"old a"),
+                   (Request("https://s.test/b", page=True), 200, b"old b")])
+    _record(path, [(Request("https://s.test/b", page=True), 200, b"new b"),
+                   (Request("https://s.test/c", page=True), 200, b"new c")])
+    archive = Archive(str(path))
+    assert archive.pages == ["https://s.test/a", "https://s.test/b", "https://s.test/c"]
+    bodies = {e["url"]: archive.body(e["body"]) for e in archive.entries}
+    assert bodies == {"https://s.test/a": b"old a", "https://s.test/b": b"new b", "https://s.test/c": b"new c"}
+
+
+def test_replay_order_exact_then_loose(tmp_path):
+    path = _record(tmp_path / "r.zip", [
+        (Request("https://s.test/api?page=1", resource_type="xhr"), 200, b"first"),
+        (Request("https://s.test/api?page=1", resource_type="xhr"), 200, b"second"),
+        (Request("https://s.test/form", method="POST", post=b"q=1"), 201, b"posted"),
+    ])
+    replayer = Replayer(path)
+    session = ReplaySession(replayer)
+    bodies = [session._plan(Request("https://s.test/api?page=1"))[1]["body"] for _ in range(3)]
+    # Repeticiones en el orden grabado; después se repite la última
+    assert bodies == [b"first", b"second", b"second"]
+    # Sin coincidencia exacta: GET por URL sin query
+    assert session._plan(Request("https://s.test/api?page=1&_=123"))[1]["body"] == b"first"
+    assert session._plan(Request("https://s.test/form", "POST", b"q=1"))[1]["status"] == 201
+    # POST con otro cuerpo no coincide por URL
+    assert session._plan(Request("https://s.test/form", "POST", b"q=2")) == ("abort", "internetdisconnected")
+    assert session._plan(Request("data:text/plain,x")) == ("network", None)
+    assert session.served == 5 and session.missed == 1
+
+
+def test_strict_replay_and_network_misses(tmp_path):
+    path = _record(tmp_path / "s.zip", [(Request("https://s.test/api?x=1", resource_type="xhr"), 200, b"x")])
+    strict = ReplaySession(Replayer(path, loose=False))
+    assert strict._plan(Request("https://s.test/api?x=2"))[0] == "abort"
+    network = ReplaySession(Replayer(path, on_miss="network"))
+    assert network._plan(Request("https://other.test/"))[0] == "network"
+    with pytest.raises(ValueError):
+        Replayer(path, on_miss="maybe")
+
+
+def test_shared_replayer_reopens_after_save(tmp_path):
+    path = tmp_path / "shared.zip"
+    _record(path, [(Request("https://s.test/", page=True), 200, b"v1")])
+    first = Replayer.shared(str(path))
+    assert Replayer.shared(str(path)) is first
+    _record(path, [(Request("https://s.test/", page=True), 200, b"v2")])
+    assert Replayer.shared(str(path)) is not first
+
+
+class Response:
+    def __init__(self, status, headers, body):
+        self.status, self.headers, self._body = status, headers, body
+
+    def body(self):
+        return self._body
+
+
+class Route:
+    def __init__(self, request, response):
+        self.request = request
+        self.response = response
+        self.fetched = None
+        self.fulfilled = None
+
+    def fetch(self, **kwargs):
+        self.fetched = kwargs
+        return self.response
+
+    def fulfill(self, **kwargs):
+        self.fulfilled = kwargs
+
+
+def test_redirects_recorded_hop_by_hop(tmp_path):
+    recorder = Recorder(str(tmp_path / "r.zip"))
+    session = RecordSession(recorder)
+    route = Route(Request("https://s.test/old", page=True),
+                  Response(302, {"location": "https://s.test/new"}, b""))
+    session._handle(route)
+    # Sin seguir la redirección: el navegador pide /new y pasa de nuevo por la ruta
+    assert route.fetched == {"max_redirects": 0}
+    assert route.fulfilled["response"].status == 302
+    entry = recorder.entries[0]
+    assert (entry["url"], entry["status"], entry["headers"]) == ("https://s.test/old", 302, {"location": "https://s.test/new"})
+    replay = ReplaySession(Replayer(recorder.save()))
+    assert replay._plan(Request("https://s.test/old", page=True)) == (
+        "fulfill", {"status": 302, "headers": {"location": "https://s.test/new"}, "body": b""})
+    Archive(str(tmp_path / "r.zip")).to_har(str(tmp_path / "r.har"))
+    har = json.loads((tmp_path / "r.har").read_text())
+    assert har["log"]["entries"][0]["response"]["redirectURL"] == "https://s.test/new"
+
+
+def test_har_export(tmp_path):
+    path = _record(tmp_path / "h.zip", [(Request("https://s.test/", page=True), 200, b"<p>hi</p>")])
+    Archive(path).to_har(str(tmp_path / "out.har"))
+    har = json.loads((tmp_path / "out.har").read_text())
+    entry = har["log"]["entries"][0]
+    assert entry["request"]["url"] == "https://s.test/"
+    assert entry["response"]["content"]["size"] == 9
+
+
+def test_request_key_includes_post_body():
+    assert request_key("GET", "https://s.test/a#x") == "GET https://s.test/a"
+    assert request_key("POST", "https://s.test/a", b"1") != request_key("POST", "https://s.test/a", b"2")
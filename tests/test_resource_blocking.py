@@ -0,0 +1,69 @@
+"""Tests de resource_blocking.py: presets, reglas de bloqueo y contadores."""
+
+import pytest
+
+from resource_blocking import ResourceBlocker
+
+
+class Request:
+    def __init__(self, url, resource_type):
+        self.url = url
+        self.resource_type = resource_type
+
+
+class Route:
+    def __init__(self, request):
+        self.request = request
+        self.outcome = None
+
+    def abort(self, reason):
+        self.outcome = reason
+
+    def fallback(self):
+        self.outcome = "fallback"
+
+
+def test_presets_combine():
+    blocker = ResourceBlocker.from_spec("no-media, no-trackers")
+    assert {"image", "media", "font"} <= blocker.block_types
+    assert blocker.should_block("script", "https://www.google-analytics.com/analytics.js")
+    assert not blocker.should_block("script", "https://shop.test/app.js")
+    assert ResourceBlocker.from_spec("") is None
+    with pytest.raises(ValueError):
+        ResourceBlocker.from_spec("no-such-preset")
+
+
+def test_document_never_blocked_and_allow_wins():
+    blocker = ResourceBlocker(block_types=["image", "document"], block_domains=["cdn.test"],
+                              allow_domains=["img.cdn.test"])
+    assert not blocker.should_block("document", "https://cdn.test/")
+    assert blocker.should_block("image", "https://shop.test/a.png")
+    assert blocker.should_block("script", "https://static.cdn.test/x.js")
+    assert not blocker.should_block("image", "https://img.cdn.test/a.png")
+
+
+def test_path_prefix_entries():
+    blocker = ResourceBlocker.from_spec("no-trackers")
+    assert blocker.should_block("xhr", "https://bat.bing.com/bat/action")
+    assert not blocker.should_block("xhr", "https://www.bing.com/search?q=x")
+
+
+def test_allow_types_blocks_everything_else():
+    blocker = ResourceBlocker(allow_types=["script", "xhr"])
+    assert blocker.should_block("image", "https://a.test/x.png")
+    assert not blocker.should_block("xhr", "https://a.test/api")
+
+
+def test_handler_counts_and_routes():
+    blocker = ResourceBlocker.from_spec({"block_types": ["image"]})
+    routes = [Route(Request("https://a.test/x.png", "image")), Route(Request("https://a.test/y.png", "image")),
+              Route(Request("https://a.test/app.js", "script"))]
+    for route in routes:
+        blocker._handle(route)
+    assert [r.outcome for r in routes] == ["blockedbyclient", "blockedbyclient", "fallback"]
+    assert blocker.stats() == {
+        "blocked_requests": 2, "blocked_by_type": {"image": 2},
+        "blocked_top_domains": {"a.test": 2}, "allowed_requests": 1,
+    }
+    copy = ResourceBlocker.from_spec(blocker)
+    assert copy.stats()["blocked_requests"] == 0 and copy.block_types == blocker.block_types
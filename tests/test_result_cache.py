@@ -0,0 +1,153 @@
+"""Tests de result_cache.py: TTL, políticas, backends y single-flight."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from result_cache import MemoryBackend, ResultCache, SQLiteBackend, normalize_url
+
+
+def test_normalize_url():
+    assert normalize_url("HTTPS://Example.COM:443/a?b=2&a=1#frag") == "https://example.com/a?a=1&b=2"
+    assert normalize_url("http://example.com:8080") == "http://example.com:8080/"
+
+
+def test_policies_and_ttl():
+    cache = ResultCache(ttl=0.05)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {"n": len(calls)}
+
+    assert cache.get_or_compute("k", compute) == ({"n": 1}, "miss")
+    assert cache.get_or_compute("k", compute) == ({"n": 1}, "hit")
+    assert cache.get_or_compute("k", compute, policy="refresh") == ({"n": 2}, "refresh")
+    assert cache.get_or_compute("k", compute, policy="bypass") == ({"n": 3}, "bypass")
+    assert cache.get_or_compute("k", compute) == ({"n": 2}, "hit")
+    time.sleep(0.06)
+    assert cache.get_or_compute("k", compute) == ({"n": 4}, "miss")
+    with pytest.raises(ValueError):
+        cache.get_or_compute("k", compute, policy="nope")
+
+
+def test_uncacheable_results_are_not_stored():
+    cache = ResultCache()
+    assert cache.get_or_compute("k", lambda: {"success": False}, cacheable=lambda r: r["success"])[1] == "miss"
+    assert cache.get_or_compute("k", lambda: {"success": True})[1] == "miss"
+    assert cache.get_or_compute("k", lambda: None)[1] == "hit"
+
+
+def test_single_flight_threads():
+    cache = ResultCache()
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        release.wait(2)
+        return {"page": "x"}
+
+    statuses = []
+    threads = [threading.Thread(target=lambda: statuses.append(cache.get_or_compute("k", compute)[1]))
+               for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    while cache.stats()["shared"] < 4:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert sorted(statuses) == ["miss"] + ["shared"] * 4
+
+
+def test_single_flight_followers_get_snapshot_not_leader_value():
+    cache = ResultCache()
+    release = threading.Event()
+    results = {}
+
+    def compute():
+        release.wait(2)
+        return {"page": "x"}
+
+    def call(name):
+        value, status = cache.get_or_compute("k", compute)
+        # browse() anota el estado en el resultado que recibe
+        value["cache"] = status
+        results[name] = value
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    while cache.stats()["shared"] < 3:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+    values = list(results.values())
+    assert len({id(value) for value in values}) == 4
+    assert sorted(value["cache"] for value in values) == ["miss"] + ["shared"] * 3
+
+
+def test_single_flight_propagates_errors():
+    cache = ResultCache()
+    started = threading.Event()
+    errors = []
+
+    def compute():
+        started.set()
+        time.sleep(0.05)
+        raise RuntimeError("boom")
+
+    def follower():
+        started.wait()
+        try:
+            cache.get_or_compute("k", compute)
+        except RuntimeError as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=follower)
+    thread.start()
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute("k", compute)
+    thread.join()
+    assert len(errors) == 1
+
+
+def test_single_flight_async_and_cancelled_leader():
+    cache = ResultCache()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"n": len(calls)}
+
+    async def scenario():
+        leader = asyncio.create_task(cache.get_or_compute_async("k", compute))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(cache.get_or_compute_async("k", compute))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await follower
+
+    value, status = asyncio.run(scenario())
+    # El seguidor toma la navegación del líder cancelado
+    assert status == "miss" and value == {"n": 2}
+    assert len(calls) == 2
+
+
+def test_backends_evict(tmp_path):
+    memory = MemoryBackend(max_entries=2)
+    for key in "abc":
+        memory.set(key, "v", time.time() + 60, 0.1)
+    assert memory.get("a") is None and len(memory) == 2
+
+    disk = SQLiteBackend(str(tmp_path / "results.db"), max_entries=2)
+    for key in "abc":
+        disk.set(key, "v", time.time() + 60, 0.1)
+        time.sleep(0.01)
+    assert disk.get("a") is None and disk.get("c")[0] == "v" and len(disk) == 2
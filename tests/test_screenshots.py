@@ -0,0 +1,115 @@
+"""Tests de screenshots.py con una página falsa (sin navegador)."""
+
+import io
+import sqlite3
+import tarfile
+import threading
+
+import pytest
+
+from screenshots import DirectorySink, ScreenshotPipeline, SQLiteSink, TarSink
+
+
+def _png(shade: int, stripe: int = 0) -> bytes:
+    Image = pytest.importorskip("PIL.Image")
+    img = Image.new("RGB", (64, 64), (shade, shade, shade))
+    for x in range(stripe, stripe + 16):
+        for y in range(64):
+            img.putpixel((x % 64, y), (255 - shade, 0, 0))
+    out = io.BytesIO()
+    img.save(out, format="PNG")
+    return out.getvalue()
+
+
+class FakePage:
+    def __init__(self, frames):
+        self.frames = list(frames)
+        self.thread = None
+
+    def screenshot(self, **kwargs):
+        self.thread = threading.current_thread()
+        return self.frames.pop(0)
+
+
+class MemorySink:
+    def __init__(self):
+        self.items = {}
+        self.batches = 0
+
+    def write_batch(self, items):
+        self.batches += 1
+        self.items.update(items)
+
+    def close(self):
+        pass
+
+
+def test_exact_duplicates_stored_once():
+    sink = MemorySink()
+    with ScreenshotPipeline(sink, batch_size=2) as shots:
+        page = FakePage([b"A", b"A", b"B"])
+        assert shots.capture(page, "a/1.png") == "a/1.png"
+        assert shots.capture(page, "a/2") == "a/1.png"
+        assert shots.capture(page, "a/3", details=True)["stored"] is True
+    assert sorted(sink.items) == ["a/1.png", "a/3.png"]
+    assert shots.stats()["duplicates"] == 1 and shots.stats()["written"] == 2
+
+
+def test_finished_futures_are_pruned():
+    shots = ScreenshotPipeline(MemorySink(), batch_size=1000)
+    page = FakePage([bytes([i]) for i in range(50)])
+    for i in range(50):
+        shots.capture(page, f"p/{i}")
+    shots._executor.submit(lambda: None).result()
+    shots.capture(FakePage([b"last"]), "p/last")
+    assert len(shots._futures) < 50
+    shots.close()
+    assert shots.stats()["written"] == 51
+
+
+def test_sync_perceptual_hashing_runs_in_pool(monkeypatch):
+    pytest.importorskip("numpy")
+    import screenshots
+
+    calls = []
+    original = screenshots.perceptual_hashes
+
+    def spy(images):
+        calls.append(threading.current_thread())
+        return original(images)
+
+    monkeypatch.setattr(screenshots, "perceptual_hashes", spy)
+    sink = MemorySink()
+    shots = ScreenshotPipeline(sink, perceptual=True, phash_threshold=0.1)
+    page = FakePage([_png(10), _png(12), _png(200, stripe=30)])
+    first = shots.capture(page, "home/1", series="home", details=True)
+    same = shots.capture(page, "home/2", series="home", details=True)
+    other = shots.capture(page, "home/3", series="home", details=True)
+    # Los detalles ya son finales al volver, sin flush()
+    assert calls and all(thread is not threading.current_thread() for thread in calls)
+    assert first["stored"] and first["changed"] and first["distance"] is None
+    assert not same["stored"] and same["similar_to"] == "home/1.png" and same["key"] == "home/1.png"
+    assert other["stored"] and other["changed"]
+    shots.flush()
+    assert sorted(sink.items) == ["home/1.png", "home/3.png"]
+    assert shots.stats()["similar"] == 1
+    shots.close()
+
+
+def test_sinks_roundtrip(tmp_path):
+    items = [("a/1.png", b"one"), ("b/2.png", b"two")]
+    DirectorySink(str(tmp_path / "dir")).write_batch(items)
+    assert (tmp_path / "dir" / "b" / "2.png").read_bytes() == b"two"
+
+    tar = TarSink(str(tmp_path / "shots.tar"), shard_mb=0)
+    tar.write_batch(items)
+    tar.close()
+    assert len(tar.shards) == 2
+    with tarfile.open(tar.shards[1]) as f:
+        assert f.extractfile("b/2.png").read() == b"two"
+
+    db = SQLiteSink(str(tmp_path / "shots.db"))
+    db.write_batch(items)
+    db.close()
+    rows = sqlite3.connect(str(tmp_path / "shots.db")).execute("SELECT key, data FROM images ORDER BY key")
+    assert [(k, bytes(d)) for k, d in rows] == items
@@ -0,0 +1,138 @@
+"""Tests de wait_strategies.py: parseo de condiciones y DomQuiet tras un cambio de documento."""
+
+import asyncio
+
+import pytest
+
+from wait_strategies import (
+    Delay,
+    DomQuiet,
+    JsPredicate,
+    LoadState,
+    NetworkQuiet,
+    PlaywrightError,
+    PlaywrightTimeoutError,
+    SelectorReady,
+    parse_conditions,
+    track_requests,
+    wait_until_ready,
+    wait_until_ready_async,
+)
+
+
+class FakePage:
+    """Página mínima: evaluate falla `destroyed` veces como tras un redirect en el cliente."""
+
+    def __init__(self, destroyed=0, quiet=True):
+        self.destroyed = destroyed
+        self.quiet = quiet
+        self.installs = 0
+        self.handlers = {}
+
+    def is_closed(self):
+        return False
+
+    def on(self, event, handler):
+        self.handlers.setdefault(event, []).append(handler)
+
+    def evaluate(self, script):
+        if self.destroyed:
+            self.destroyed -= 1
+            raise PlaywrightError("Execution context was destroyed, most likely because of a navigation")
+        self.installs += 1
+
+    def wait_for_function(self, script, arg=None, polling=None, timeout=None):
+        if not self.quiet:
+            raise PlaywrightTimeoutError(f"Timeout {timeout}ms exceeded")
+
+    def wait_for_timeout(self, ms):
+        pass
+
+
+class AsyncFakePage(FakePage):
+    async def evaluate(self, script):
+        return FakePage.evaluate(self, script)
+
+    async def wait_for_function(self, *args, **kwargs):
+        return FakePage.wait_for_function(self, *args, **kwargs)
+
+
+def test_parse_string_spec():
+    conditions = parse_conditions("selector:#results, dom_quiet:200,network_quiet:500/2,load,sleep:10")
+    assert [type(c) for c in conditions] == [SelectorReady, DomQuiet, NetworkQuiet, LoadState, Delay]
+    assert conditions[2].max_inflight == 2
+    assert conditions[3].state == "load"
+
+
+def test_js_takes_rest_of_string():
+    conditions = parse_conditions("dom_quiet:100,js:() => a, b")
+    assert isinstance(conditions[-1], JsPredicate)
+    assert conditions[-1].expression == "() => a, b"
+
+
+def test_parse_dicts_lists_and_unknown():
+    conditions = parse_conditions([{"selector": ".x", "state": "attached"}, "dom_quiet:50", DomQuiet(10)])
+    assert conditions[0].state == "attached"
+    assert len(conditions) == 3
+    assert parse_conditions("") == []
+    with pytest.raises(ValueError):
+        parse_conditions("bogus:1")
+
+
+def test_dom_quiet_reinstalls_after_context_destroyed():
+    page = FakePage(destroyed=2)
+    assert wait_until_ready(page, "dom_quiet:100", timeout=1000)["ready"] is True
+    assert page.installs == 1
+
+
+def test_dom_quiet_reports_not_ready_when_context_keeps_changing():
+    page = FakePage(destroyed=10 ** 6)
+    report = wait_until_ready(page, [DomQuiet(100, polling=1)], timeout=50)
+    assert report["ready"] is False
+    assert report["timed_out"] == "dom_quiet"
+    assert "Execution context was destroyed" in report["error"]
+
+
+def test_dom_quiet_async_reinstalls_after_context_destroyed():
+    page = AsyncFakePage(destroyed=1)
+    report = asyncio.run(wait_until_ready_async(page, "dom_quiet:100", timeout=1000))
+    assert report["ready"] is True
+
+
+def test_timeout_reported_not_raised():
+    report = wait_until_ready(FakePage(quiet=False), "dom_quiet:100", timeout=100)
+    assert report["ready"] is False and report["timed_out"] == "dom_quiet"
+    with pytest.raises(PlaywrightError):
+        wait_until_ready(FakePage(quiet=False), "dom_quiet:100", timeout=100, raise_on_timeout=True)
+
+
+def test_network_quiet_follows_request_events():
+    page = FakePage()
+    tracker = track_requests(page)
+    assert track_requests(page) is tracker
+    for handler in page.handlers["request"]:
+        handler(object())
+    report = wait_until_ready(page, "network_quiet:0", timeout=30)
+    assert report["ready"] is False and tracker.inflight == 1
+    for handler in page.handlers["requestfinished"]:
+        handler(object())
+    assert wait_until_ready(page, "network_quiet:0", timeout=30)["ready"] is True
+
+
+def test_network_quiet_ignores_churn_below_max_inflight():
+    page = FakePage()
+    tracker = track_requests(page)
+    start, finish = page.handlers["request"][0], page.handlers["requestfinished"][0]
+    for _ in range(3):
+        start(object())
+    finish(object())
+    finish(object())
+    # Queda 1 en vuelo (un long-poll); un beacon que entra y sale no pasa de 2 ni reinicia la espera
+    left_above = tracker.quiet_since(2)
+    start(object())
+    assert tracker.quiet_since(1) is None
+    finish(object())
+    assert tracker.quiet_since(2) == left_above
+    assert tracker.quiet_since(1) > left_above
+    tracker._left_level[3] -= 1
+    assert wait_until_ready(page, "network_quiet:500/2", timeout=30)["ready"] is True